@@ -31,5 +31,10 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     **API_ADVANCED_DISPLAY_NAMES,
 }
 
+# Optional background preload of local models (local.preload in the config)
+from .qwen3vl_preload import register_routes, start_preload
+register_routes()
+start_preload()
+
 __all__ = ["NODE_CLASS_MAPPINGS", "NODE_DISPLAY_NAME_MAPPINGS", "__version__"]
 
@@ -0,0 +1,57 @@
+"""
+Shared helpers for the Qwen3-VL benchmark scripts
+
+Benchmarks import the node modules without running the package __init__
+(which needs a ComfyUI install), so they can be run from a plain checkout:
+
+    python benchmarks/bench_image_preprocess.py
+"""
+
+import importlib
+import os
+import statistics
+import sys
+import time
+import types
+from typing import Callable, Dict, List
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "qwen3vl_bench_pkg"
+
+
+def load_module(name: str):
+    """Import ``<repo>/<name>.py`` as a package submodule so relative imports work"""
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [REPO_ROOT]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f"{PACKAGE_NAME}.{name}")
+
+
+def time_it(fn: Callable[[], object], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    """Run ``fn`` several times and return timing statistics in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return {
+        "mean_ms": statistics.mean(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+    }
+
+
+def print_table(title: str, header: List[str], rows: List[List[object]]) -> None:
+    """Print a simple aligned results table"""
+    cells = [header] + [[f"{c:.2f}" if isinstance(c, float) else str(c) for c in row] for row in rows]
+    widths = [max(len(r[i]) for r in cells) for i in range(len(header))]
+    print(f"\n{title}")
+    print("-" * (sum(widths) + 3 * (len(widths) - 1)))
+    for i, row in enumerate(cells):
+        print(" | ".join(c.rjust(w) for c, w in zip(row, widths)))
+        if i == 0:
+            print("-" * (sum(widths) + 3 * (len(widths) - 1)))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark batched generation against looping over single requests
+
+Runs the same N conversations through qwen3vl_generation.generate_batch once
+with max_batch_size=1 (what looping over Qwen3VLProcessor.process does) and
+once batched, and reports aggregate generated tokens per second.
+
+    python benchmarks/bench_batch_generation.py --checkpoint models/qwen3vl/Qwen3-VL-4B-Instruct
+"""
+
+import argparse
+
+import torch
+
+from _bench_utils import load_module, print_table
+
+
+PROMPTS = [
+    "Describe this image.",
+    "What colors dominate the picture?",
+    "Write a one-line caption for this image.",
+    "List the objects you can see.",
+    "Is this a photo or an illustration? Explain briefly.",
+    "What mood does this image convey?",
+    "Suggest a title for this artwork.",
+    "Describe the lighting in the scene.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", required=True, help="local Qwen3-VL checkpoint directory")
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--batch-sizes", default="4,8,16")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--image-size", type=int, default=512, help="0 for text-only prompts")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    from transformers import AutoProcessor, Qwen3VLForConditionalGeneration
+
+    media = load_module("qwen3vl_media")
+    generation = load_module("qwen3vl_generation")
+
+    dtype = torch.bfloat16 if args.device != "cpu" else torch.float32
+    processor = AutoProcessor.from_pretrained(args.checkpoint)
+    model = Qwen3VLForConditionalGeneration.from_pretrained(args.checkpoint, dtype=dtype).to(args.device).eval()
+
+    images = []
+    if args.image_size:
+        torch.manual_seed(0)
+        batch = torch.rand(args.requests, args.image_size, args.image_size, 3)
+        images = media.prepare_images(batch, None, 64 * 32 * 32, 256 * 32 * 32)
+    conversations = [
+        generation.Conversation(prompt=PROMPTS[i % len(PROMPTS)], images=[images[i]] if images else [])
+        for i in range(args.requests)
+    ]
+    gen_kwargs = dict(max_new_tokens=args.max_new_tokens, do_sample=False)
+
+    # Warm up kernels and allocator
+    generation.generate_batch(model, processor, conversations[:1], args.device, 1, max_new_tokens=4)
+
+    rows = []
+    _, loop = generation.generate_batch(model, processor, conversations, args.device, 1, **gen_kwargs)
+    rows.append(["loop (batch=1)", loop["generated_tokens"], loop["seconds"], loop["tokens_per_second"], 1.0])
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        _, stats = generation.generate_batch(model, processor, conversations, args.device, batch_size, **gen_kwargs)
+        rows.append([f"batched ({batch_size})", stats["generated_tokens"], stats["seconds"],
+                     stats["tokens_per_second"], stats["tokens_per_second"] / loop["tokens_per_second"]])
+
+    print_table(
+        f"{args.requests} requests on {args.device}, max_new_tokens={args.max_new_tokens}",
+        ["mode", "tokens", "seconds", "tok/s", "speedup"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
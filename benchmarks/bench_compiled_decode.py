@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark eager vs compiled decoding of the local Qwen3-VL model
+
+Runs one image prompt per length bucket with the default dynamic KV cache
+and with a static cache plus torch.compile'd decode step, and reports the
+first compiled call (which includes compilation) separately from the
+steady-state decode tokens per second. Runs on the CPU unless --device is
+given.
+
+    python benchmarks/bench_compiled_decode.py --checkpoint models/qwen3vl/Qwen3-VL-2B-Instruct
+"""
+
+import argparse
+import contextlib
+
+import torch
+
+from _bench_utils import load_module, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", required=True, help="local Qwen3-VL checkpoint directory")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--max-new-tokens", default="32,128", help="comma separated, one row each")
+    parser.add_argument("--image-size", type=int, default=448, help="0 for a text-only prompt")
+    parser.add_argument("--min-bucket", type=int, default=1024)
+    parser.add_argument("--mode", default="reduce-overhead", help="torch.compile mode")
+    parser.add_argument("--repeats", type=int, default=3, help="steady-state runs per row")
+    args = parser.parse_args()
+
+    from transformers import AutoProcessor, Qwen3VLForConditionalGeneration
+
+    cpu = load_module("qwen3vl_cpu")
+    media = load_module("qwen3vl_media")
+    generation = load_module("qwen3vl_generation")
+    compile_module = load_module("qwen3vl_compile")
+
+    device = torch.device(args.device)
+    if device.type == "cpu":
+        dtype = cpu.cpu_dtype()
+    else:
+        dtype = torch.bfloat16
+
+    processor = AutoProcessor.from_pretrained(args.checkpoint)
+    model = Qwen3VLForConditionalGeneration.from_pretrained(args.checkpoint, dtype=dtype).to(device).eval()
+
+    images = []
+    if args.image_size:
+        torch.manual_seed(0)
+        images = media.prepare_images(torch.rand(1, args.image_size, args.image_size, 3), None,
+                                      64 * 32 * 32, 256 * 32 * 32)
+    conversation = generation.Conversation(prompt="Describe this image in detail.", images=images)
+    compiled_decode = compile_module.Qwen3VLCompiledDecode(min_bucket=args.min_bucket, mode=args.mode)
+
+    with cpu.cpu_threads() if device.type == "cpu" else contextlib.nullcontext():
+        # Warm up kernels and allocator
+        generation.generate_streaming(model, processor, conversation, device, max_new_tokens=2, do_sample=False)
+
+        rows = []
+        for max_new_tokens in (int(n) for n in args.max_new_tokens.split(",")):
+            gen_kwargs = dict(max_new_tokens=max_new_tokens, min_new_tokens=max_new_tokens, do_sample=False)
+
+            eager = [generation.generate_streaming(model, processor, conversation, device, **gen_kwargs)[1]
+                     for _ in range(args.repeats)]
+            _, first = generation.generate_streaming(model, processor, conversation, device,
+                                                     compiled_decode=compiled_decode, **gen_kwargs)
+            compiled = [generation.generate_streaming(model, processor, conversation, device,
+                                                      compiled_decode=compiled_decode, **gen_kwargs)[1]
+                        for _ in range(args.repeats)]
+
+            bucket = compile_module.bucket_length(first["prompt_tokens"] + max_new_tokens, args.min_bucket)
+            eager_tps = sum(s.get("decode_tokens_per_second", 0.0) for s in eager) / len(eager)
+            compiled_tps = sum(s.get("decode_tokens_per_second", 0.0) for s in compiled) / len(compiled)
+            steady_seconds = sum(s["seconds"] for s in compiled) / len(compiled)
+            rows.append([max_new_tokens, bucket, first["compiled"], eager_tps, compiled_tps,
+                         compiled_tps / eager_tps if eager_tps else 0.0, first["seconds"] - steady_seconds])
+
+    print_table(
+        f"{device.type}, {dtype}, mode={args.mode}",
+        ["new tokens", "bucket", "compiled", "eager tok/s", "compiled tok/s", "speedup", "compile overhead s"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark CPU inference modes of the local Qwen3-VL model
+
+Loads the checkpoint on the CPU in fp32, in bf16 (when the CPU has native
+bf16 instructions, or with --force-bf16) and with int8 weight-only
+quantization of the text decoder, then reports load time, prefill time,
+time to first token and decode tokens per second for one image prompt.
+
+    python benchmarks/bench_cpu_inference.py --checkpoint models/qwen3vl/Qwen3-VL-4B-Instruct
+"""
+
+import argparse
+import time
+
+import torch
+
+from _bench_utils import load_module, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", required=True, help="local Qwen3-VL checkpoint directory")
+    parser.add_argument("--modes", default="fp32,bf16,int8")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--image-size", type=int, default=448, help="0 for a text-only prompt")
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads, 0 for one per physical core")
+    parser.add_argument("--force-bf16", action="store_true", help="run bf16 even without native CPU support")
+    args = parser.parse_args()
+
+    from transformers import AutoProcessor, Qwen3VLForConditionalGeneration
+
+    cpu = load_module("qwen3vl_cpu")
+    media = load_module("qwen3vl_media")
+    generation = load_module("qwen3vl_generation")
+
+    physical, logical = cpu.available_cores()
+    print(f"CPU: {physical} physical / {logical} logical cores available, "
+          f"native bf16: {cpu.cpu_supports_bf16()}, torchao: {cpu.torchao_available()}")
+
+    processor = AutoProcessor.from_pretrained(args.checkpoint)
+    images = []
+    if args.image_size:
+        torch.manual_seed(0)
+        images = media.prepare_images(torch.rand(1, args.image_size, args.image_size, 3), None,
+                                      64 * 32 * 32, 256 * 32 * 32)
+    conversation = generation.Conversation(prompt="Describe this image in detail.", images=images)
+    gen_kwargs = dict(max_new_tokens=args.max_new_tokens, min_new_tokens=args.max_new_tokens, do_sample=False)
+
+    with cpu.cpu_threads(args.threads) as (threads, interop):
+        rows = []
+        for mode in args.modes.split(","):
+            if mode == "bf16" and not (cpu.cpu_supports_bf16() or args.force_bf16):
+                print("Skipping bf16: no native bf16 support (use --force-bf16 to run anyway)")
+                continue
+            dtype = torch.bfloat16 if mode == "bf16" else torch.float32
+            if mode == "int8":
+                dtype = cpu.cpu_weight_dtype("int8_weight_only")
+
+            started = time.perf_counter()
+            model = Qwen3VLForConditionalGeneration.from_pretrained(args.checkpoint, dtype=dtype).eval()
+            method = "-"
+            if mode == "int8":
+                method = cpu.quantize_int8_weight_only(model, cpu.language_model_module(model))
+            load_seconds = time.perf_counter() - started
+
+            # Warm up kernels and allocator
+            generation.generate_batch(model, processor, [conversation], "cpu", 1, max_new_tokens=2)
+            _, stats = generation.generate_streaming(model, processor, conversation, "cpu", **gen_kwargs)
+            rows.append([mode, method, load_seconds, stats.get("prefill_seconds", 0.0),
+                         stats.get("time_to_first_token", 0.0), stats.get("decode_tokens_per_second", 0.0)])
+            del model
+
+    print_table(
+        f"CPU, {threads} threads ({interop} inter-op), max_new_tokens={args.max_new_tokens}",
+        ["mode", "quantization", "load s", "prefill s", "TTFT s", "decode tok/s"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark image preprocessing of the local Qwen3-VL processor
+
+Compares the previous path (per-image resize -> PIL -> PNG -> base64 data URL,
+then qwen_vl_utils decoding it back) with the in-memory batched path of
+qwen3vl_media.prepare_images. Reports milliseconds per image.
+"""
+
+import argparse
+import base64
+import io
+
+import torch
+import torch.nn.functional as F
+from PIL import Image
+
+from _bench_utils import load_module, print_table, time_it
+
+
+def legacy_preprocess(images, max_dimension, min_pixels, max_pixels, smart_resize):
+    """The old PNG/base64 round-trip, including the decode done by qwen_vl_utils"""
+    from torchvision.transforms import ToPILImage
+
+    outputs = []
+    for img in images:
+        h, w = img.shape[0], img.shape[1]
+        if h > max_dimension or w > max_dimension:
+            scale = min(max_dimension / h, max_dimension / w)
+            resized = F.interpolate(img.permute(2, 0, 1).unsqueeze(0), size=(int(h * scale), int(w * scale)),
+                                    mode='bilinear', align_corners=False)
+            img = resized.squeeze(0).permute(1, 2, 0)
+        buffer = io.BytesIO()
+        ToPILImage()(img.permute(2, 0, 1)).save(buffer, format='PNG')
+        data_url = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
+
+        # qwen_vl_utils.fetch_image
+        raw = base64.b64decode(data_url.split("base64,", 1)[1])
+        pil = Image.open(io.BytesIO(raw)).convert("RGB")
+        new_h, new_w = smart_resize(pil.height, pil.width, 32, min_pixels, max_pixels)
+        outputs.append(pil.resize((new_w, new_h)))
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1024,2048,4096", help="comma separated square input sizes")
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--max-dimension", type=int, default=2048)
+    parser.add_argument("--min-pixels", type=int, default=256 * 32 * 32)
+    parser.add_argument("--max-pixels", type=int, default=768 * 32 * 32)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    media = load_module("qwen3vl_media")
+    torch.manual_seed(0)
+
+    rows = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        images = torch.rand(args.batch, size, size, 3)
+        legacy = time_it(lambda: legacy_preprocess(images, args.max_dimension, args.min_pixels,
+                                                   args.max_pixels, media.smart_resize), args.repeat)
+        direct = time_it(lambda: media.prepare_images(images, args.max_dimension, args.min_pixels,
+                                                      args.max_pixels), args.repeat)
+        legacy_ms = legacy["mean_ms"] / args.batch
+        direct_ms = direct["mean_ms"] / args.batch
+        rows.append([f"{size}x{size}", legacy_ms, direct_ms, legacy_ms / direct_ms])
+
+    print_table(
+        f"Image preprocessing, batch={args.batch}, threads={torch.get_num_threads()}",
+        ["input", "png+base64 ms/img", "in-memory ms/img", "speedup"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
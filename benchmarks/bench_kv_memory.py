@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak generate memory against sequence length per KV cache layout
+
+For each prompt length, generates a fixed number of tokens with the full,
+int8/int4 quantized (when hqq / optimum-quanto is installed) and offloaded
+KV caches and reports the measured peak CUDA memory above the weights next
+to the planner's estimate. With --estimate-only just the estimates are
+printed (no GPU or weights needed, only the model config).
+
+    python benchmarks/bench_kv_memory.py --checkpoint models/qwen3vl/Qwen3-VL-4B-Instruct
+"""
+
+import argparse
+
+import torch
+
+from _bench_utils import load_module, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", required=True, help="local Qwen3-VL checkpoint directory")
+    parser.add_argument("--prompt-tokens", default="1024,4096,16384")
+    parser.add_argument("--max-new-tokens", type=int, default=512)
+    parser.add_argument("--modes", default="full,int8,int4,offload")
+    parser.add_argument("--attention", default="sdpa", choices=["eager", "sdpa", "flash_attention_2"])
+    parser.add_argument("--estimate-only", action="store_true")
+    args = parser.parse_args()
+
+    from transformers import AutoConfig
+
+    kv_memory = load_module("qwen3vl_kv_memory")
+    config = AutoConfig.from_pretrained(args.checkpoint)
+    modes = args.modes.split(",")
+    lengths = [int(n) for n in args.prompt_tokens.split(",")]
+
+    model = tokenizer = None
+    if not args.estimate_only:
+        from transformers import AutoTokenizer, Qwen3VLForConditionalGeneration
+        tokenizer = AutoTokenizer.from_pretrained(args.checkpoint)
+        model = Qwen3VLForConditionalGeneration.from_pretrained(
+            args.checkpoint, dtype=torch.bfloat16, attn_implementation=args.attention, device_map={"": "cuda"}
+        ).eval()
+
+    rows = []
+    for length in lengths:
+        for mode in modes:
+            estimate = kv_memory.estimate_peak_bytes(config, length, args.max_new_tokens, mode,
+                                                     attention_type=args.attention) / 1024 ** 3
+            if model is None:
+                rows.append([length, mode, estimate, "-", "-"])
+                continue
+            if not kv_memory.kv_mode_available(mode, "cuda"):
+                print(f"Skipping {mode}: backend not installed")
+                continue
+
+            plan = kv_memory.MemoryPlan(mode, args.max_new_tokens, args.max_new_tokens, length, 0, 0)
+            input_ids = torch.full((1, length), tokenizer.convert_tokens_to_ids("the"), device="cuda")
+            torch.cuda.synchronize()
+            torch.cuda.empty_cache()
+            torch.cuda.reset_peak_memory_stats()
+            baseline = torch.cuda.memory_allocated()
+            try:
+                with torch.no_grad():
+                    model.generate(input_ids=input_ids, attention_mask=torch.ones_like(input_ids),
+                                   max_new_tokens=args.max_new_tokens, min_new_tokens=args.max_new_tokens,
+                                   do_sample=False, **plan.generate_kwargs())
+                measured = (torch.cuda.max_memory_allocated() - baseline) / 1024 ** 3
+                rows.append([length, mode, estimate, measured, measured / estimate if estimate else 0.0])
+            except torch.cuda.OutOfMemoryError:
+                rows.append([length, mode, estimate, "OOM", "-"])
+
+    print_table(
+        f"Peak generate memory above weights, {args.attention} attention, max_new_tokens={args.max_new_tokens}",
+        ["prompt tokens", "kv cache", "estimate GB", "measured GB", "measured/estimate"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
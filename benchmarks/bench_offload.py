@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark memory-budgeted offloading of the local Qwen3-VL model
+
+Loads the checkpoint once per GPU budget with the device map of
+qwen3vl_offload (vision tower on the GPU, decoder layers spilling to CPU
+RAM, then disk) and reports the layer placement, load time, peak VRAM,
+prefill time and per-token decode latency for one image prompt.
+
+    python benchmarks/bench_offload.py --checkpoint models/qwen3vl/Qwen3-VL-8B-Instruct --gpu-budgets 6,10,0
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+
+import torch
+
+from _bench_utils import load_module, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", required=True, help="local Qwen3-VL checkpoint directory")
+    parser.add_argument("--gpu-budgets", default="6,10", help="GPU budgets in GB, 0 for free VRAM minus headroom")
+    parser.add_argument("--cpu-budget", type=float, default=0, help="CPU RAM budget in GB, 0 for most of free RAM")
+    parser.add_argument("--offload-folder", default=None, help="disk offload folder, a temp dir by default")
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--image-size", type=int, default=448, help="0 for a text-only prompt")
+    args = parser.parse_args()
+
+    from transformers import AutoProcessor, Qwen3VLForConditionalGeneration
+
+    offload = load_module("qwen3vl_offload")
+    media = load_module("qwen3vl_media")
+    generation = load_module("qwen3vl_generation")
+
+    device = torch.device("cuda", torch.cuda.current_device())
+    dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+    processor = AutoProcessor.from_pretrained(args.checkpoint)
+    images = []
+    if args.image_size:
+        torch.manual_seed(0)
+        images = media.prepare_images(torch.rand(1, args.image_size, args.image_size, 3), None,
+                                      64 * 32 * 32, 256 * 32 * 32)
+    conversation = generation.Conversation(prompt="Describe this image in detail.", images=images)
+    gen_kwargs = dict(max_new_tokens=args.max_new_tokens, min_new_tokens=args.max_new_tokens, do_sample=False)
+    folder = args.offload_folder or tempfile.mkdtemp(prefix="qwen3vl-offload-")
+    os.makedirs(folder, exist_ok=True)
+
+    rows = []
+    for gpu_budget in (float(b) for b in args.gpu_budgets.split(",")):
+        max_memory = offload.offload_budgets(device, torch.cuda.mem_get_info(device.index)[0], gpu_budget,
+                                             args.cpu_budget)
+        device_map = offload.plan_device_map(args.checkpoint, dtype, max_memory)
+        print(f"GPU {max_memory[device.index] / 1024 ** 3:.1f}GB: {offload.describe_placement(device_map)}")
+
+        torch.cuda.empty_cache()
+        torch.cuda.reset_peak_memory_stats()
+        started = time.perf_counter()
+        model = Qwen3VLForConditionalGeneration.from_pretrained(
+            args.checkpoint, dtype=dtype, device_map=device_map, offload_folder=folder, low_cpu_mem_usage=True
+        ).eval()
+        load_seconds = time.perf_counter() - started
+
+        generation.generate_streaming(model, processor, conversation, device, max_new_tokens=2, do_sample=False)
+        _, stats = generation.generate_streaming(model, processor, conversation, device, **gen_kwargs)
+        decode_tps = stats.get("decode_tokens_per_second", 0.0)
+        placement = sorted(set(str(d) for d in device_map.values()))
+        rows.append([gpu_budget or "auto", "/".join(placement), load_seconds,
+                     torch.cuda.max_memory_allocated() / 1024 ** 3, stats.get("prefill_seconds", 0.0),
+                     1000.0 / decode_tps if decode_tps else 0.0])
+        del model
+        gc.collect()
+
+    print_table(
+        f"{os.path.basename(args.checkpoint.rstrip(os.sep))}, {dtype}, max_new_tokens={args.max_new_tokens}",
+        ["GPU budget GB", "devices", "load s", "peak VRAM GB", "prefill s", "ms/token"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark the video decode backends of qwen3vl_video_decode
+
+For every installed backend (decord, PyAV, OpenCV) on locally generated
+clips: time to open and read the metadata, full decode throughput (frames
+stored at 256px so whole clips fit in memory), sampled decode at --fps
+(what LoadVideoForQwen3VL does) and random-access reads of --random
+timestamps, each with codec threading on (--threads) and off (1).
+
+    python benchmarks/bench_video_backends.py --seconds 30 --fps 2 --threads 0
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from _bench_utils import load_module, print_table
+from bench_video_sampling import write_clip
+
+_SIZES = {"720p": (1280, 720), "1080p": (1920, 1080)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=30, help="length of the generated clips")
+    parser.add_argument("--fps", type=float, default=2.0, help="sampling rate of the sampled decode")
+    parser.add_argument("--max-frames", type=int, default=128)
+    parser.add_argument("--random", type=int, default=16, help="timestamps of the random-access read")
+    parser.add_argument("--threads", type=int, default=0, help="codec threads, 0 for the codec default")
+    args = parser.parse_args()
+
+    decode = load_module("qwen3vl_video_decode")
+    backends = decode.available_backends()
+    print(f"Installed backends: {', '.join(backends)}")
+
+    folder = tempfile.mkdtemp(prefix="qwen3vl-video-")
+    clips = []
+    for label, (width, height) in _SIZES.items():
+        path = os.path.join(folder, f"{label}.mp4")
+        print(f"Writing {args.seconds}s {label} clip to {path}")
+        write_clip(path, width, height, args.seconds)
+        clips.append((label, path))
+
+    rng = random.Random(0)
+    rows = []
+    for label, path in clips:
+        for backend in backends:
+            for threads in sorted({1, args.threads}):
+                started = time.perf_counter()
+                with decode.open_video(path, backend, threads) as reader:
+                    info = reader.info
+                probe_ms = (time.perf_counter() - started) * 1000.0
+
+                # Every frame, stored downscaled so the clip fits in memory
+                started = time.perf_counter()
+                frames, _, _ = decode.sample_video(path, info.fps, info.frame_count, workers=threads,
+                                                   max_dimension=256, backend=backend)
+                full_fps = len(frames) / (time.perf_counter() - started)
+
+                started = time.perf_counter()
+                frames, _, _ = decode.sample_video(path, args.fps, args.max_frames, workers=threads, backend=backend)
+                sampled_s = time.perf_counter() - started
+
+                seconds = [rng.uniform(0, info.duration) for _ in range(args.random)]
+                out = np.empty((args.random, info.height, info.width, 3), dtype=np.uint8)
+                started = time.perf_counter()
+                with decode.open_video(path, backend, threads) as reader:
+                    reader.read_at(seconds, out)
+                random_ms = (time.perf_counter() - started) * 1000.0 / args.random
+
+                rows.append([label, backend, threads or "default", probe_ms, full_fps,
+                             f"{len(frames)} in {sampled_s:.2f}s", random_ms])
+
+    print_table(
+        f"{args.seconds}s clips, sampled at {args.fps} fps, max_frames={args.max_frames}",
+        ["clip", "backend", "threads", "probe ms", "full decode fps", "sampled", "random ms/frame"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
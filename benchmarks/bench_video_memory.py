@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory and load time of LoadVideoForQwen3VL frame storage
+
+Each variant loads the same sampled frames in a fresh process and reports
+the growth of its peak RSS, the size of the returned tensor and the wall
+time: the old loader (float32 tensor per frame, then torch.stack) against
+the preallocated buffer of qwen3vl_video_decode in uint8, float16 and
+float32, with and without on-load downscaling.
+
+    python benchmarks/bench_video_memory.py --max-frames 128 --max-dimension 1280
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from _bench_utils import print_table
+from bench_video_sampling import write_clip
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _stack_float32(path: str, fps: int, max_frames: int) -> int:
+    """The loader before preallocated storage"""
+    import cv2
+    import torch
+
+    capture = cv2.VideoCapture(path)
+    frame_skip = max(1, int(capture.get(cv2.CAP_PROP_FPS) / fps))
+    frames, count = [], 0
+    while len(frames) < max_frames:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        if count % frame_skip == 0:
+            frames.append(torch.from_numpy(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).float() / 255.0)
+        count += 1
+    capture.release()
+    video = torch.stack(frames)
+    return video.numel() * video.element_size()
+
+
+def _run_variant(path: str, fps: int, max_frames: int, dtype: str, max_dimension: int, queue) -> None:
+    import torch  # noqa: F401  (import cost outside the measurement)
+
+    from _bench_utils import load_module
+
+    decode = load_module("qwen3vl_video_decode")
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    if dtype == "old":
+        nbytes = _stack_float32(path, fps, max_frames)
+    else:
+        frames, _, _ = decode.sample_video(path, fps, max_frames, dtype=dtype, max_dimension=max_dimension or None)
+        nbytes = torch.from_numpy(frames).numel() * frames.itemsize
+    queue.put((time.perf_counter() - started, _peak_rss_mb() - baseline, nbytes / 1024 ** 2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", default=None, help="video file, a synthetic 1080p clip when omitted")
+    parser.add_argument("--seconds", type=int, default=70, help="length of the synthetic clip")
+    parser.add_argument("--fps", type=int, default=2)
+    parser.add_argument("--max-frames", type=int, default=128)
+    parser.add_argument("--max-dimension", type=int, default=1280, help="downscale target of the last variants")
+    args = parser.parse_args()
+
+    path = args.video
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="qwen3vl-video-"), "1080p.mp4")
+        print(f"Writing {args.seconds}s 1080p clip to {path}")
+        write_clip(path, 1920, 1080, args.seconds)
+
+    variants = [("old", 0), ("float32", 0), ("float16", 0), ("uint8", 0),
+                ("float16", args.max_dimension), ("uint8", args.max_dimension)]
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    for dtype, max_dimension in variants:
+        queue = context.Queue()
+        process = context.Process(target=_run_variant,
+                                  args=(path, args.fps, args.max_frames, dtype, max_dimension, queue))
+        process.start()
+        seconds, peak_mb, output_mb = queue.get()
+        process.join()
+        label = "float32 list + stack (old)" if dtype == "old" else dtype
+        rows.append([label, max_dimension or "-", output_mb, peak_mb, seconds])
+
+    print_table(
+        f"{os.path.basename(path)}, fps={args.fps}, max_frames={args.max_frames}",
+        ["storage", "max dimension", "output MB", "peak RSS growth MB", "seconds"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark video tensor handling of the local Qwen3-VL processor
+
+Compares the previous path (float frames -> uint8 -> mp4v file written with
+cv2.VideoWriter -> decoded again by qwen_vl_utils) with the direct path of
+qwen3vl_media.prepare_video, on a synthetic clip (128 frames by default).
+Pass --checkpoint to also run the Qwen3-VL processor on both outputs.
+"""
+
+import argparse
+import os
+import tempfile
+
+import torch
+
+from _bench_utils import load_module, print_table, time_it
+
+
+def synthetic_clip(frames: int, height: int, width: int) -> torch.Tensor:
+    """Moving gradient with noise, (T, H, W, C) float in [0, 1]"""
+    y = torch.linspace(0, 1, height).view(1, height, 1, 1)
+    x = torch.linspace(0, 1, width).view(1, 1, width, 1)
+    t = torch.linspace(0, 1, frames).view(frames, 1, 1, 1)
+    base = torch.cat([(x + t) % 1.0, (y + t) % 1.0, (x * y + t) % 1.0], dim=-1)
+    return (base + 0.05 * torch.rand(frames, height, width, 3)).clamp_(0, 1)
+
+
+def legacy_path(video: torch.Tensor, path: str, min_pixels: int, max_pixels: int):
+    """mp4v re-encode at a hard-coded 2 fps, then decode through qwen_vl_utils"""
+    import cv2
+
+    frames = (video * 255).byte().cpu().numpy()
+    h, w = frames.shape[1], frames.shape[2]
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 2.0, (w, h))
+    for frame in frames:
+        out.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+    out.release()
+
+    from qwen_vl_utils import process_vision_info
+    messages = [{"role": "user", "content": [
+        {"type": "video", "video": path, "min_pixels": min_pixels, "max_pixels": max_pixels}
+    ]}]
+    _, video_inputs, video_kwargs = process_vision_info(messages, return_video_kwargs=True)
+    return video_inputs, video_kwargs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=128)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--min-pixels", type=int, default=128 * 32 * 32)
+    parser.add_argument("--max-pixels", type=int, default=768 * 32 * 32)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--checkpoint", default=None, help="local Qwen3-VL checkpoint to include the processor")
+    args = parser.parse_args()
+
+    media = load_module("qwen3vl_media")
+    video = synthetic_clip(args.frames, args.height, args.width)
+    media.attach_video_metadata(video, 30.0, list(range(0, args.frames * 15, 15)))
+
+    processor = None
+    if args.checkpoint:
+        from transformers import AutoProcessor
+        processor = AutoProcessor.from_pretrained(args.checkpoint)
+
+    def run_legacy():
+        with tempfile.TemporaryDirectory() as tmp:
+            video_inputs, video_kwargs = legacy_path(video, os.path.join(tmp, "clip.mp4"),
+                                                     args.min_pixels, args.max_pixels)
+            if processor is not None:
+                processor(text=["<|vision_start|><|video_pad|><|vision_end|>"], videos=video_inputs,
+                          return_tensors="pt", **video_kwargs)
+
+    def run_direct():
+        frames, metadata = media.prepare_video(video, args.min_pixels, args.max_pixels)
+        if processor is not None:
+            from transformers.video_utils import VideoMetadata
+            processor(text=["<|vision_start|><|video_pad|><|vision_end|>"], videos=[frames],
+                      video_metadata=[VideoMetadata(**metadata)], do_sample_frames=False, return_tensors="pt")
+
+    legacy = time_it(run_legacy, args.repeat)
+    direct = time_it(run_direct, args.repeat)
+    print_table(
+        f"Video tensor -> model inputs, {args.frames} frames {args.width}x{args.height}"
+        f"{' (incl. processor)' if processor is not None else ''}",
+        ["path", "mean ms", "min ms", "ms/frame"],
+        [
+            ["mp4 re-encode + decode", legacy["mean_ms"], legacy["min_ms"], legacy["mean_ms"] / args.frames],
+            ["direct frames", direct["mean_ms"], direct["min_ms"], direct["mean_ms"] / args.frames],
+        ],
+    )
+    print(f"speedup: {legacy['mean_ms'] / direct['mean_ms']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
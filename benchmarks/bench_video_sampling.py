@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark video frame sampling in LoadVideoForQwen3VL
+
+Compares the old loader (read() on every frame, keeping every n-th) with the
+planned sampler of qwen3vl_video_decode (grab/retrieve, seeking, and
+segmented decoding on a thread pool) on 1080p and 4K clips at several
+sampling rates. Reports wall time and the number of frames returned.
+
+Without --videos, synthetic clips (moving gradient, mp4v) are written to a
+temp dir first; real H.264/HEVC files give more representative seek costs.
+
+    python benchmarks/bench_video_sampling.py --fps 1,2,4 --workers 4
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from _bench_utils import load_module, print_table
+
+_SIZES = {"1080p": (1920, 1080), "4K": (3840, 2160)}
+
+
+def write_clip(path: str, width: int, height: int, seconds: int, fps: int = 30) -> None:
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    for index in range(seconds * fps):
+        shift = index * 4
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[..., 0] = (x + shift) % 256
+        frame[..., 1] = (y + shift) % 256
+        frame[..., 2] = (x[None, :] + y + shift) % 256 / 2
+        writer.write(frame)
+    writer.release()
+
+
+def read_every_frame(path: str, fps: int, max_frames: int) -> int:
+    """The loader before planned sampling"""
+    capture = cv2.VideoCapture(path)
+    frame_skip = max(1, int(capture.get(cv2.CAP_PROP_FPS) / fps))
+    kept = count = 0
+    while count < max_frames:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        if count % frame_skip == 0:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            kept += 1
+        count += 1
+    capture.release()
+    return kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", default=None, help="comma separated video files, synthetic when omitted")
+    parser.add_argument("--seconds", type=int, default=60, help="length of the synthetic clips")
+    parser.add_argument("--fps", default="1,2,4", help="sampling rates")
+    parser.add_argument("--max-frames", type=int, default=128)
+    parser.add_argument("--workers", type=int, default=4, help="threads for segmented decoding")
+    args = parser.parse_args()
+
+    decode = load_module("qwen3vl_video_decode")
+
+    if args.videos:
+        videos = [(os.path.basename(v), v) for v in args.videos.split(",")]
+    else:
+        folder = tempfile.mkdtemp(prefix="qwen3vl-video-")
+        videos = []
+        for label, (width, height) in _SIZES.items():
+            path = os.path.join(folder, f"{label}.mp4")
+            print(f"Writing {args.seconds}s {label} clip to {path}")
+            write_clip(path, width, height, args.seconds)
+            videos.append((label, path))
+
+    methods = [
+        ("read all (old)", lambda path, fps: read_every_frame(path, fps, args.max_frames)),
+        ("grab", lambda path, fps: len(decode.sample_video(path, fps, args.max_frames, "grab")[0])),
+        ("seek", lambda path, fps: len(decode.sample_video(path, fps, args.max_frames, "seek")[0])),
+        ("auto", lambda path, fps: len(decode.sample_video(path, fps, args.max_frames, "auto")[0])),
+        (f"auto x{args.workers} threads",
+         lambda path, fps: len(decode.sample_video(path, fps, args.max_frames, "auto", args.workers)[0])),
+    ]
+
+    rows = []
+    for label, path in videos:
+        info = decode.video_info(path)
+        for fps in (int(f) for f in args.fps.split(",")):
+            for name, method in methods:
+                started = time.perf_counter()
+                frames = method(path, fps)
+                rows.append([label, fps, name, frames, time.perf_counter() - started])
+        print(f"{label}: {info.frame_count} frames at {info.fps:.2f} fps")
+
+    print_table(
+        f"max_frames={args.max_frames}",
+        ["video", "sample fps", "method", "frames", "seconds"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
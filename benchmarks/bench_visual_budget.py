@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark the visual token budget and redundant frame pruning
+
+Runs a fixed eval set at several visual-token budgets, with and without
+pruning of redundant video frames, and reports visual tokens, prefill time,
+peak device memory and answer accuracy (expected answer contained in the
+response, case-insensitive).
+
+The eval set is a JSONL file with one {"question", "answer"} entry per line
+plus "image" (image file) and/or "video" (video file, decoded with OpenCV).
+Without --eval-set a small synthetic set is used: solid color images and
+mostly static clips whose square changes color once.
+
+    python benchmarks/bench_visual_budget.py --checkpoint models/qwen3vl/Qwen3-VL-4B-Instruct
+"""
+
+import argparse
+import json
+import os
+from typing import Any, Dict, List
+
+import torch
+
+from _bench_utils import load_module, print_table
+
+_COLORS = {"red": (1.0, 0.0, 0.0), "green": (0.0, 0.8, 0.0), "blue": (0.0, 0.0, 1.0), "yellow": (1.0, 1.0, 0.0)}
+
+
+def synthetic_eval_set() -> List[Dict[str, Any]]:
+    """Color questions on 1024x768 images and 64-frame mostly static 720p clips"""
+    samples = []
+    names = list(_COLORS)
+    for name in names:
+        image = torch.tensor(_COLORS[name]).view(1, 1, 1, 3).expand(1, 768, 1024, 3).clone()
+        samples.append({"question": "What color is this image? Answer with one word.", "answer": name,
+                        "image": image})
+    for first, last in zip(names, names[1:] + names[:1]):
+        clip = torch.full((64, 720, 1280, 3), 0.5)
+        clip[:48, 260:460, 540:740] = torch.tensor(_COLORS[first])
+        clip[48:, 260:460, 540:740] = torch.tensor(_COLORS[last])
+        samples.append({"question": "The square changes color once. What color is it at the end? "
+                                    "Answer with one word.", "answer": last, "video": clip})
+    return samples
+
+
+def load_eval_set(path: str, max_frames: int) -> List[Dict[str, Any]]:
+    import cv2
+    import numpy as np
+
+    samples = []
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "image" in entry:
+                image = cv2.cvtColor(cv2.imread(os.path.join(base, entry["image"])), cv2.COLOR_BGR2RGB)
+                entry["image"] = torch.from_numpy(image).float().div(255.0).unsqueeze(0)
+            if "video" in entry:
+                capture = cv2.VideoCapture(os.path.join(base, entry["video"]))
+                total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+                wanted = set(np.linspace(0, max(0, total - 1), min(max_frames, total)).round().astype(int).tolist())
+                frames = []
+                for index in range(total):
+                    ok, frame = capture.read()
+                    if not ok:
+                        break
+                    if index in wanted:
+                        frames.append(torch.from_numpy(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+                capture.release()
+                entry["video"] = torch.stack(frames).float().div(255.0)
+            samples.append(entry)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", required=True, help="local Qwen3-VL checkpoint directory")
+    parser.add_argument("--eval-set", default=None, help="JSONL eval set, synthetic when omitted")
+    parser.add_argument("--budgets", default="0,8192,4096,2048,1024", help="visual token budgets, 0 = none")
+    parser.add_argument("--min-pixels", type=int, default=256 * 32 * 32)
+    parser.add_argument("--max-pixels", type=int, default=768 * 32 * 32)
+    parser.add_argument("--max-frames", type=int, default=128)
+    parser.add_argument("--threshold", type=float, default=3.0, help="redundancy threshold for pruning")
+    parser.add_argument("--max-new-tokens", type=int, default=16)
+    args = parser.parse_args()
+
+    from transformers import AutoProcessor, Qwen3VLForConditionalGeneration
+
+    media = load_module("qwen3vl_media")
+    budget_module = load_module("qwen3vl_visual_budget")
+    generation = load_module("qwen3vl_generation")
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    dtype = torch.bfloat16 if device.type == "cuda" else torch.float32
+    processor = AutoProcessor.from_pretrained(args.checkpoint)
+    model = Qwen3VLForConditionalGeneration.from_pretrained(args.checkpoint, dtype=dtype).to(device).eval()
+    samples = load_eval_set(args.eval_set, args.max_frames) if args.eval_set else synthetic_eval_set()
+
+    rows = []
+    for budget in (int(b) for b in args.budgets.split(",")):
+        for prune in (False, True):
+            tokens = prefill = peak = correct = 0.0
+            for sample in samples:
+                image, video = sample.get("image"), sample.get("video")
+                plan = None
+                if budget > 0:
+                    plan = budget_module.plan_visual_budget(
+                        budget, args.min_pixels, args.max_pixels,
+                        tuple(image.shape[:3]) if image is not None else None,
+                        tuple(video.shape[:3]) if video is not None else None,
+                    )
+                conversation = generation.Conversation(prompt=sample["question"])
+                if image is not None:
+                    image_max = plan.image_max_pixels if plan is not None else args.max_pixels
+                    conversation.images = media.prepare_images(image, None, min(args.min_pixels, image_max),
+                                                               image_max)
+                if video is not None:
+                    frames = budget_module.select_frames(video, plan.video_frames) if plan is not None else video
+                    conversation.video_frames, conversation.video_metadata = media.prepare_video(
+                        frames, args.min_pixels, args.max_pixels, plan.video_max_pixels if plan is not None else None
+                    )
+                    if prune:
+                        conversation.video_frames, conversation.video_metadata, _ = \
+                            budget_module.prune_redundant_frames(conversation.video_frames,
+                                                                 conversation.video_metadata, args.threshold)
+
+                if device.type == "cuda":
+                    torch.cuda.reset_peak_memory_stats()
+                text, stats = generation.generate_streaming(model, processor, conversation, device,
+                                                            max_new_tokens=args.max_new_tokens, do_sample=False)
+                if device.type == "cuda":
+                    peak += torch.cuda.max_memory_allocated() / 1024 ** 3
+                tokens += conversation.visual_tokens()
+                prefill += stats.get("prefill_seconds", 0.0)
+                correct += sample["answer"].lower() in text.lower()
+
+            count = len(samples)
+            rows.append([budget or "none", "yes" if prune else "no", tokens / count, prefill / count,
+                         peak / count if device.type == "cuda" else "-", correct / count])
+
+    print_table(
+        f"{len(samples)} samples, {device.type}, max_pixels={args.max_pixels}",
+        ["budget", "prune", "visual tokens", "prefill s", "peak GB", "accuracy"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
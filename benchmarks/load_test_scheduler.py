@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Load-test harness for the Qwen3-VL request scheduler
+
+Several client threads submit requests with exponential inter-arrival times
+and wait for their responses. For each (max_batch_size, max_wait_ms) setting
+the harness reports throughput, latency percentiles and the average batch
+size, to pick the throughput/latency trade-off for local.scheduler.
+The concurrent clients are simulated: ComfyUI's executor runs nodes one at a
+time, so a single workflow never has a second caller and its requests are
+dispatched without waiting.
+
+Without --checkpoint the model is simulated: a batch costs a prefill time
+proportional to its prompt tokens plus a per-step decode time that barely
+grows with batch size, which is how a memory-bound decoder behaves.
+
+    python benchmarks/load_test_scheduler.py --clients 8 --rate 4
+    python benchmarks/load_test_scheduler.py --checkpoint models/qwen3vl/Qwen3-VL-4B-Instruct
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+
+from _bench_utils import load_module, print_table
+
+
+class SimulatedTokenizer:
+    pad_token_id = 0
+
+    def __call__(self, text, add_special_tokens=False):
+        return {"input_ids": text.split()}
+
+
+class SimulatedProcessor:
+    """Just enough of a processor for the scheduler's token estimate"""
+    tokenizer = SimulatedTokenizer()
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=True):
+        return " ".join(c["text"] for c in messages[0]["content"] if c["type"] == "text")
+
+
+def simulated_run_batch(prefill_ms_per_token, decode_ms_per_step, decode_ms_per_row):
+    def run_batch(model, processor, conversations, device, max_batch_size, max_new_tokens=64, **kwargs):
+        prompt_tokens = sum(len(c.prompt.split()) + c.visual_tokens() for c in conversations)
+        step_ms = decode_ms_per_step + decode_ms_per_row * len(conversations)
+        seconds = (prompt_tokens * prefill_ms_per_token + max_new_tokens * step_ms) / 1000.0
+        time.sleep(seconds)
+        return ["ok"] * len(conversations), {"generated_tokens": max_new_tokens * len(conversations),
+                                             "seconds": seconds}
+    return run_batch
+
+
+def run_load(scheduler, model, processor, device, generation, args):
+    latencies, lock = [], threading.Lock()
+    prompt = " ".join(["word"] * args.prompt_tokens)
+
+    def client(seed):
+        rng = random.Random(seed)
+        for _ in range(args.requests):
+            time.sleep(rng.expovariate(args.rate))
+            started = time.perf_counter()
+            future = scheduler.submit("load-test", model, processor, device,
+                                      [generation.Conversation(prompt=prompt)],
+                                      max_new_tokens=args.max_new_tokens)[0]
+            future.result()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    stats = scheduler.stats()
+    return {
+        "req_per_s": len(latencies) / wall,
+        "tok_per_s": stats["generated_tokens"] / wall,
+        "p50_ms": statistics.median(latencies) * 1000.0,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000.0,
+        "avg_batch": stats["avg_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default=None, help="local Qwen3-VL checkpoint, simulated model if omitted")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=8, help="requests per client")
+    parser.add_argument("--rate", type=float, default=2.0, help="requests per second per client")
+    parser.add_argument("--prompt-tokens", type=int, default=64)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--batch-sizes", default="1,4,8")
+    parser.add_argument("--waits-ms", default="0,20,50")
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.05)
+    parser.add_argument("--decode-ms-per-step", type=float, default=20.0)
+    parser.add_argument("--decode-ms-per-row", type=float, default=1.0)
+    args = parser.parse_args()
+
+    scheduler_module = load_module("qwen3vl_scheduler")
+    generation = load_module("qwen3vl_generation")
+
+    if args.checkpoint:
+        import torch
+        from transformers import AutoProcessor, Qwen3VLForConditionalGeneration
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        processor = AutoProcessor.from_pretrained(args.checkpoint)
+        model = Qwen3VLForConditionalGeneration.from_pretrained(
+            args.checkpoint, dtype=torch.bfloat16 if device == "cuda" else torch.float32
+        ).to(device).eval()
+        run_batch = generation.generate_batch
+    else:
+        device, model, processor = "cpu", None, SimulatedProcessor()
+        run_batch = simulated_run_batch(args.prefill_ms_per_token, args.decode_ms_per_step, args.decode_ms_per_row)
+
+    rows = []
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        for wait_ms in (float(w) for w in args.waits_ms.split(",")):
+            scheduler = scheduler_module.Qwen3VLScheduler(batch_size, wait_ms, run_batch=run_batch)
+            result = run_load(scheduler, model, processor, device, generation, args)
+            rows.append([batch_size, wait_ms, result["req_per_s"], result["tok_per_s"],
+                         result["p50_ms"], result["p95_ms"], result["avg_batch"]])
+
+    print_table(
+        f"{args.clients} clients x {args.requests} requests at {args.rate}/s each "
+        f"({'model' if args.checkpoint else 'simulated'})",
+        ["max_batch", "wait_ms", "req/s", "tok/s", "p50 ms", "p95 ms", "avg batch"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
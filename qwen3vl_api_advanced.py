@@ -7,11 +7,12 @@ import os
 import json
 import base64
 import requests
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Union
 import io
 import numpy as np
 import urllib3
 from .qwen3vl_config import get_config
+from .qwen3vl_video_decode import API_VIDEO_MAX_UPLOAD_BYTES, api_file_frames, api_tensor_frames
 
 # 禁用 SSL 警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -123,15 +124,8 @@ class Qwen3VLAPIAdvanced:
         base_url = provider_info.get('base_url', '')
         provider_name = provider_info.get('name', provider)
 
-        # Clean model name - remove tags like [Comfly-T8]
-        import re
-        clean_model_name = re.sub(r'\[.*?\]', '', model_name).strip()
-
-        # Use provided model name, or default
-        if not clean_model_name or clean_model_name == "":
-            clean_model_name = self.config.get_default_model()
-
-        model_name = clean_model_name
+        # Clean model name - remove tags like [Comfly-T8], falls back to the default model
+        model_name = self.config.get_clean_model_name(model_name)
 
         # Use provided API key, or config file, or environment variable
         if not api_key:
@@ -162,7 +156,13 @@ class Qwen3VLAPIAdvanced:
                 image_count += 1
 
         # Add video if provided
-        if video is not None:
+        if video is not None and hasattr(video, 'dim'):
+            # Frame tensor (Load Video / Extract Keyframes): sent as an image sequence
+            content.append({
+                "type": "video",
+                "video": api_tensor_frames(video)
+            })
+        elif video is not None:
             # Handle VIDEO type from LoadVideo node (dict with 'video_name' key)
             if isinstance(video, dict) and 'video_name' in video:
                 video_path = video['video_name']
@@ -174,8 +174,14 @@ class Qwen3VLAPIAdvanced:
 
             if video_path:
                 video_url = self._process_video(video_path)
+                if isinstance(video_url, list):
+                    # Frames sampled from a file too large to upload
+                    content.append({
+                        "type": "video",
+                        "video": video_url
+                    })
                 # Only add video if it's a valid URL or Base64 data
-                if video_url and (video_url.startswith(('http://', 'https://', 'data:'))):
+                elif video_url and (video_url.startswith(('http://', 'https://', 'data:'))):
                     content.append({
                         "type": "video_url",
                         "video_url": {"url": video_url}
@@ -262,7 +268,7 @@ class Qwen3VLAPIAdvanced:
 
         return f"data:image/png;base64,{img_b64}"
     
-    def _process_video(self, video_input: str) -> str:
+    def _process_video(self, video_input: str) -> Union[str, List[str], None]:
         """Process video input"""
         # If it's a URL, return as-is
         if video_input.startswith(('http://', 'https://')):
@@ -273,14 +279,9 @@ class Qwen3VLAPIAdvanced:
             file_size = os.path.getsize(video_input)
             file_size_mb = file_size / 1024 / 1024
 
-            # API has a 20MB limit for base64 strings
-            # Base64 encoding increases size by ~33%, so limit original file to ~15MB
-            max_size_bytes = 15 * 1024 * 1024
-            if file_size > max_size_bytes:
-                print(f"[Qwen3VL API Advanced] ⚠️ Video file too large: {file_size_mb:.2f}MB")
-                print(f"[Qwen3VL API Advanced] ⚠️ Maximum supported size: 15MB (API base64 limit)")
-                print(f"[Qwen3VL API Advanced] ⚠️ Please use a smaller video or upload to a URL")
-                return None
+            if file_size > API_VIDEO_MAX_UPLOAD_BYTES:
+                # Send sampled frames as an image sequence instead of the file
+                return api_file_frames(video_input, self.config.get_video_backend(), "[Qwen3VL API Advanced]") or None
 
             # Encode to Base64
             with open(video_input, 'rb') as f:
@@ -0,0 +1,139 @@
+"""
+Attention Backend Auto-Tuner for Qwen3-VL
+Times a short prefill and decode with every attention implementation that
+works on this install and remembers the fastest one per machine, model,
+dtype and library versions in a JSON file
+"""
+
+import hashlib
+import json
+import os
+import platform
+import threading
+from typing import Dict, List, Optional
+
+import torch
+
+from .qwen3vl_generation import Conversation, generate_streaming
+from .qwen3vl_media import prepare_images
+
+_cache_lock = threading.Lock()
+
+
+def _library_version(name: str) -> str:
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return "unknown"
+
+
+def machine_fingerprint(device: torch.device) -> str:
+    """Short hash of the CPU model, OS and the inference GPU with its CUDA version"""
+    parts = [platform.system(), platform.machine()]
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            parts.extend(line.split(":", 1)[1].strip() for line in f if line.startswith("model name"))
+    except OSError:
+        parts.append(platform.processor())
+    if device.type == "cuda":
+        index = device.index if device.index is not None else torch.cuda.current_device()
+        parts.extend([torch.cuda.get_device_name(index), str(torch.cuda.get_device_capability(index)),
+                      str(torch.version.cuda)])
+    return hashlib.blake2b("|".join(sorted(set(parts))).encode(), digest_size=8).hexdigest()
+
+
+def tuning_key(device: torch.device, model_id: str, dtype: torch.dtype) -> str:
+    """Cache key: machine, model (with quantization), dtype and the versions that ship the kernels"""
+    return "|".join([
+        machine_fingerprint(device), model_id, str(dtype).replace("torch.", ""),
+        f"torch{torch.__version__}", f"transformers{_library_version('transformers')}",
+        f"flash_attn{_library_version('flash-attn')}",
+    ])
+
+
+def available_backends(device: torch.device, dtype: torch.dtype) -> List[str]:
+    """Attention implementations that can run here, fastest candidates first"""
+    backends = []
+    if device.type == "cuda" and dtype in (torch.float16, torch.bfloat16):
+        index = device.index if device.index is not None else torch.cuda.current_device()
+        try:
+            import flash_attn  # noqa: F401
+            if torch.cuda.get_device_capability(index)[0] >= 8:
+                backends.append("flash_attention_2")
+        except ImportError:
+            pass
+    if hasattr(torch.nn.functional, "scaled_dot_product_attention"):
+        backends.append("sdpa")
+    backends.append("eager")
+    return backends
+
+
+def read_decision(cache_file: str, key: str) -> Optional[str]:
+    """Cached backend for a key, None when it was never tuned"""
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            entry = json.load(f).get(key)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return entry.get("backend") if isinstance(entry, dict) else None
+
+
+def store_decision(cache_file: str, key: str, backend: str, timings: Dict[str, Optional[float]]) -> None:
+    """Add a decision to the cache file (written atomically, a failure only costs the cache)"""
+    with _cache_lock:
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                decisions = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            decisions = {}
+        decisions[key] = {"backend": backend, "seconds": timings}
+        tmp_file = f"{cache_file}.tmp-{os.getpid()}"
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(decisions, f, indent=2)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"[Qwen3-VL] ⚠️ Could not save attention tuning ({e})")
+
+
+def set_attention(model: torch.nn.Module, backend: str) -> None:
+    """Switch the attention implementation of a loaded model, vision tower included"""
+    if hasattr(model, "set_attn_implementation"):
+        model.set_attn_implementation(backend)
+        return
+    for module in model.modules():
+        config = getattr(module, "config", None)
+        if config is not None and hasattr(config, "_attn_implementation"):
+            config._attn_implementation = backend
+
+
+def tune_attention(model, processor, device: torch.device, backends: List[str], current: str,
+                   prompt_tokens: int = 512, decode_tokens: int = 32) -> Dict[str, Optional[float]]:
+    """
+    Seconds for a ~``prompt_tokens`` prefill (small image included) plus
+    ``decode_tokens`` greedy tokens per backend, None for backends that fail
+
+    Each backend gets one untimed warmup run. The model is switched back to
+    ``current`` afterwards.
+    """
+    conversation = Conversation(
+        prompt=" ".join(["benchmark"] * max(1, prompt_tokens - 64)),
+        images=prepare_images(torch.zeros(1, 224, 224, 3), None, 64 * 32 * 32, 64 * 32 * 32),
+    )
+    kwargs = dict(max_new_tokens=decode_tokens, min_new_tokens=decode_tokens, do_sample=False)
+    timings: Dict[str, Optional[float]] = {}
+    try:
+        for backend in backends:
+            try:
+                set_attention(model, backend)
+                generate_streaming(model, processor, conversation, device, max_new_tokens=2, do_sample=False)
+                _, stats = generate_streaming(model, processor, conversation, device, **kwargs)
+                timings[backend] = stats["seconds"]
+            except Exception as e:
+                print(f"[Qwen3-VL] ⚠️ Attention backend {backend} failed: {e}")
+                timings[backend] = None
+    finally:
+        set_attention(model, current)
+    return timings
@@ -0,0 +1,189 @@
+"""
+Compiled Decode for Qwen3-VL
+Static, pre-allocated KV caches in bucketed sizes plus a torch.compile'd
+decode step, so per-token Python overhead stops dominating small batches
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import torch
+
+from .qwen3vl_config import get_config
+
+
+def bucket_length(length: int, min_bucket: int = 1024) -> int:
+    """Smallest power of two >= length (at least ``min_bucket``); one compiled graph per bucket"""
+    bucket = max(1, min_bucket)
+    while bucket < length:
+        bucket *= 2
+    return bucket
+
+
+def _new_static_cache(model, max_cache_len: int, device: torch.device, dtype: torch.dtype):
+    from transformers import StaticCache
+    try:
+        # transformers >= 4.56: layers are allocated on first use
+        return StaticCache(config=model.config, max_cache_len=max_cache_len)
+    except TypeError:
+        return StaticCache(config=model.config.get_text_config(), max_batch_size=1,
+                           max_cache_len=max_cache_len, device=device, dtype=dtype)
+
+
+def _cache_bytes(cache) -> int:
+    """Memory of a StaticCache's key/value tensors (per-layer objects or the older flat lists)"""
+    tensors = []
+    for layer in getattr(cache, "layers", None) or []:
+        tensors += [getattr(layer, "keys", None), getattr(layer, "values", None)]
+    tensors += list(getattr(cache, "key_cache", None) or []) + list(getattr(cache, "value_cache", None) or [])
+    return sum(t.numel() * t.element_size() for t in tensors if isinstance(t, torch.Tensor))
+
+
+class Qwen3VLCompiledDecode:
+    """
+    Generate kwargs for compiled decoding of single requests
+
+    KV caches are allocated per (model, length bucket) and reset instead of
+    reallocated on reuse; the ``max_cached`` most recent ones are kept, and a
+    model's caches are dropped when ComfyUI offloads it (``release_model``).
+    The decode step is compiled here with torch.compile, once per model, on
+    any device (transformers' own auto-compile only runs on CUDA and is
+    disabled); prefill stays eager, it sees different media shapes every
+    time, and the graph is reused while the cache shape is the same.
+    """
+
+    def __init__(self, min_bucket: int = 1024, max_cache_tokens: int = 32768,
+                 mode: str = "reduce-overhead", max_cached: int = 2):
+        self.min_bucket = min_bucket
+        self.max_cache_tokens = max_cache_tokens
+        self.mode = mode
+        self.max_cached = max_cached
+        self._caches: "OrderedDict[Tuple[int, int], Any]" = OrderedDict()
+        self._compiled_buckets = set()
+        self._forwards: Dict[int, Callable] = {}
+        self._lock = threading.Lock()
+
+    def _compiled_forward(self, model) -> Callable:
+        with self._lock:
+            forward = self._forwards.get(id(model))
+            if forward is None:
+                # The unbound forward, a bound one would keep the model alive
+                forward = torch.compile(type(model).forward, fullgraph=False, dynamic=False, mode=self.mode)
+                self._forwards[id(model)] = forward
+            return forward
+
+    @contextmanager
+    def decoding(self, model, cache):
+        """
+        Route the decode steps of one ``model.generate`` call with ``cache``
+        (from ``generate_kwargs``) through the compiled forward; the first
+        call is the prefill and stays eager
+        """
+        compiled = self._compiled_forward(model)
+        eager = model.forward
+        previous = model.__dict__.get("forward")
+        prefill = [True]
+
+        def forward(*args, **kwargs):
+            if prefill[0] or kwargs.get("past_key_values") is not cache:
+                prefill[0] = False
+                return eager(*args, **kwargs)
+            return compiled(model, *args, **kwargs)
+
+        model.forward = forward
+        try:
+            yield
+        finally:
+            if previous is None:
+                del model.forward
+            else:
+                model.forward = previous
+
+    def cache_length(self, input_length: int, max_new_tokens: int) -> int:
+        """Static cache length a single request would use, 0 when it decodes eagerly"""
+        bucket = bucket_length(input_length + max_new_tokens, self.min_bucket)
+        return bucket if bucket <= self.max_cache_tokens else 0
+
+    def cache_bytes(self, model=None, length: int = 0) -> int:
+        """
+        Device memory held by the cached static KV caches, without the one a
+        request of ``length`` on ``model`` would reuse
+        """
+        with self._lock:
+            return sum(_cache_bytes(cache) for key, cache in self._caches.items()
+                       if model is None or key != (id(model), length))
+
+    def generate_kwargs(self, model, input_ids: torch.Tensor, max_new_tokens: int) -> Tuple[Dict[str, Any], bool]:
+        """
+        (kwargs, first_use) for ``model.generate``; kwargs are empty when the
+        request doesn't fit (batched, or longer than ``max_cache_tokens``)
+        """
+        bucket = self.cache_length(input_ids.shape[1], max_new_tokens)
+        if input_ids.shape[0] != 1 or not bucket:
+            return {}, False
+
+        key = (id(model), bucket)
+        with self._lock:
+            cache = self._caches.pop(key, None)
+            if cache is None:
+                while len(self._caches) >= self.max_cached:
+                    self._caches.popitem(last=False)
+                cache = _new_static_cache(model, bucket, input_ids.device, model.dtype)
+                if id(model) not in self._forwards and not any(k[0] == id(model) for k in self._caches):
+                    # Free the caches once the model pool drops the model
+                    weakref.finalize(model, self._drop_model, id(model))
+            else:
+                cache.reset()
+            self._caches[key] = cache
+            first_use = key not in self._compiled_buckets
+            self._compiled_buckets.add(key)
+        # The decode step is compiled by ``decoding``, not by transformers
+        return {"past_key_values": cache, "disable_compile": True}, first_use
+
+    def _drop_model(self, model_id: int) -> None:
+        with self._lock:
+            for key in [k for k in self._caches if k[0] == model_id]:
+                del self._caches[key]
+            self._compiled_buckets = {k for k in self._compiled_buckets if k[0] != model_id}
+            self._forwards.pop(model_id, None)
+
+    def release_model(self, model) -> None:
+        """Free a model's KV caches, e.g. when it leaves the GPU; compiled graphs are kept"""
+        with self._lock:
+            for key in [k for k in self._caches if k[0] == id(model)]:
+                del self._caches[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._caches.clear()
+            self._forwards.clear()
+            self._compiled_buckets.clear()
+
+
+# Global compiled decode instance
+_compiled_decode = None
+_compiled_decode_settings = None
+
+
+def release_static_caches(model) -> None:
+    """Free the static KV caches of a model that is being offloaded"""
+    if _compiled_decode is not None:
+        _compiled_decode.release_model(model)
+
+
+def get_compiled_decode() -> Optional[Qwen3VLCompiledDecode]:
+    """Get global compiled decode helper, None when disabled in the config"""
+    global _compiled_decode, _compiled_decode_settings
+    config = get_config()
+    if not config.is_compiled_decode_enabled():
+        return None
+
+    settings = (config.get_compiled_decode_min_bucket(), config.get_compiled_decode_max_cache_tokens(),
+                config.get_compiled_decode_mode())
+    if _compiled_decode is None or settings != _compiled_decode_settings:
+        _compiled_decode = Qwen3VLCompiledDecode(*settings)
+        _compiled_decode_settings = settings
+    return _compiled_decode
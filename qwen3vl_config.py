@@ -4,27 +4,182 @@ Handles loading and managing configuration from JSON file
 """
 
 import os
+import re
 import json
-from typing import Any, Dict, List, Optional
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
 
+# Seconds between two mtime checks of the config file
+RELOAD_CHECK_INTERVAL = 1.0
+
+_DEFAULT_BASE_URL = 'https://dashscope.aliyuncs.com/compatible-mode/v1'
+
+
+@dataclass(frozen=True)
+class ModelInfo:
+    """Validated entry of ``models.available``"""
+    name: str
+    display_name: str
+    description: str = ""
+    max_tokens: int = 4096
+    vision_capable: bool = True
+    video_capable: bool = True
+    raw: Dict[str, Any] = field(default_factory=dict, compare=False, repr=False)
+
+
+@dataclass(frozen=True)
+class ProviderInfo:
+    """Validated entry of ``api.providers``"""
+    key: str
+    name: str
+    base_url: str
+    api_key: str = ""
+    max_images: int = 4
+    compression_quality: int = 85
+    raw: Dict[str, Any] = field(default_factory=dict, compare=False, repr=False)
+
+
+@dataclass(frozen=True)
+class CompiledConfig:
+    """Immutable, indexed snapshot of the configuration file"""
+    raw: Dict[str, Any]
+    flat: Dict[str, Any]
+    models: Tuple[ModelInfo, ...]
+    models_by_name: Dict[str, ModelInfo]
+    models_by_display_name: Dict[str, ModelInfo]
+    clean_names: Dict[str, str]
+    providers: Dict[str, ProviderInfo]
+    model_display_names: Tuple[str, ...]
+    provider_keys: Tuple[str, ...]
+    mtime: Optional[float] = None
+
+
+def clean_model_name(display_name: str) -> str:
+    """Remove provider tags like ``[Comfly-T8]`` from a model display name"""
+    return re.sub(r'\[.*?\]', '', display_name).strip()
+
+
+def _flatten(value: Any, prefix: str, out: Dict[str, Any]) -> None:
+    """Index every dot-notation path of a nested dict"""
+    if not isinstance(value, dict):
+        return
+    for k, v in value.items():
+        path = f"{prefix}.{k}" if prefix else str(k)
+        out[path] = v
+        _flatten(v, path, out)
+
+
+def _as_int(value: Any, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _compile_models(models: Any) -> Tuple[ModelInfo, ...]:
+    if not isinstance(models, list):
+        if models is not None:
+            print(f"[Qwen3VL Config] ⚠️ 'models.available' must be a list, ignoring it")
+        return ()
+
+    compiled = []
+    for entry in models:
+        if not isinstance(entry, dict) or not entry.get('name'):
+            print(f"[Qwen3VL Config] ⚠️ Skipping invalid model entry: {entry!r}")
+            continue
+        compiled.append(ModelInfo(
+            name=str(entry['name']),
+            display_name=str(entry.get('display_name') or entry['name']),
+            description=str(entry.get('description', '')),
+            max_tokens=_as_int(entry.get('max_tokens'), 4096),
+            vision_capable=bool(entry.get('vision_capable', True)),
+            video_capable=bool(entry.get('video_capable', True)),
+            raw=entry,
+        ))
+    return tuple(compiled)
+
+
+def _compile_providers(providers: Any) -> Dict[str, ProviderInfo]:
+    if not isinstance(providers, dict):
+        if providers is not None:
+            print(f"[Qwen3VL Config] ⚠️ 'api.providers' must be an object, ignoring it")
+        return {}
+
+    compiled = {}
+    for key, entry in providers.items():
+        if not isinstance(entry, dict) or not entry.get('base_url'):
+            print(f"[Qwen3VL Config] ⚠️ Skipping invalid provider entry: {key!r}")
+            continue
+        compiled[key] = ProviderInfo(
+            key=key,
+            name=str(entry.get('name', key)),
+            base_url=str(entry['base_url']).rstrip('/'),
+            api_key=str(entry.get('api_key') or ''),
+            max_images=_as_int(entry.get('max_images'), 4),
+            compression_quality=_as_int(entry.get('compression_quality'), 85),
+            raw=entry,
+        )
+    return compiled
+
+
+def compile_config(raw: Dict[str, Any], mtime: Optional[float] = None) -> CompiledConfig:
+    """Validate a raw config dict and build its lookup tables"""
+    flat: Dict[str, Any] = {}
+    _flatten(raw, "", flat)
+
+    models = _compile_models(flat.get('models.available'))
+    providers = _compile_providers(flat.get('api.providers'))
+
+    models_by_name: Dict[str, ModelInfo] = {}
+    models_by_display_name: Dict[str, ModelInfo] = {}
+    clean_names: Dict[str, str] = {}
+    for model in models:
+        # First entry wins, matching the previous linear scan
+        models_by_name.setdefault(model.name, model)
+        models_by_display_name.setdefault(model.display_name, model)
+        clean_names.setdefault(model.display_name, clean_model_name(model.display_name))
+
+    return CompiledConfig(
+        raw=raw,
+        flat=flat,
+        models=models,
+        models_by_name=models_by_name,
+        models_by_display_name=models_by_display_name,
+        clean_names=clean_names,
+        providers=providers,
+        model_display_names=tuple(models_by_display_name.keys()),
+        provider_keys=tuple(providers.keys()) or ('dashscope',),
+        mtime=mtime,
+    )
+
+
 class Qwen3VLConfig:
     """Configuration manager for Qwen3-VL API"""
     
     _instance = None
-    _config = None
+    _compiled: Optional[CompiledConfig] = None
     
     def __new__(cls):
         """Singleton pattern"""
         if cls._instance is None:
             cls._instance = super(Qwen3VLConfig, cls).__new__(cls)
+            cls._instance._reload_lock = threading.Lock()
+            cls._instance._next_check = 0.0
         return cls._instance
     
     def __init__(self):
         """Initialize configuration"""
-        if self._config is None:
+        if self._compiled is None:
             self.load_config()
+
+    @property
+    def _config(self) -> Dict[str, Any]:
+        """Raw configuration dict of the current snapshot"""
+        return self.snapshot().raw
     
     @staticmethod
     def get_config_path() -> str:
@@ -32,48 +187,82 @@ class Qwen3VLConfig:
         config_dir = os.path.dirname(__file__)
         config_path = os.path.join(config_dir, "Qwen3-VL-config.json")
         return config_path
+
+    @staticmethod
+    def _get_mtime(config_path: str) -> Optional[float]:
+        try:
+            return os.stat(config_path).st_mtime
+        except OSError:
+            return None
     
     def load_config(self) -> None:
         """Load configuration from JSON file"""
         config_path = self.get_config_path()
+        mtime = self._get_mtime(config_path)
         
-        if not os.path.exists(config_path):
+        if mtime is None:
             print(f"[Qwen3VL Config] ⚠️ Config file not found: {config_path}")
             print(f"[Qwen3VL Config] Using default configuration")
-            self._config = self._get_default_config()
+            self._compiled = compile_config(self._get_default_config())
             return
         
         try:
             with open(config_path, 'r', encoding='utf-8') as f:
-                self._config = json.load(f)
+                raw = json.load(f)
+            if not isinstance(raw, dict):
+                raise ValueError("top-level value must be an object")
+            # Swapping a single reference keeps readers on a consistent snapshot
+            self._compiled = compile_config(raw, mtime)
             print(f"[Qwen3VL Config] ✓ Config loaded from: {config_path}")
         except json.JSONDecodeError as e:
             print(f"[Qwen3VL Config] ⚠️ Invalid JSON in config file: {e}")
-            print(f"[Qwen3VL Config] Using default configuration")
-            self._config = self._get_default_config()
+            self._fallback(mtime)
         except Exception as e:
             print(f"[Qwen3VL Config] ⚠️ Error loading config: {e}")
+            self._fallback(mtime)
+
+    def _fallback(self, mtime: Optional[float]) -> None:
+        """Keep the last good config on a broken edit, defaults otherwise"""
+        if self._compiled is not None and self._compiled.mtime is not None:
+            print(f"[Qwen3VL Config] Keeping previously loaded configuration")
+            self._compiled = compile_config(self._compiled.raw, mtime)
+        else:
             print(f"[Qwen3VL Config] Using default configuration")
-            self._config = self._get_default_config()
+            self._compiled = compile_config(self._get_default_config(), mtime)
     
     def reload_config(self) -> None:
         """Reload configuration from file"""
-        self._config = None
-        self.load_config()
+        with self._reload_lock:
+            self.load_config()
+
+    def _maybe_reload(self) -> None:
+        """Reload when the config file mtime changed, without blocking readers"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + RELOAD_CHECK_INTERVAL
+
+        current = self._compiled
+        if current is not None and self._get_mtime(self.get_config_path()) == current.mtime:
+            return
+
+        # Another thread is already reloading: keep serving the old snapshot
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            print(f"[Qwen3VL Config] Config file changed, reloading")
+            self.load_config()
+        finally:
+            self._reload_lock.release()
+
+    def snapshot(self) -> CompiledConfig:
+        """Get the current compiled configuration"""
+        self._maybe_reload()
+        return self._compiled
     
     def get(self, key: str, default: Any = None) -> Any:
         """Get configuration value by dot-notation key"""
-        keys = key.split('.')
-        value = self._config
-        
-        for k in keys:
-            if isinstance(value, dict):
-                value = value.get(k)
-                if value is None:
-                    return default
-            else:
-                return default
-        
+        value = self.snapshot().flat.get(key)
         return value if value is not None else default
     
     def get_provider(self) -> str:
@@ -82,29 +271,30 @@ class Qwen3VLConfig:
 
     def get_available_providers(self) -> List[str]:
         """Get list of available API providers"""
-        providers = self.get('api.providers', {})
-        return list(providers.keys()) if isinstance(providers, dict) else ['dashscope']
+        return list(self.snapshot().provider_keys)
 
-    def get_provider_info(self, provider: str = None) -> Dict[str, str]:
-        """Get provider configuration"""
+    def get_provider_entry(self, provider: str = None) -> ProviderInfo:
+        """Get typed provider configuration"""
         if provider is None:
             provider = self.get_provider()
 
-        providers = self.get('api.providers', {})
-        if isinstance(providers, dict) and provider in providers:
+        providers = self.snapshot().providers
+        if provider in providers:
             return providers[provider]
 
         # Fallback to dashscope
-        return providers.get('dashscope', {
-            'name': '通义万像API',
-            'base_url': 'https://dashscope.aliyuncs.com/compatible-mode/v1',
-            'api_key': ''
-        })
+        if 'dashscope' in providers:
+            return providers['dashscope']
+        return ProviderInfo(key='dashscope', name='通义万像API', base_url=_DEFAULT_BASE_URL,
+                            raw={'name': '通义万像API', 'base_url': _DEFAULT_BASE_URL, 'api_key': ''})
+
+    def get_provider_info(self, provider: str = None) -> Dict[str, str]:
+        """Get provider configuration"""
+        return self.get_provider_entry(provider).raw
 
     def get_api_key(self, provider: str = None) -> str:
         """Get API key from config or environment"""
-        provider_info = self.get_provider_info(provider)
-        api_key = provider_info.get('api_key', '')
+        api_key = self.get_provider_entry(provider).api_key
 
         # Fall back to environment variable
         if not api_key:
@@ -114,8 +304,7 @@ class Qwen3VLConfig:
 
     def get_base_url(self, provider: str = None) -> str:
         """Get API base URL"""
-        provider_info = self.get_provider_info(provider)
-        return provider_info.get('base_url', 'https://dashscope.aliyuncs.com/compatible-mode/v1')
+        return self.get_provider_entry(provider).base_url
     
     def get_default_model(self) -> str:
         """Get default model name"""
@@ -123,16 +312,24 @@ class Qwen3VLConfig:
     
     def get_available_models(self) -> List[str]:
         """Get list of available model display names"""
-        models = self.get('models.available', [])
-        return [m.get('display_name', m['name']) for m in models if isinstance(m, dict)]
+        return list(self.snapshot().model_display_names)
+
+    def get_model(self, model_name: str) -> Optional[ModelInfo]:
+        """Get typed model entry by API name or display name"""
+        compiled = self.snapshot()
+        return compiled.models_by_name.get(model_name) or compiled.models_by_display_name.get(model_name)
 
     def get_model_info(self, model_name: str) -> Optional[Dict[str, Any]]:
         """Get information about a specific model"""
-        models = self.get('models.available', [])
-        for model in models:
-            if isinstance(model, dict) and model.get('name') == model_name:
-                return model
-        return None
+        model = self.snapshot().models_by_name.get(model_name)
+        return model.raw if model is not None else None
+
+    def get_clean_model_name(self, display_name: str) -> str:
+        """Map a model display name to the name sent to the API"""
+        clean = self.snapshot().clean_names.get(display_name)
+        if clean is None:
+            clean = clean_model_name(display_name)
+        return clean or self.get_default_model()
     
     def get_default_temperature(self) -> float:
         """Get default temperature"""
@@ -194,6 +391,150 @@ class Qwen3VLConfig:
         """Check if image compression is enabled"""
         return self.get('features.enable_image_compression', True)
     
+    def get_model_pool_max_memory_gb(self) -> float:
+        """Get memory budget of the local model pool (0 = auto)"""
+        return float(self.get('local.model_pool.max_memory_gb', 0))
+
+    def get_model_pool_max_models(self) -> int:
+        """Get maximum number of resident local models"""
+        return int(self.get('local.model_pool.max_models', 2))
+    
+    def is_scheduler_enabled(self) -> bool:
+        """Check if local requests are micro-batched by the scheduler"""
+        return self.get('local.scheduler.enabled', False)
+
+    def get_scheduler_max_batch_size(self) -> int:
+        """Get maximum number of requests per scheduled batch"""
+        return int(self.get('local.scheduler.max_batch_size', 8))
+
+    def get_scheduler_max_wait_ms(self) -> float:
+        """Get how long the oldest request may wait for a batch to fill"""
+        return float(self.get('local.scheduler.max_wait_ms', 20))
+
+    def get_scheduler_max_batch_tokens(self) -> int:
+        """Get token budget (prompt + new tokens) per scheduled batch"""
+        return int(self.get('local.scheduler.max_batch_tokens', 32768))
+
+    def is_local_streaming_enabled(self) -> bool:
+        """Check if single local requests stream tokens to the UI"""
+        return self.get('local.streaming.enabled', True)
+
+    def get_streaming_update_interval_ms(self) -> float:
+        """Get minimum time between partial text updates sent to the UI"""
+        return float(self.get('local.streaming.update_interval_ms', 100))
+
+    def is_vision_cache_enabled(self) -> bool:
+        """Check if vision encoder outputs are cached across requests"""
+        return self.get('local.vision_cache.enabled', True)
+
+    def get_vision_cache_max_memory_mb(self) -> float:
+        """Get memory budget of the vision cache in MB"""
+        return float(self.get('local.vision_cache.max_memory_mb', 1024))
+
+    def is_prefix_cache_enabled(self) -> bool:
+        """Check if KV caches of shared prompt prefixes are reused"""
+        return self.get('local.prefix_cache.enabled', True)
+
+    def get_prefix_cache_max_memory_mb(self) -> float:
+        """Get memory budget of the prefix KV cache in MB"""
+        return float(self.get('local.prefix_cache.max_memory_mb', 2048))
+
+    def get_prefix_cache_min_tokens(self) -> int:
+        """Get minimum prefix length in tokens worth caching"""
+        return int(self.get('local.prefix_cache.min_prefix_tokens', 256))
+
+    def get_cpu_num_threads(self) -> int:
+        """Get intra-op threads for CPU inference (0 = one per physical core)"""
+        return int(self.get('local.cpu.num_threads', 0))
+
+    def get_cpu_num_interop_threads(self) -> int:
+        """Get inter-op threads for CPU inference (0 = leave torch's default)"""
+        return int(self.get('local.cpu.num_interop_threads', 0))
+
+    def is_quantized_cache_enabled(self) -> bool:
+        """Check if 4bit/8bit quantized weights are saved and reused"""
+        return self.get('local.quantized_cache.enabled', True)
+
+    def is_compiled_decode_enabled(self) -> bool:
+        """Check if single requests decode with a static KV cache and torch.compile"""
+        return self.get('local.compiled_decode.enabled', False)
+
+    def get_compiled_decode_min_bucket(self) -> int:
+        """Get smallest static KV cache length; lengths are rounded up to powers of two"""
+        return int(self.get('local.compiled_decode.min_bucket', 1024))
+
+    def get_compiled_decode_max_cache_tokens(self) -> int:
+        """Get largest static KV cache length, longer requests decode eagerly"""
+        return int(self.get('local.compiled_decode.max_cache_tokens', 32768))
+
+    def get_compiled_decode_mode(self) -> str:
+        """Get torch.compile mode for the decode step"""
+        return self.get('local.compiled_decode.mode', 'reduce-overhead')
+
+    def get_kv_memory_budget_gb(self) -> float:
+        """Get device memory generate may use on top of the weights, 0 to plan only non-full KV caches"""
+        return float(self.get('local.kv_memory.budget_gb', 0))
+
+    def get_kv_memory_reserve_mb(self) -> float:
+        """Get device memory kept free when planning generate memory"""
+        return self.get('local.kv_memory.reserve_mb', 512)
+
+    def get_kv_memory_on_overflow(self) -> str:
+        """Get what to do when generate won't fit: 'downscale' max_new_tokens or 'refuse'"""
+        return self.get('local.kv_memory.on_overflow', 'downscale')
+
+    def get_kv_memory_residual_length(self) -> int:
+        """Get number of recent tokens a quantized KV cache keeps in full precision"""
+        return int(self.get('local.kv_memory.residual_length', 128))
+
+    def get_kv_memory_min_new_tokens(self) -> int:
+        """Get smallest max_new_tokens downscaling may go to before refusing"""
+        return int(self.get('local.kv_memory.min_new_tokens', 128))
+
+    def get_visual_budget_redundancy_threshold(self) -> float:
+        """Get mean pixel difference (0-255) below which a video frame pair counts as redundant"""
+        return float(self.get('local.visual_budget.redundancy_threshold', 3.0))
+
+    def is_offload_enabled(self) -> bool:
+        """Check if unquantized GPU models are split across GPU, CPU RAM and disk by memory budgets"""
+        return self.get('local.offload.enabled', False)
+
+    def get_offload_gpu_memory_gb(self) -> float:
+        """Get GPU budget for offloaded models, 0 for free VRAM minus generation headroom"""
+        return self.get('local.offload.gpu_memory_gb', 0)
+
+    def get_offload_cpu_memory_gb(self) -> float:
+        """Get CPU RAM budget for offloaded models, 0 for most of the available RAM"""
+        return self.get('local.offload.cpu_memory_gb', 0)
+
+    def get_offload_folder(self) -> str:
+        """Get folder for layers offloaded to disk, empty for models/qwen3vl/offload/<model>"""
+        return self.get('local.offload.folder', '')
+
+    def get_attention_tuning_prompt_tokens(self) -> int:
+        """Get prompt length the attention auto-tuner times prefill with"""
+        return int(self.get('local.attention_tuning.prompt_tokens', 512))
+
+    def get_attention_tuning_decode_tokens(self) -> int:
+        """Get number of tokens the attention auto-tuner decodes per backend"""
+        return int(self.get('local.attention_tuning.decode_tokens', 32))
+
+    def get_video_backend(self) -> str:
+        """Get video decode backend for files the processor decodes (auto picks the fastest installed)"""
+        return self.get('local.video.backend', 'auto')
+
+    def is_preload_enabled(self) -> bool:
+        """Check if local models are preloaded in the background at startup"""
+        return self.get('local.preload.enabled', False)
+
+    def get_preload_models(self) -> List[Dict[str, Any]]:
+        """Get models to preload (model_name, quantization, attention_type)"""
+        return list(self.get('local.preload.models', []))
+
+    def is_preload_warmup_enabled(self) -> bool:
+        """Check if preloaded models run a short warmup generation on first use"""
+        return self.get('local.preload.warmup', True)
+    
     def get_log_level(self) -> str:
         """Get logging level"""
         return self.get('logging.level', 'INFO')
@@ -275,6 +616,78 @@ class Qwen3VLConfig:
                 "enable_thinking": True,
                 "enable_image_compression": True,
                 "enable_video_compression": False
+            },
+            "local": {
+                "model_pool": {
+                    "max_memory_gb": 0,
+                    "max_models": 2
+                },
+                "scheduler": {
+                    "enabled": False,
+                    "max_batch_size": 8,
+                    "max_wait_ms": 20,
+                    "max_batch_tokens": 32768
+                },
+                "streaming": {
+                    "enabled": True,
+                    "update_interval_ms": 100
+                },
+                "vision_cache": {
+                    "enabled": True,
+                    "max_memory_mb": 1024
+                },
+                "prefix_cache": {
+                    "enabled": True,
+                    "max_memory_mb": 2048,
+                    "min_prefix_tokens": 256
+                },
+                "cpu": {
+                    "num_threads": 0,
+                    "num_interop_threads": 0
+                },
+                "quantized_cache": {
+                    "enabled": True
+                },
+                "compiled_decode": {
+                    "enabled": False,
+                    "min_bucket": 1024,
+                    "max_cache_tokens": 32768,
+                    "mode": "reduce-overhead"
+                },
+                "kv_memory": {
+                    "budget_gb": 0,
+                    "reserve_mb": 512,
+                    "on_overflow": "downscale",
+                    "residual_length": 128,
+                    "min_new_tokens": 128
+                },
+                "visual_budget": {
+                    "redundancy_threshold": 3.0
+                },
+                "offload": {
+                    "enabled": False,
+                    "gpu_memory_gb": 0,
+                    "cpu_memory_gb": 0,
+                    "folder": ""
+                },
+                "attention_tuning": {
+                    "prompt_tokens": 512,
+                    "decode_tokens": 32
+                },
+                "video": {
+                    "backend": "auto"
+                },
+                "preload": {
+                    "enabled": False,
+                    "warmup": True,
+                    "models": [
+                        {
+                            "model_name": "Qwen3-VL-4B-Instruct",
+                            "quantization": "none",
+                            "attention_type": "sdpa"
+                        }
+                    ]
+                }
             }
         }
 
@@ -0,0 +1,141 @@
+"""
+CPU Inference Helpers for Qwen3-VL
+dtype selection by ISA, thread configuration and torch-native int8
+weight-only quantization for CPU-only machines
+"""
+
+import os
+import platform
+from contextlib import contextmanager
+from typing import Iterator, Optional, Set, Tuple
+
+import torch
+
+# CPU flags that make bf16 matmuls fast (x86 AVX512-BF16 / AMX, ARM BF16)
+_BF16_FLAGS = {"avx512_bf16", "amx_bf16", "bf16"}
+
+_interop_configured = False
+
+
+def cpu_flags() -> Set[str]:
+    """Feature flags of the host CPU (empty when they can't be read)"""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key.strip() in ("flags", "Features"):
+                    return set(value.split())
+    except OSError:
+        pass
+    if platform.system() == "Darwin" and platform.machine() == "arm64":
+        # Apple M2 and later implement the ARMv8.6 BF16 extension
+        try:
+            import subprocess
+            out = subprocess.run(["sysctl", "-n", "hw.optional.arm.FEAT_BF16"],
+                                 capture_output=True, text=True, timeout=2).stdout.strip()
+            return {"bf16"} if out == "1" else set()
+        except Exception:
+            return set()
+    return set()
+
+
+def cpu_supports_bf16() -> bool:
+    """True if the CPU has native bf16 instructions"""
+    return bool(cpu_flags() & _BF16_FLAGS)
+
+
+def cpu_dtype() -> torch.dtype:
+    """bf16 where the CPU computes it natively, fp32 otherwise (fp16 is emulated and slow)"""
+    return torch.bfloat16 if cpu_supports_bf16() else torch.float32
+
+
+def available_cores() -> Tuple[int, int]:
+    """(physical, logical) cores this process may run on, honouring CPU affinity"""
+    try:
+        logical = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        logical = os.cpu_count() or 1
+    physical = logical
+    try:
+        import psutil
+        total_physical = psutil.cpu_count(logical=False)
+        total_logical = psutil.cpu_count(logical=True)
+        if total_physical and total_logical:
+            # Scale by the SMT ratio of the machine for the cores we are allowed on
+            physical = max(1, logical * total_physical // total_logical)
+    except ImportError:
+        pass
+    return physical, logical
+
+
+@contextmanager
+def cpu_threads(num_threads: int = 0, num_interop_threads: int = 0) -> Iterator[Tuple[int, int]]:
+    """
+    Torch intra-op threads (default: one per physical core available) for the
+    duration of the block, restored afterwards so other nodes keep theirs
+
+    Inter-op threads are process-wide and can only be set once, before
+    parallel work starts, so they are only touched when configured
+    explicitly; later calls keep whatever is in effect.
+    """
+    global _interop_configured
+    physical, _ = available_cores()
+    previous = torch.get_num_threads()
+    if num_interop_threads > 0 and not _interop_configured:
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError:
+            pass
+        _interop_configured = True
+
+    torch.set_num_threads(num_threads if num_threads > 0 else physical)
+    try:
+        yield torch.get_num_threads(), torch.get_num_interop_threads()
+    finally:
+        torch.set_num_threads(previous)
+
+
+def cpu_weight_dtype(quantization: str) -> torch.dtype:
+    """
+    dtype CPU weights load in: bf16 or fp32 by ISA (fp16 has no fast CPU
+    kernels), fp32 for int8 without torchao as torch.ao computes in fp32
+    """
+    if quantization in ("4bit", "8bit", "int8_weight_only") and not torchao_available():
+        return torch.float32
+    return cpu_dtype()
+
+
+def language_model_module(model: torch.nn.Module) -> torch.nn.Module:
+    """Text decoder of a Qwen3-VL model; the vision tower and LM head stay unquantized"""
+    inner = getattr(model, "model", model)
+    return getattr(inner, "language_model", model)
+
+
+def torchao_available() -> bool:
+    try:
+        import torchao.quantization  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def quantize_int8_weight_only(model: torch.nn.Module, modules: Optional[torch.nn.Module] = None) -> str:
+    """
+    Quantize the Linear weights of ``modules`` (default: the whole model) to int8
+    in place and return the method used
+
+    torchao's int8 weight-only quantization is used when installed (any float
+    dtype). Otherwise torch.ao dynamic quantization is applied, which stores
+    int8 weights too but computes in fp32, so the model is converted to fp32.
+    """
+    target = modules if modules is not None else model
+    if torchao_available():
+        from torchao.quantization import quantize_, int8_weight_only
+        quantize_(target, int8_weight_only())
+        return "torchao int8 weight-only"
+
+    from torch.ao.quantization import quantize_dynamic
+    if next(model.parameters()).dtype != torch.float32:
+        model.float()
+    quantize_dynamic(target, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return "torch.ao dynamic int8"
@@ -0,0 +1,353 @@
+"""
+Generation helpers for the local Qwen3-VL processor nodes
+Builds (batched) model inputs for independent conversations and runs generate
+"""
+
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import torch
+
+from .qwen3vl_media import FRAME_FACTOR, IMAGE_FACTOR
+from .qwen3vl_vision_cache import conversation_media_keys
+
+
+@dataclass
+class Conversation:
+    """One independent request: a prompt plus its preprocessed media"""
+    prompt: str
+    images: List[torch.Tensor] = field(default_factory=list)
+    video_frames: Optional[torch.Tensor] = None
+    video_metadata: Optional[Dict[str, Any]] = None
+    video_path: Optional[str] = None
+    # Pixel budget of the whole clip for videos qwen_vl_utils decodes from video_path
+    video_total_pixels: Optional[int] = None
+
+    def messages(self) -> List[Dict[str, Any]]:
+        """Chat messages; media entries are placeholders for the chat template"""
+        content = [{"type": "image", "image": img} for img in self.images]
+        if self.video_frames is not None:
+            content.append({"type": "video", "video": self.video_frames})
+        elif self.video_path:
+            # Use local file path for video (qwen_vl_utils requires file paths)
+            video = {"type": "video", "video": self.video_path}
+            if self.video_total_pixels:
+                video["total_pixels"] = self.video_total_pixels
+            content.append(video)
+        content.append({"type": "text", "text": self.prompt})
+        return [{"role": "user", "content": content}]
+
+    def visual_tokens(self) -> int:
+        """Number of visual tokens the preprocessed media expands to"""
+        tokens = sum((img.shape[-2] // IMAGE_FACTOR) * (img.shape[-1] // IMAGE_FACTOR) for img in self.images)
+        if self.video_frames is not None:
+            frames = self.video_frames
+            tokens += (frames.shape[0] // FRAME_FACTOR) * (frames.shape[-2] // IMAGE_FACTOR) * (frames.shape[-1] // IMAGE_FACTOR)
+        return tokens
+
+
+def make_video_metadata(metadata: Dict[str, Any]):
+    """Wrap frame metadata for the transformers video processor"""
+    try:
+        from transformers.video_utils import VideoMetadata
+    except ImportError:
+        return metadata
+    return VideoMetadata(**metadata)
+
+
+def build_inputs(processor, conversations: List[Conversation]):
+    """Tokenize conversations into one left-padded batch"""
+    texts, images, videos, metadata = [], [], [], []
+    video_kwargs: Dict[str, Any] = {}
+
+    for conv in conversations:
+        texts.append(processor.apply_chat_template(conv.messages(), tokenize=False, add_generation_prompt=True))
+        images.extend(conv.images)
+        if conv.video_frames is not None:
+            videos.append(conv.video_frames)
+            metadata.append(make_video_metadata(conv.video_metadata))
+        elif conv.video_path:
+            if len(conversations) > 1:
+                raise ValueError("Video files can't be batched, load them as frame tensors first")
+            from qwen_vl_utils import process_vision_info
+            _, video_inputs, video_kwargs = process_vision_info(conv.messages(), return_video_kwargs=True)
+            videos.extend(video_inputs or [])
+            # Fix video_kwargs if fps is a sequence
+            if video_kwargs and 'fps' in video_kwargs:
+                fps_value = video_kwargs['fps']
+                # If fps is a sequence, take the first element
+                if isinstance(fps_value, (list, tuple)):
+                    video_kwargs['fps'] = fps_value[0] if fps_value else 24
+
+    if metadata:
+        # Frames are already sampled, keep the processor from resampling them
+        video_kwargs = {"video_metadata": metadata, "do_sample_frames": False}
+
+    # Decoder-only batches must be padded on the left so generation continues the prompt
+    processor.tokenizer.padding_side = "left"
+    return processor(
+        text=texts,
+        images=images or None,
+        videos=videos or None,
+        padding=True,
+        return_tensors="pt",
+        **(video_kwargs or {})
+    )
+
+
+def prepare_inputs(model, processor, conversations: List[Conversation], device,
+                   vision_cache=None, cache_namespace=None, prefix_cache=None):
+    """
+    Build inputs on ``device``, a context manager to run generate in and the
+    media fingerprints (None without caches); with a vision cache, cached pixel
+    tensors and vision-tower outputs are reused
+    """
+    if vision_cache is None and prefix_cache is None:
+        return build_inputs(processor, conversations).to(device), nullcontext(), None
+    image_keys, video_keys = conversation_media_keys(conversations)
+    if vision_cache is None:
+        return build_inputs(processor, conversations).to(device), nullcontext(), image_keys + video_keys
+    cached_processor = vision_cache.wrap_processor(processor, cache_namespace, image_keys, video_keys)
+    inputs = build_inputs(cached_processor, conversations).to(device)
+    context = vision_cache.encoder(model, cache_namespace, inputs, image_keys, video_keys)
+    return inputs, context, image_keys + video_keys
+
+
+def run_generate(model, processor, inputs, vision_context, media_keys, prefix_cache=None,
+                 cache_namespace=None, compiled_decode=None,
+                 **generate_kwargs) -> Tuple[torch.Tensor, Dict[str, Any]]:
+    """
+    model.generate, with a compiled static-cache decode or continuing from a
+    cached prompt prefix when possible; returns ids and how the run went
+    (prefix_tokens reused, compiled, first_compile)
+    """
+    info = {"prefix_tokens": 0, "compiled": False, "first_compile": False}
+    with torch.no_grad(), vision_context:
+        extra_kwargs = {}
+        # A requested cache layout (quantized, offloaded) replaces both
+        if "cache_implementation" in generate_kwargs:
+            compiled_decode = prefix_cache = None
+        if compiled_decode is not None:
+            extra_kwargs, info["first_compile"] = compiled_decode.generate_kwargs(
+                model, inputs["input_ids"], int(generate_kwargs.get("max_new_tokens", 0))
+            )
+            info["compiled"] = bool(extra_kwargs)
+        # A static cache can't start from a dynamic prefix cache
+        if not extra_kwargs and prefix_cache is not None and media_keys is not None:
+            extra_kwargs, info["prefix_tokens"] = prefix_cache.generate_kwargs(
+                model, processor, inputs, cache_namespace, media_keys
+            )
+        if info["compiled"]:
+            with compiled_decode.decoding(model, extra_kwargs["past_key_values"]):
+                return model.generate(**inputs, **extra_kwargs, **generate_kwargs), info
+        return model.generate(**inputs, **extra_kwargs, **generate_kwargs), info
+
+
+def decode_new_tokens(processor, input_ids: torch.Tensor, generated_ids: torch.Tensor) -> List[str]:
+    """Decode only the generated continuation of each row"""
+    return processor.batch_decode(
+        generated_ids[:, input_ids.shape[1]:],
+        skip_special_tokens=True,
+        clean_up_tokenization_spaces=False,
+    )
+
+
+def count_new_tokens(processor, input_ids: torch.Tensor, generated_ids: torch.Tensor) -> int:
+    """Generated tokens excluding the padding added after EOS"""
+    new_tokens = generated_ids[:, input_ids.shape[1]:]
+    pad_id = processor.tokenizer.pad_token_id
+    if pad_id is None:
+        return new_tokens.numel()
+    return int((new_tokens != pad_id).sum().item())
+
+
+def estimate_prompt_tokens(processor, conversation: Conversation) -> int:
+    """Prompt length in tokens, used to group similar lengths and limit padding"""
+    text = processor.apply_chat_template(conversation.messages(), tokenize=False, add_generation_prompt=True)
+    return len(processor.tokenizer(text, add_special_tokens=False)["input_ids"]) + conversation.visual_tokens()
+
+
+def generate_batch(model, processor, conversations: List[Conversation], device,
+                   max_batch_size: int = 8, vision_cache=None, cache_namespace=None,
+                   prefix_cache=None, compiled_decode=None,
+                   **generate_kwargs) -> Tuple[List[str], Dict[str, float]]:
+    """
+    Generate a response for each conversation
+
+    Conversations are sorted by prompt length and run in left-padded
+    micro-batches of ``max_batch_size``; responses come back in input order.
+    Single-conversation batches can start from a cached prompt prefix.
+    """
+    if len(conversations) > 1:
+        lengths = [estimate_prompt_tokens(processor, conv) for conv in conversations]
+        order = sorted(range(len(conversations)), key=lambda i: lengths[i])
+    else:
+        order = list(range(len(conversations)))
+
+    responses: List[str] = [""] * len(conversations)
+    stats = {"requests": len(conversations), "batches": 0, "prompt_tokens": 0,
+             "prefix_tokens": 0, "generated_tokens": 0, "seconds": 0.0}
+
+    for start in range(0, len(order), max(1, max_batch_size)):
+        indices = order[start:start + max(1, max_batch_size)]
+        inputs, vision_context, media_keys = prepare_inputs(
+            model, processor, [conversations[i] for i in indices], device, vision_cache, cache_namespace, prefix_cache
+        )
+
+        started = time.perf_counter()
+        generated_ids, info = run_generate(model, processor, inputs, vision_context, media_keys,
+                                           prefix_cache, cache_namespace, compiled_decode, **generate_kwargs)
+        stats["seconds"] += time.perf_counter() - started
+        stats["prefix_tokens"] += info["prefix_tokens"]
+
+        for i, text in zip(indices, decode_new_tokens(processor, inputs.input_ids, generated_ids)):
+            responses[i] = text
+        stats["batches"] += 1
+        stats["prompt_tokens"] += int(inputs.attention_mask.sum().item())
+        stats["generated_tokens"] += count_new_tokens(processor, inputs.input_ids, generated_ids)
+
+    stats["tokens_per_second"] = stats["generated_tokens"] / stats["seconds"] if stats["seconds"] else 0.0
+    return responses, stats
+
+
+def tokenizers_match(tokenizer, other) -> bool:
+    """True if both tokenizers map the same tokens to the same ids (required for assisted decoding)"""
+    if tokenizer is other:
+        return True
+    if len(tokenizer) != len(other):
+        return False
+    return tokenizer.get_vocab() == other.get_vocab()
+
+
+class _ForwardCounter:
+    """Counts forward calls of modules while generate runs"""
+
+    def __init__(self, *modules: torch.nn.Module):
+        self.counts = [0] * len(modules)
+        self._handles = [
+            module.register_forward_hook(self._hook(i)) for i, module in enumerate(modules)
+        ]
+
+    def _hook(self, index: int):
+        def hook(module, args, output):
+            self.counts[index] += 1
+        return hook
+
+    def remove(self) -> None:
+        for handle in self._handles:
+            handle.remove()
+
+
+class _TimedStreamer:
+    """Streamer that records per-token timestamps and accumulates decoded text"""
+
+    def __init__(self, processor):
+        from transformers import TextIteratorStreamer
+        self.inner = TextIteratorStreamer(processor.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        self.prompt_seen = False
+        self.token_times: List[float] = []
+
+    def put(self, value: torch.Tensor) -> None:
+        # The first call carries the prompt ids, later calls the new token(s):
+        # one per step, several per step with assisted decoding
+        if self.prompt_seen:
+            self.token_times.extend([time.perf_counter()] * value.numel())
+        self.prompt_seen = True
+        self.inner.put(value)
+
+    def end(self) -> None:
+        self.inner.end()
+
+    def __iter__(self):
+        return iter(self.inner)
+
+
+def generate_streaming(model, processor, conversation: Conversation, device,
+                       on_update: Optional[Callable[[str, int], None]] = None,
+                       should_stop: Optional[Callable[[], bool]] = None,
+                       vision_cache=None, cache_namespace=None, prefix_cache=None,
+                       compiled_decode=None, **generate_kwargs) -> Tuple[str, Dict[str, float]]:
+    """
+    Generate a response for one conversation, streaming it as it is decoded
+
+    generate runs on a worker thread; ``on_update(text_so_far, tokens)`` is
+    called on the calling thread for every decoded text chunk. ``should_stop``
+    is polled after each token and ends generation early when it returns True.
+
+    With ``assistant_model`` in ``generate_kwargs`` (assisted decoding), the
+    stats also contain the draft acceptance rate and tokens per target forward.
+    The prefix cache is not used then, the draft model has no matching cache.
+    """
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class _StopWhen(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return bool(should_stop())
+
+    requested = time.perf_counter()
+    assistant = generate_kwargs.get("assistant_model")
+    if assistant is not None:
+        prefix_cache = None
+        compiled_decode = None
+    inputs, vision_context, media_keys = prepare_inputs(model, processor, [conversation], device,
+                                                        vision_cache, cache_namespace, prefix_cache)
+    streamer = _TimedStreamer(processor)
+    if should_stop is not None:
+        generate_kwargs["stopping_criteria"] = StoppingCriteriaList([_StopWhen()])
+
+    error: List[BaseException] = []
+    info: Dict[str, Any] = {}
+
+    def run():
+        try:
+            _, run_info = run_generate(model, processor, inputs, vision_context, media_keys, prefix_cache,
+                                       cache_namespace, compiled_decode, streamer=streamer, **generate_kwargs)
+            info.update(run_info)
+        except BaseException as e:
+            error.append(e)
+            # Unblock the consumer, generate won't close the stream itself
+            streamer.end()
+
+    counter = _ForwardCounter(model, assistant) if assistant is not None else None
+    started = time.perf_counter()
+    worker = threading.Thread(target=run, daemon=True, name="qwen3vl-generate")
+    worker.start()
+    chunks: List[str] = []
+    try:
+        for chunk in streamer:
+            chunks.append(chunk)
+            if on_update is not None:
+                on_update("".join(chunks), len(streamer.token_times))
+        worker.join()
+    finally:
+        if counter is not None:
+            counter.remove()
+    finished = time.perf_counter()
+    if error:
+        raise error[0]
+
+    times = streamer.token_times
+    stats = {"requests": 1, "batches": 1,
+             "prompt_tokens": int(inputs.attention_mask.sum().item()),
+             "prefix_tokens": info.get("prefix_tokens", 0), "compiled": info.get("compiled", False),
+             "first_compile": info.get("first_compile", False),
+             "generated_tokens": len(times), "seconds": finished - started}
+    stats["tokens_per_second"] = stats["generated_tokens"] / stats["seconds"] if stats["seconds"] else 0.0
+    if times:
+        # Prefill ends with the first token; TTFT also counts input preparation
+        stats["prefill_seconds"] = times[0] - started
+        stats["time_to_first_token"] = times[0] - requested
+        decode_seconds = times[-1] - times[0]
+        stats["decode_tokens_per_second"] = (len(times) - 1) / decode_seconds if decode_seconds > 0 else 0.0
+    if counter is not None:
+        # Every target forward verifies a draft and yields the accepted tokens plus one
+        target_forwards, drafted = counter.counts
+        accepted = max(0, len(times) - target_forwards)
+        stats["target_forwards"] = target_forwards
+        stats["draft_tokens"] = drafted
+        stats["acceptance_rate"] = accepted / drafted if drafted else 0.0
+        stats["tokens_per_target_forward"] = len(times) / target_forwards if target_forwards else 0.0
+    return "".join(chunks), stats
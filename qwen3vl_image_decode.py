@@ -0,0 +1,136 @@
+"""
+Image Decoding for Qwen3-VL
+Decodes image files straight to the resolution they will be used at:
+JPEG DCT scaling (draft mode) below the target size, reduced resampling
+for other formats, EXIF orientation applied, and every frame of animated
+GIF/WebP files as a batch; fixed-size decoding for batched loaders
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .qwen3vl_media import cap_dimension
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+
+# EXIF orientation tag and the transpose that undoes each value (as ImageOps.exif_transpose)
+_ORIENTATION_TAG = 0x0112
+_ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+# Resize in two steps (integer box reduce, then Lanczos) above this ratio
+_REDUCING_GAP = 2.0
+
+# How load_image_resized reaches an exact size
+RESIZE_MODES = ["crop", "pad", "stretch"]
+
+
+def _orientation(img: Image.Image) -> int:
+    try:
+        return int(img.getexif().get(_ORIENTATION_TAG, 1))
+    except Exception:
+        return 1
+
+
+def _frame_rgb(img: Image.Image, size: Tuple[int, int], transpose: Optional[Image.Transpose]) -> np.ndarray:
+    """Current frame as an RGB uint8 array of ``size`` (width, height before orientation)"""
+    frame = img.convert("RGB")
+    if frame.size != size:
+        frame = frame.resize(size, Image.Resampling.LANCZOS, reducing_gap=_REDUCING_GAP)
+    if transpose is not None:
+        frame = frame.transpose(transpose)
+    return np.asarray(frame)
+
+
+def load_image_frames(path: str, max_dimension: Optional[int] = None, max_frames: int = 1) -> np.ndarray:
+    """
+    Decode an image file into a (N, H, W, 3) float32 batch in [0, 1]
+
+    The longest side is capped at ``max_dimension`` during decoding: JPEGs
+    are DCT-scaled to the smallest power-of-two reduction that still covers
+    the target, so a 40MP photo never decodes at full size. Animated files
+    give up to ``max_frames`` frames spread over the animation.
+    """
+    with Image.open(path) as img:
+        target = cap_dimension(img.size[1], img.size[0], max_dimension)
+        target_size = (target[1], target[0])
+        if img.format == "JPEG" and target_size != img.size:
+            img.draft("RGB", target_size)
+        orientation = _orientation(img)
+        transpose = _ORIENTATION_TRANSPOSE.get(orientation)
+
+        frame_count = max(1, int(getattr(img, "n_frames", 1)))
+        if frame_count > max_frames:
+            frames = np.linspace(0, frame_count - 1, max(1, max_frames)).round().astype(int).tolist()
+        else:
+            frames = list(range(frame_count))
+
+        height, width = target
+        if orientation in (5, 6, 7, 8):
+            height, width = width, height
+        out = np.empty((len(frames), height, width, 3), dtype=np.float32)
+        for slot, frame_index in enumerate(frames):
+            if frame_count > 1:
+                img.seek(frame_index)
+            np.multiply(_frame_rgb(img, target_size, transpose), 1.0 / 255.0, out=out[slot], casting="unsafe")
+    return out
+
+
+def oriented_size(path: str) -> Tuple[int, int]:
+    """(width, height) of the upright image; reads only the header"""
+    with Image.open(path) as img:
+        width, height = img.size
+        if _orientation(img) in (5, 6, 7, 8):
+            width, height = height, width
+        return width, height
+
+
+def load_image_resized(path: str, size: Tuple[int, int], mode: str, out: np.ndarray) -> None:
+    """
+    Decode the first frame of an image file upright into ``out``, a (H, W, 3)
+    float32 slot of a preallocated batch, at ``size`` (width, height)
+
+    ``mode`` is a RESIZE_MODES entry: crop scales to cover and cuts the
+    centre, pad scales to fit and fills the border with black, stretch
+    ignores the aspect ratio. JPEGs are draft-decoded just above the scale
+    that is needed.
+    """
+    with Image.open(path) as img:
+        orientation = _orientation(img)
+        transpose = _ORIENTATION_TRANSPOSE.get(orientation)
+        width, height = img.size
+        target_width, target_height = size
+        if orientation in (5, 6, 7, 8):
+            # Work in the file's orientation, transpose at the end
+            target_width, target_height = target_height, target_width
+
+        if mode == "stretch":
+            scaled = (target_width, target_height)
+        else:
+            scale = (max if mode == "crop" else min)(target_width / width, target_height / height)
+            scaled = (max(1, round(width * scale)), max(1, round(height * scale)))
+        if img.format == "JPEG" and scaled[0] < width:
+            img.draft("RGB", scaled)
+        frame = img.convert("RGB")
+        if frame.size != scaled:
+            frame = frame.resize(scaled, Image.Resampling.LANCZOS, reducing_gap=_REDUCING_GAP)
+
+        if mode == "crop":
+            left, top = (scaled[0] - target_width) // 2, (scaled[1] - target_height) // 2
+            frame = frame.crop((left, top, left + target_width, top + target_height))
+        elif mode == "pad":
+            canvas = Image.new("RGB", (target_width, target_height))
+            canvas.paste(frame, ((target_width - scaled[0]) // 2, (target_height - scaled[1]) // 2))
+            frame = canvas
+        if transpose is not None:
+            frame = frame.transpose(transpose)
+        np.multiply(np.asarray(frame), 1.0 / 255.0, out=out, casting="unsafe")
@@ -0,0 +1,216 @@
+"""
+Directory Image Loader for Qwen3-VL
+Lists the images of a folder once and decodes them in fixed-size batches on
+a thread pool, prefetching the next batches while the current one is used,
+so large folders stream through in chunks instead of loading all at once
+"""
+
+import fnmatch
+import math
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+from .qwen3vl_image_decode import IMAGE_EXTENSIONS, RESIZE_MODES, load_image_resized, oriented_size
+
+# Aspect ratios (width / height) of the aspect_buckets mode
+ASPECT_BUCKETS = (1 / 2, 9 / 16, 2 / 3, 3 / 4, 1.0, 4 / 3, 3 / 2, 16 / 9, 2.0)
+BATCH_MODES = RESIZE_MODES + ["aspect_buckets"]
+
+# Bucket sizes are rounded to this, as the vision patches are
+_SIZE_STEP = 32
+
+# Batchers kept alive between runs, one per folder and settings
+_MAX_BATCHERS = 4
+
+
+def list_images(directory: str, pattern: str = "*", recursive: bool = False) -> List[str]:
+    """
+    Sorted image files in ``directory`` whose name or relative path matches
+    the glob ``pattern``, as paths relative to ``directory``
+    """
+    names = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in files:
+            relative = os.path.relpath(os.path.join(root, name), directory)
+            if name.lower().endswith(IMAGE_EXTENSIONS) and (
+                    fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative, pattern)):
+                names.append(relative)
+        if not recursive:
+            break
+    return sorted(names)
+
+
+def directory_signature(directory: str, recursive: bool = False) -> tuple:
+    """Modification times of the folder (and its subfolders when recursive), changes when files come or go"""
+    if not recursive:
+        return (os.stat(directory).st_mtime_ns,)
+    signature = []
+    for root, dirs, _ in os.walk(directory):
+        dirs.sort()
+        signature.append((root, os.stat(root).st_mtime_ns))
+    return tuple(signature)
+
+
+def bucket_size(width: int, height: int, target: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    (width, height) of the ASPECT_BUCKETS ratio nearest to an image's, with
+    the pixel area of ``target`` (width, height)
+    """
+    ratio = min(ASPECT_BUCKETS, key=lambda r: abs(math.log(r * height / max(1, width))))
+    area = target[0] * target[1]
+    return (max(_SIZE_STEP, round(math.sqrt(area * ratio) / _SIZE_STEP) * _SIZE_STEP),
+            max(_SIZE_STEP, round(math.sqrt(area / ratio) / _SIZE_STEP) * _SIZE_STEP))
+
+
+@dataclass
+class ImageBatch:
+    images: np.ndarray
+    names: List[str]
+    start: int
+    next_index: int
+
+
+@dataclass
+class _PendingBatch:
+    out: np.ndarray
+    end: int
+    futures: List[Future]
+
+    def cancel(self) -> None:
+        for future in self.futures:
+            future.cancel()
+
+
+class DirectoryBatcher:
+    """
+    Batches of one folder at one size, decoded on a thread pool
+
+    Every image of a batch is its own pool task writing into a slot of the
+    batch array, and after each batch the next ``prefetch`` batches are
+    queued, so at most ``prefetch + 1`` batches are in memory. With
+    aspect_buckets the files are ordered by bucket (header reads only) and a
+    batch never mixes buckets. The listing is refreshed when the
+    modification time of the folder, or with ``recursive`` of any subfolder,
+    changes.
+    """
+
+    def __init__(self, directory: str, pattern: str, recursive: bool, size: Tuple[int, int], mode: str,
+                 batch_size: int, workers: int = 4, prefetch: int = 2):
+        if mode not in BATCH_MODES:
+            raise ValueError(f"Unknown resize mode '{mode}', expected one of {BATCH_MODES}")
+        self.directory = directory
+        self.pattern = pattern
+        self.recursive = recursive
+        self.size = size
+        self.mode = mode
+        self.batch_size = max(1, batch_size)
+        self.prefetch = max(0, prefetch)
+        self.names: List[str] = []
+        self._sizes: List[Tuple[int, int]] = []
+        self._signature = None
+        self._pending: "OrderedDict[int, _PendingBatch]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="qwen3vl-images")
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh_if_changed()
+            return len(self.names)
+
+    def _refresh_if_changed(self) -> None:
+        signature = directory_signature(self.directory, self.recursive)
+        if signature == self._signature:
+            return
+        self._signature = signature
+        for pending in self._pending.values():
+            pending.cancel()
+        self._pending.clear()
+
+        names = list_images(self.directory, self.pattern, self.recursive)
+        if self.mode == "aspect_buckets":
+            paths = [os.path.join(self.directory, name) for name in names]
+            sizes = [bucket_size(w, h, self.size) for w, h in self._executor.map(oriented_size, paths)]
+            order = sorted(range(len(names)), key=lambda i: (sizes[i][0] / sizes[i][1], names[i]))
+            self.names = [names[i] for i in order]
+            self._sizes = [sizes[i] for i in order]
+        else:
+            self.names = names
+            self._sizes = [self.size] * len(names)
+
+    def _end(self, start: int) -> int:
+        end = min(start + self.batch_size, len(self.names))
+        if self.mode == "aspect_buckets":
+            end = next((i for i in range(start + 1, end) if self._sizes[i] != self._sizes[start]), end)
+        return end
+
+    def _schedule(self, start: int) -> _PendingBatch:
+        end = self._end(start)
+        width, height = self._sizes[start]
+        mode = "crop" if self.mode == "aspect_buckets" else self.mode
+        out = np.empty((end - start, height, width, 3), dtype=np.float32)
+        futures = [
+            self._executor.submit(load_image_resized, os.path.join(self.directory, name), (width, height), mode,
+                                  out[slot])
+            for slot, name in enumerate(self.names[start:end])
+        ]
+        return _PendingBatch(out, end, futures)
+
+    def batch(self, start: int) -> ImageBatch:
+        """The batch beginning at listing position ``start``; queues the batches after it"""
+        with self._lock:
+            self._refresh_if_changed()
+            if not 0 <= start < len(self.names):
+                raise IndexError(f"Image index {start} is outside the {len(self.names)} images of {self.directory}")
+            pending = self._pending.pop(start, None) or self._schedule(start)
+
+            upcoming = []
+            position = pending.end
+            while len(upcoming) < self.prefetch and position < len(self.names):
+                upcoming.append(position)
+                position = self._end(position)
+            for key in [key for key in self._pending if key not in upcoming]:
+                self._pending.pop(key).cancel()
+            for position in upcoming:
+                if position not in self._pending:
+                    self._pending[position] = self._schedule(position)
+            names = self.names[start:pending.end]
+
+        for name, future in zip(names, pending.futures):
+            try:
+                future.result()
+            except Exception as e:
+                raise ValueError(f"Failed to decode {os.path.join(self.directory, name)}: {e}") from e
+        return ImageBatch(pending.out, names, start, pending.end)
+
+    def close(self) -> None:
+        with self._lock:
+            for pending in self._pending.values():
+                pending.cancel()
+            self._pending.clear()
+        self._executor.shutdown(wait=False)
+
+
+_batchers: "OrderedDict[tuple, DirectoryBatcher]" = OrderedDict()
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(directory: str, pattern: str, recursive: bool, size: Tuple[int, int], mode: str,
+                batch_size: int, workers: int = 4, prefetch: int = 2) -> DirectoryBatcher:
+    """Shared batcher for these settings, so prefetched batches survive between runs"""
+    key = (os.path.abspath(directory), pattern, recursive, tuple(size), mode, batch_size, workers, prefetch)
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            batcher = DirectoryBatcher(key[0], pattern, recursive, size, mode, batch_size, workers, prefetch)
+            _batchers[key] = batcher
+            while len(_batchers) > _MAX_BATCHERS:
+                _batchers.popitem(last=False)[1].close()
+        _batchers.move_to_end(key)
+        return batcher
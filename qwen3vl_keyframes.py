@@ -0,0 +1,127 @@
+"""
+Scene-Change Keyframes for Qwen3-VL
+Picks the frames of a video where the picture changes, scored from cheap
+luminance histograms and difference hashes in one streaming decode pass,
+so long clips need far fewer frames than uniform fps sampling
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .qwen3vl_media import cap_dimension
+from .qwen3vl_video_decode import VideoInfo, open_video, plan_sample_indices
+
+HIST_BINS = 32
+
+# Grayscale thumbnail (width, height) the signatures use: an 8x9 grid of 8x8 pixel blocks
+_THUMB_SIZE = (72, 64)
+
+# Frames scored together; bounds the decoded frames held besides the candidates
+_CHUNK = 32
+
+
+@dataclass
+class Keyframe:
+    index: int
+    score: float
+    frame: np.ndarray
+
+
+def frame_thumbnail(frame: np.ndarray) -> np.ndarray:
+    """64x72 grayscale thumbnail of an RGB uint8 frame"""
+    return cv2.resize(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY), _THUMB_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def frame_signatures(thumbnails: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Luminance histograms (N, HIST_BINS) summing to 1 and 64-bit difference
+    hashes (N, 64) of a (N, 64, 72) thumbnail batch, without a per-frame loop
+    """
+    count = thumbnails.shape[0]
+    bins = (thumbnails >> 3).reshape(count, -1).astype(np.int64) + np.arange(count)[:, None] * HIST_BINS
+    histograms = np.bincount(bins.ravel(), minlength=count * HIST_BINS).reshape(count, HIST_BINS)
+    histograms = histograms / float(thumbnails[0].size)
+    blocks = thumbnails.reshape(count, 8, 8, 9, 8).mean(axis=(2, 4))
+    hashes = (blocks[:, :, 1:] > blocks[:, :, :-1]).reshape(count, 64)
+    return histograms, hashes
+
+
+def change_scores(histograms: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    """
+    Change between consecutive frames in [0, 1]: the mean of half the L1
+    histogram distance (global brightness and content) and the Hamming
+    distance of the hashes (layout), one score per frame after the first
+    """
+    histogram_distance = 0.5 * np.abs(histograms[1:] - histograms[:-1]).sum(axis=1)
+    hash_distance = (hashes[1:] != hashes[:-1]).mean(axis=1)
+    return 0.5 * (histogram_distance + hash_distance)
+
+
+def extract_keyframes(path: str, analysis_fps: float, max_frames: int, threshold: float,
+                      min_interval: float = 1.0, max_interval: float = 0.0, max_dimension: Optional[int] = None,
+                      backend: str = "auto") -> Tuple[np.ndarray, List[int], List[float], VideoInfo]:
+    """
+    Up to ``max_frames`` keyframes as one (K, H, W, 3) RGB uint8 array with
+    their source indices and change scores
+
+    The video is decoded once at ``analysis_fps``. The first frame and every
+    frame whose change score reaches ``threshold`` is a candidate; within
+    ``min_interval`` seconds only the strongest change is kept (fades and
+    flashes), and with ``max_interval`` a frame is also taken after that many
+    seconds without one. When there are more candidates than the budget, the
+    strongest changes win. Only candidates are kept in memory.
+    """
+    with open_video(path, backend) as reader:
+        info = reader.info
+        if info.frame_count <= 0:
+            raise ValueError(f"Frame count of {path} is unknown, can't plan keyframe analysis")
+        fps = info.fps or analysis_fps
+        size = cap_dimension(info.height, info.width, max_dimension)
+        indices = plan_sample_indices(info.frame_count, fps, analysis_fps, info.frame_count)
+
+        candidates: List[Keyframe] = []
+        previous: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+        def consider(index: int, score: float, frame: np.ndarray) -> None:
+            last = candidates[-1] if candidates else None
+            seconds = (index - last.index) / fps if last is not None else 0.0
+            if last is not None and seconds < min_interval:
+                if score > last.score:
+                    candidates[-1] = Keyframe(index, score, frame)
+                return
+            if last is None or score >= threshold or (max_interval > 0 and seconds >= max_interval):
+                candidates.append(Keyframe(index, score, frame))
+            if len(candidates) > 2 * max_frames:
+                # Keep the strongest changes in time order, memory stays bounded
+                strongest = sorted(candidates, key=lambda c: c.score, reverse=True)[:max_frames]
+                candidates[:] = sorted(strongest, key=lambda c: c.index)
+
+        def score_chunk(chunk: List[Tuple[int, np.ndarray]]) -> None:
+            nonlocal previous
+            histograms, hashes = frame_signatures(np.stack([frame_thumbnail(frame) for _, frame in chunk]))
+            if previous is None:
+                scores = np.concatenate([[np.inf], change_scores(histograms, hashes)])
+            else:
+                scores = change_scores(np.concatenate([previous[0], histograms]),
+                                       np.concatenate([previous[1], hashes]))
+            previous = (histograms[-1:], hashes[-1:])
+            for (index, frame), score in zip(chunk, scores.tolist()):
+                consider(index, score, frame)
+
+        chunk = []
+        for index, frame in reader.iter_frames(indices, size):
+            chunk.append((index, frame))
+            if len(chunk) == _CHUNK:
+                score_chunk(chunk)
+                chunk = []
+        if chunk:
+            score_chunk(chunk)
+
+    keyframes = sorted(sorted(candidates, key=lambda c: c.score, reverse=True)[:max_frames], key=lambda c: c.index)
+    if not keyframes:
+        return np.empty((0, size[0], size[1], 3), dtype=np.uint8), [], [], info
+    return (np.stack([k.frame for k in keyframes]), [k.index for k in keyframes],
+            [k.score for k in keyframes], info)
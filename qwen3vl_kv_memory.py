@@ -0,0 +1,218 @@
+"""
+KV Cache Memory Planning for Qwen3-VL
+Estimates peak generation memory from the prompt length up front and picks a
+KV cache layout (full, int8/int4 quantized, CPU-offloaded) that fits, or
+lowers max_new_tokens / refuses before generate runs out of memory
+"""
+
+import importlib.util
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from .qwen3vl_config import get_config
+
+# "auto" tries the others in this order and keeps the first one that fits
+KV_CACHE_MODES = ["full", "auto", "int8", "int4", "offload"]
+_AUTO_ORDER = ["full", "int8", "int4", "offload"]
+
+_NBITS = {"int8": 8, "int4": 4}
+
+# Quantized caches store one scale and zero point per group of values
+_QUANT_GROUP_SIZE = 64
+
+# OffloadedCache keeps the layer being computed plus the prefetched next one on the device
+_OFFLOAD_RESIDENT_LAYERS = 2
+
+
+def _text_config(config: Any) -> Any:
+    if hasattr(config, "get_text_config"):
+        return config.get_text_config()
+    return getattr(config, "text_config", config)
+
+
+def quantized_cache_backend(kv_cache: str) -> str:
+    """transformers QuantizedCache backend for a mode, "" when none is installed"""
+    # quanto only implements 2/4-bit caches, HQQ also has 8-bit
+    candidates = {"int8": [("hqq", "HQQ")], "int4": [("optimum.quanto", "quanto"), ("hqq", "HQQ")]}
+    for module, backend in candidates.get(kv_cache, []):
+        try:
+            if importlib.util.find_spec(module) is not None:
+                return backend
+        except ModuleNotFoundError:
+            continue
+    return ""
+
+
+def kv_mode_available(kv_cache: str, device_type: str) -> bool:
+    if kv_cache in _NBITS:
+        return bool(quantized_cache_backend(kv_cache))
+    if kv_cache == "offload":
+        # Offloading moves layers between the GPU and CPU RAM
+        return device_type == "cuda"
+    return kv_cache == "full"
+
+
+def kv_bytes_per_token(config: Any, dtype_bytes: int, kv_cache: str = "full") -> float:
+    """KV cache bytes one token takes across all decoder layers"""
+    text = _text_config(config)
+    head_dim = getattr(text, "head_dim", None) or text.hidden_size // text.num_attention_heads
+    kv_heads = getattr(text, "num_key_value_heads", None) or text.num_attention_heads
+    values = 2 * text.num_hidden_layers * kv_heads * head_dim
+    if kv_cache in _NBITS:
+        return values * (_NBITS[kv_cache] / 8 + 2 * dtype_bytes / _QUANT_GROUP_SIZE)
+    if kv_cache == "offload":
+        return values * dtype_bytes * min(1.0, _OFFLOAD_RESIDENT_LAYERS / text.num_hidden_layers)
+    return values * dtype_bytes
+
+
+def estimate_peak_bytes(config: Any, prompt_tokens: int, max_new_tokens: int, kv_cache: str = "full",
+                        dtype_bytes: int = 2, batch_size: int = 1, attention_type: str = "sdpa",
+                        residual_length: int = 128) -> int:
+    """
+    Device memory generate needs on top of the resident weights
+
+    Counts the KV cache at full length plus the largest prefill activation of
+    one decoder layer (MLP intermediates; the score matrix for eager
+    attention). The prompt's KV is full precision while the prefill layer
+    runs; quantized caches keep the last ``residual_length`` tokens unquantized.
+    """
+    text = _text_config(config)
+    total_tokens = prompt_tokens + max_new_tokens
+    full_per_token = kv_bytes_per_token(config, dtype_bytes, "full")
+
+    if kv_cache in _NBITS:
+        residual = min(total_tokens, residual_length)
+        kv = (residual * full_per_token
+              + (total_tokens - residual) * kv_bytes_per_token(config, dtype_bytes, kv_cache))
+        # Prefill produces one full precision layer before it is quantized
+        kv += prompt_tokens * full_per_token / text.num_hidden_layers
+    else:
+        kv = total_tokens * kv_bytes_per_token(config, dtype_bytes, kv_cache)
+
+    intermediate = getattr(text, "intermediate_size", 4 * text.hidden_size)
+    activations = prompt_tokens * (6 * text.hidden_size + 3 * intermediate) * dtype_bytes
+    if attention_type == "eager":
+        # Scores and softmax output, fp32 upcast included
+        activations += 2 * text.num_attention_heads * prompt_tokens ** 2 * 4
+    # Final-position logits in fp32
+    activations += getattr(text, "vocab_size", 0) * 4
+    return int(batch_size * (kv + activations))
+
+
+@dataclass
+class MemoryPlan:
+    """Outcome of planning one generate call"""
+    kv_cache: str
+    max_new_tokens: int
+    requested_tokens: int
+    prompt_tokens: int
+    peak_bytes: int
+    budget_bytes: int
+
+    @property
+    def downscaled(self) -> bool:
+        return self.max_new_tokens < self.requested_tokens
+
+    def generate_kwargs(self, residual_length: int = 128) -> Dict[str, Any]:
+        """Extra ``model.generate`` kwargs selecting the planned KV cache"""
+        if self.kv_cache in _NBITS:
+            return {
+                "cache_implementation": "quantized",
+                "cache_config": {"backend": quantized_cache_backend(self.kv_cache),
+                                 "nbits": _NBITS[self.kv_cache], "residual_length": residual_length},
+            }
+        if self.kv_cache == "offload":
+            return {"cache_implementation": "offloaded"}
+        return {}
+
+
+def plan_generation(config: Any, prompt_tokens: int, max_new_tokens: int, free_bytes: int,
+                    kv_cache: str = "full", device_type: str = "cuda", dtype_bytes: int = 2,
+                    batch_size: int = 1, attention_type: str = "sdpa", residual_length: int = 128,
+                    reserve_bytes: int = 0, downscale: bool = True, min_new_tokens: int = 128,
+                    host_free_bytes: int = 0) -> MemoryPlan:
+    """
+    Pick the KV cache layout and token limit for a generate call
+
+    ``free_bytes`` is the device memory left after the weights are loaded.
+    With ``kv_cache="auto"`` the first layout (full, int8, int4, offload)
+    whose estimate fits is used. If none fits, ``max_new_tokens`` is lowered
+    to what the most compact layout holds (``downscale``) or RuntimeError is
+    raised, as it is when not even ``min_new_tokens`` would fit. The offloaded
+    cache must also fit in ``host_free_bytes`` of CPU RAM (0: not checked).
+    """
+    if kv_cache == "auto":
+        candidates = [mode for mode in _AUTO_ORDER if kv_mode_available(mode, device_type)]
+    elif kv_mode_available(kv_cache, device_type):
+        candidates = [kv_cache]
+    elif kv_cache in _NBITS:
+        raise RuntimeError(f"The {kv_cache} KV cache needs a quantization backend "
+                           f"({'pip install hqq' if kv_cache == 'int8' else 'pip install optimum-quanto'})")
+    else:
+        raise RuntimeError(f"The {kv_cache} KV cache is not available on {device_type}")
+
+    budget = max(0, free_bytes - reserve_bytes)
+
+    def estimate(mode: str, tokens: int) -> int:
+        return estimate_peak_bytes(config, prompt_tokens, tokens, mode, dtype_bytes,
+                                   batch_size, attention_type, residual_length)
+
+    def fits(mode: str, tokens: int) -> bool:
+        if mode == "offload" and host_free_bytes:
+            host_kv = batch_size * (prompt_tokens + tokens) * kv_bytes_per_token(config, dtype_bytes)
+            if host_kv > host_free_bytes - reserve_bytes:
+                return False
+        return estimate(mode, tokens) <= budget
+
+    for mode in candidates:
+        if fits(mode, max_new_tokens):
+            return MemoryPlan(mode, max_new_tokens, max_new_tokens, prompt_tokens,
+                              estimate(mode, max_new_tokens), budget)
+
+    def max_tokens(mode: str) -> int:
+        """Largest token count that fits, 0 if not even the floor does (estimates grow monotonically)"""
+        if not fits(mode, floor):
+            return 0
+        low, high = floor, max_new_tokens
+        while low < high:
+            middle = (low + high + 1) // 2
+            if fits(mode, middle):
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    floor = min(min_new_tokens, max_new_tokens)
+    tokens, mode = max((max_tokens(mode), mode) for mode in candidates) if downscale else (0, candidates[-1])
+    if not tokens:
+        raise RuntimeError(
+            f"Not enough memory to generate: {prompt_tokens} prompt tokens plus {max_new_tokens} new tokens "
+            f"need ~{estimate(mode, max_new_tokens) / 1024 ** 3:.1f}GB with the {mode} KV cache, "
+            f"{budget / 1024 ** 3:.1f}GB available. Lower max_pixels, max_new_tokens or the number of frames."
+        )
+    return MemoryPlan(mode, tokens, max_new_tokens, prompt_tokens, estimate(mode, tokens), budget)
+
+
+def plan_from_config(model_config: Any, prompt_tokens: int, max_new_tokens: int, free_bytes: int,
+                     kv_cache: str, device_type: str, dtype_bytes: int, batch_size: int = 1,
+                     attention_type: str = "sdpa", host_free_bytes: int = 0) -> MemoryPlan:
+    """
+    plan_generation with the budget, reserve and overflow policy from the
+    config; a configured ``local.kv_memory.budget_gb`` replaces ``free_bytes``
+    """
+    config = get_config()
+    budget_gb = config.get_kv_memory_budget_gb()
+    if budget_gb > 0:
+        free_bytes, reserve_bytes = int(budget_gb * 1024 ** 3), 0
+    else:
+        reserve_bytes = int(config.get_kv_memory_reserve_mb() * 1024 ** 2)
+    return plan_generation(
+        model_config, prompt_tokens, max_new_tokens, free_bytes, kv_cache, device_type, dtype_bytes,
+        batch_size, attention_type,
+        residual_length=config.get_kv_memory_residual_length(),
+        reserve_bytes=reserve_bytes,
+        downscale=config.get_kv_memory_on_overflow() == "downscale",
+        min_new_tokens=config.get_kv_memory_min_new_tokens(),
+        host_free_bytes=host_free_bytes,
+    )
+
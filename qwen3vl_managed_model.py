@@ -0,0 +1,172 @@
+"""
+Managed Model for Qwen3-VL
+Wraps local Qwen3-VL models as ComfyUI managed models so they share VRAM
+with diffusion models and get offloaded/reloaded by comfy.model_management
+"""
+
+from typing import List, Optional
+
+import torch
+import comfy.model_management
+import comfy.model_patcher
+
+from .qwen3vl_compile import release_static_caches
+
+
+def find_decoder_layers(model: torch.nn.Module) -> Optional[torch.nn.ModuleList]:
+    """Find the language model decoder layers (the largest non-vision ``*layers`` list)"""
+    best, best_numel = None, 0
+    for name, module in model.named_modules():
+        if isinstance(module, torch.nn.ModuleList) and name.endswith("layers") and "visual" not in name:
+            numel = sum(p.numel() for p in module.parameters())
+            if numel > best_numel:
+                best, best_numel = module, numel
+    return best
+
+
+def _tensors_bytes(tensors) -> int:
+    seen, total = set(), 0
+    for t in tensors:
+        if t is None or id(t) in seen:
+            continue
+        seen.add(id(t))
+        total += t.numel() * t.element_size()
+    return total
+
+
+def _move_own_tensors(module: torch.nn.Module, device: torch.device) -> None:
+    """Move parameters and buffers owned directly by ``module`` (not its children)"""
+    for param in module._parameters.values():
+        if param is not None and param.device != device:
+            param.data = param.data.to(device, non_blocking=True)
+    for name, buf in module._buffers.items():
+        if buf is not None and buf.device != device:
+            module._buffers[name] = buf.to(device, non_blocking=True)
+
+
+class Qwen3VLModelPatcher(comfy.model_patcher.ModelPatcher):
+    """
+    ModelPatcher for a transformers Qwen3-VL model
+
+    The vision tower, embeddings, norms and LM head ("core") are always loaded
+    together. Decoder layers are loaded one by one as memory allows; layers
+    left on the offload device are streamed to the GPU for each forward pass,
+    which lets ComfyUI partially load and partially offload the model.
+    """
+
+    def __init__(self, model: torch.nn.Module, load_device: torch.device, offload_device: torch.device):
+        layers = find_decoder_layers(model)
+        self.decoder_layers: List[torch.nn.Module] = list(layers) if layers is not None else []
+        layer_module_ids = {id(m) for layer in self.decoder_layers for m in layer.modules()}
+        self._core_modules = [m for m in model.modules() if id(m) not in layer_module_ids]
+
+        self._core_bytes = _tensors_bytes(
+            t for m in self._core_modules for t in list(m._parameters.values()) + list(m._buffers.values())
+        )
+        self._layer_bytes = [
+            _tensors_bytes(list(layer.parameters()) + list(layer.buffers())) for layer in self.decoder_layers
+        ]
+        self._core_loaded = False
+        self._loaded_layers = set()
+
+        super().__init__(
+            model,
+            load_device=load_device,
+            offload_device=offload_device,
+            size=self._core_bytes + sum(self._layer_bytes),
+        )
+
+        for layer in self.decoder_layers:
+            layer._qwen3vl_streamed = False
+            layer.register_forward_pre_hook(self._stream_in)
+            layer.register_forward_hook(self._stream_out)
+
+    def _stream_in(self, module, args):
+        if module._qwen3vl_streamed:
+            module.to(self.load_device, non_blocking=True)
+
+    def _stream_out(self, module, args, output):
+        if module._qwen3vl_streamed:
+            module.to(self.offload_device)
+
+    def _sync_state(self) -> None:
+        streamed = self._core_loaded and len(self._loaded_layers) < len(self.decoder_layers)
+        for i, layer in enumerate(self.decoder_layers):
+            layer._qwen3vl_streamed = self._core_loaded and i not in self._loaded_layers
+        self.model.model_loaded_weight_memory = self.loaded_size()
+        self.model.model_lowvram = streamed
+
+    def model_size(self) -> int:
+        return self.size
+
+    def loaded_size(self) -> int:
+        core = self._core_bytes if self._core_loaded else 0
+        return core + sum(self._layer_bytes[i] for i in self._loaded_layers)
+
+    def model_dtype(self):
+        return self.model.dtype
+
+    def current_loaded_device(self):
+        return self.load_device if self._core_loaded else self.offload_device
+
+    def partially_load(self, device_to, extra_memory=0, force_patch_weights=False) -> int:
+        """Load core modules, then as many decoder layers as ``extra_memory`` allows"""
+        moved = 0
+        if not self._core_loaded:
+            for module in self._core_modules:
+                _move_own_tensors(module, device_to)
+            self._core_loaded = True
+            moved += self._core_bytes
+
+        for i, layer in enumerate(self.decoder_layers):
+            if i in self._loaded_layers:
+                continue
+            if moved + self._layer_bytes[i] > extra_memory:
+                break
+            layer.to(device_to)
+            self._loaded_layers.add(i)
+            moved += self._layer_bytes[i]
+
+        self._sync_state()
+        return moved
+
+    def partially_unload(self, device_to, memory_to_free=0, force_patch_weights=False) -> int:
+        """Offload decoder layers, last first, until ``memory_to_free`` is reached"""
+        # Static KV caches sit outside ComfyUI's accounting, they go first
+        release_static_caches(self.model)
+        freed = 0
+        for i in sorted(self._loaded_layers, reverse=True):
+            if freed >= memory_to_free:
+                break
+            self.decoder_layers[i].to(device_to)
+            self._loaded_layers.discard(i)
+            freed += self._layer_bytes[i]
+
+        self._sync_state()
+        return freed
+
+    def patch_model(self, device_to=None, lowvram_model_memory=0, load_weights=True, force_patch_weights=False):
+        if device_to is not None and load_weights:
+            budget = lowvram_model_memory if lowvram_model_memory > 0 else float("inf")
+            self.partially_load(device_to, budget)
+        return self.model
+
+    def unpatch_model(self, device_to=None, unpatch_weights=True):
+        if unpatch_weights and device_to is not None:
+            release_static_caches(self.model)
+            self.model.to(device_to)
+            self._core_loaded = False
+            self._loaded_layers.clear()
+            self._sync_state()
+
+    def detach(self, unpatch_all=True):
+        self.unpatch_model(self.offload_device, unpatch_weights=unpatch_all)
+        return self.model
+
+    def release_memory(self) -> None:
+        """Drop this model from ComfyUI's loaded models (called on pool eviction)"""
+        loaded_models = comfy.model_management.current_loaded_models
+        for i in range(len(loaded_models) - 1, -1, -1):
+            if loaded_models[i].model is self:
+                loaded_models.pop(i).model_unload()
+        self.detach()
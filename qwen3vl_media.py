@@ -0,0 +1,174 @@
+"""
+Media preprocessing for Qwen3-VL
+Converts ComfyUI IMAGE/VIDEO tensors into processor-ready inputs in memory
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+import torch.nn.functional as F
+
+
+# Qwen3-VL: 16px patches merged 2x2 -> sizes must be multiples of 32
+IMAGE_FACTOR = 32
+MAX_RATIO = 200
+
+
+def smart_resize(height: int, width: int, factor: int = IMAGE_FACTOR,
+                 min_pixels: int = 4 * 32 * 32, max_pixels: int = 16384 * 32 * 32) -> Tuple[int, int]:
+    """
+    Rescale (height, width) so that both are divisible by ``factor`` and the
+    pixel count lies in [min_pixels, max_pixels], keeping the aspect ratio
+    (same rule as qwen_vl_utils / the Qwen2-VL image processor)
+    """
+    if max(height, width) / max(1, min(height, width)) > MAX_RATIO:
+        raise ValueError(
+            f"absolute aspect ratio must be smaller than {MAX_RATIO}, got {max(height, width) / min(height, width)}"
+        )
+    h_bar = max(factor, round(height / factor) * factor)
+    w_bar = max(factor, round(width / factor) * factor)
+    if h_bar * w_bar > max_pixels:
+        beta = math.sqrt((height * width) / max_pixels)
+        h_bar = max(factor, math.floor(height / beta / factor) * factor)
+        w_bar = max(factor, math.floor(width / beta / factor) * factor)
+    elif h_bar * w_bar < min_pixels:
+        beta = math.sqrt(min_pixels / (height * width))
+        h_bar = math.ceil(height * beta / factor) * factor
+        w_bar = math.ceil(width * beta / factor) * factor
+    return h_bar, w_bar
+
+
+def cap_dimension(height: int, width: int, max_dimension: Optional[int]) -> Tuple[int, int]:
+    """Scale (height, width) down so the longest side is at most ``max_dimension``"""
+    if max_dimension and max(height, width) > max_dimension:
+        scale = max_dimension / max(height, width)
+        height, width = max(1, int(height * scale)), max(1, int(width * scale))
+    return height, width
+
+
+def target_size(height: int, width: int, max_dimension: Optional[int],
+                min_pixels: int, max_pixels: int) -> Tuple[int, int]:
+    """Cap the longest side at ``max_dimension``, then snap to the model's patch grid"""
+    height, width = cap_dimension(height, width, max_dimension)
+    return smart_resize(height, width, IMAGE_FACTOR, min_pixels, max_pixels)
+
+
+def resize_batch(images: torch.Tensor, size: Tuple[int, int]) -> torch.Tensor:
+    """Resize a (B, H, W, C) batch in one call, returns (B, C, h, w) of the same scale"""
+    batch = images.movedim(-1, 1)
+    if tuple(batch.shape[-2:]) == tuple(size):
+        return batch
+    downscale = size[0] < batch.shape[-2] or size[1] < batch.shape[-1]
+    resized = F.interpolate(batch.float(), size=size, mode="bilinear", align_corners=False, antialias=downscale)
+    if images.dtype == torch.uint8:
+        return resized.round_().clamp_(0, 255).to(torch.uint8)
+    return resized
+
+
+def to_uint8(images: torch.Tensor) -> torch.Tensor:
+    """Convert a [0, 1] float tensor to uint8, uint8 input is returned as is"""
+    if images.dtype == torch.uint8:
+        return images
+    return images.float().mul(255.0).round_().clamp_(0, 255).to(torch.uint8)
+
+
+def prepare_images(images: torch.Tensor, max_dimension: Optional[int] = None,
+                   min_pixels: int = 4 * 32 * 32, max_pixels: int = 16384 * 32 * 32) -> List[torch.Tensor]:
+    """
+    Turn a ComfyUI IMAGE batch (B, H, W, C) in [0, 1] into a list of (C, h, w)
+    uint8 tensors sized for Qwen3-VL, ready to be handed to the processor
+
+    The whole batch is resized with a single interpolate call; no PIL or
+    PNG/base64 round-trip is involved.
+    """
+    if images.dim() == 3:
+        images = images.unsqueeze(0)
+    if images.shape[-1] == 4:
+        images = images[..., :3]
+
+    size = target_size(images.shape[1], images.shape[2], max_dimension, min_pixels, max_pixels)
+    with torch.no_grad():
+        resized = to_uint8(resize_batch(images, size))
+    return list(resized.cpu().unbind(0))
+
+
+# Video frames are paired over time (temporal patch size 2)
+FRAME_FACTOR = 2
+VIDEO_MIN_PIXELS = 128 * 32 * 32
+VIDEO_TOTAL_PIXELS = 24576 * 32 * 32
+VIDEO_RESIZE_CHUNK = 16
+# fps assumed for frame tensors that carry no metadata (old mp4 re-encode rate)
+DEFAULT_VIDEO_FPS = 2.0
+# Frame cap for video files decoded by the processor (qwen_vl_utils' FPS_MAX_FRAMES)
+VIDEO_MAX_FRAMES = 768
+
+_VIDEO_FPS_ATTR = "qwen3vl_fps"
+_VIDEO_INDICES_ATTR = "qwen3vl_frame_indices"
+
+
+def attach_video_metadata(frames: torch.Tensor, fps: float, frame_indices: List[int]) -> torch.Tensor:
+    """
+    Record the source fps and source frame index of each sampled frame on a
+    VIDEO tensor, so timestamps survive the trip between nodes
+    """
+    setattr(frames, _VIDEO_FPS_ATTR, float(fps))
+    setattr(frames, _VIDEO_INDICES_ATTR, list(frame_indices))
+    return frames
+
+
+def get_video_metadata(frames: torch.Tensor) -> Tuple[float, List[int]]:
+    """Source fps and frame indices of a VIDEO tensor, defaults for plain tensors"""
+    fps = getattr(frames, _VIDEO_FPS_ATTR, None)
+    indices = getattr(frames, _VIDEO_INDICES_ATTR, None)
+    if fps is None or indices is None or len(indices) != frames.shape[0]:
+        return DEFAULT_VIDEO_FPS, list(range(frames.shape[0]))
+    return fps, indices
+
+
+def video_frame_max_pixels(num_frames: int, min_pixels: int, max_pixels: int) -> int:
+    """Per-frame pixel cap that keeps the whole clip within VIDEO_TOTAL_PIXELS"""
+    per_frame = VIDEO_TOTAL_PIXELS / max(1, num_frames) * FRAME_FACTOR
+    return int(min(max_pixels, max(per_frame, VIDEO_MIN_PIXELS, min_pixels)))
+
+
+def prepare_video(frames: torch.Tensor, min_pixels: int = VIDEO_MIN_PIXELS,
+                  max_pixels: int = 768 * 32 * 32,
+                  frame_max_pixels: Optional[int] = None) -> Tuple[torch.Tensor, Dict[str, Any]]:
+    """
+    Turn a VIDEO tensor (T, H, W, C) into a (T, C, h, w) uint8 tensor sized for
+    Qwen3-VL plus the metadata the video processor needs for timestamps
+
+    Frames are passed to the processor directly; nothing is encoded to disk.
+    ``frame_max_pixels`` further caps each frame (e.g. from a token budget).
+    """
+    if frames.shape[-1] == 4:
+        frames = frames[..., :3]
+    fps, indices = get_video_metadata(frames)
+
+    # Keep an even number of frames, as the temporal patch pairs them
+    if frames.shape[0] % FRAME_FACTOR:
+        frames = torch.cat([frames, frames[-1:].expand(FRAME_FACTOR - frames.shape[0] % FRAME_FACTOR, -1, -1, -1)])
+        indices = indices + [indices[-1]] * (frames.shape[0] - len(indices))
+
+    clip_max_pixels = video_frame_max_pixels(frames.shape[0], min_pixels, max_pixels)
+    frame_max_pixels = min(frame_max_pixels, clip_max_pixels) if frame_max_pixels else clip_max_pixels
+    size = smart_resize(frames.shape[1], frames.shape[2], IMAGE_FACTOR,
+                        min(min_pixels, frame_max_pixels), frame_max_pixels)
+    # Resize in chunks so a long clip never gets a full-resolution float copy
+    resized = torch.empty((frames.shape[0], 3, size[0], size[1]), dtype=torch.uint8)
+    with torch.no_grad():
+        for start in range(0, frames.shape[0], VIDEO_RESIZE_CHUNK):
+            chunk = frames[start:start + VIDEO_RESIZE_CHUNK]
+            resized[start:start + chunk.shape[0]] = to_uint8(resize_batch(chunk, size)).cpu()
+
+    metadata = {
+        "fps": fps,
+        "frames_indices": indices,
+        "total_num_frames": indices[-1] + 1,
+        "duration": (indices[-1] + 1) / fps,
+        "height": size[0],
+        "width": size[1],
+        "video_backend": "tensor",
+    }
+    return resized, metadata
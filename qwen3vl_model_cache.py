@@ -0,0 +1,353 @@
+"""
+Model Cache for Qwen3-VL
+Process-wide pool of resident local models shared by all processor nodes
+"""
+
+import gc
+import json
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+import torch
+
+from .qwen3vl_config import get_config
+
+
+# (model_name, quantization, attention_type)
+ModelKey = Tuple[str, str, str]
+
+# Share of device memory used by the pool when max_memory_gb is 0
+AUTO_BUDGET_FRACTION = 0.75
+
+# Rough size of quantized weights relative to the bf16/fp16 checkpoint
+_QUANTIZATION_SCALE = {"none": 1.0, "8bit": 0.55, "4bit": 0.3, "int8_weight_only": 0.55}
+
+_WEIGHT_SUFFIXES = ('.safetensors', '.bin', '.pt')
+
+
+@dataclass
+class PoolEntry:
+    """A loaded model tracked by the pool"""
+    key: ModelKey
+    model: Any
+    size_bytes: int
+    refcount: int = 0
+    # Holders that asked to keep the model loaded
+    pinned_by: Set[Hashable] = field(default_factory=set)
+    last_used: float = field(default_factory=time.monotonic)
+
+    @property
+    def pinned(self) -> bool:
+        return bool(self.pinned_by)
+
+
+def estimate_checkpoint_bytes(checkpoint_dir: str, quantization: str = "none") -> int:
+    """Estimate resident size of a checkpoint from its weight files"""
+    total = 0
+    if os.path.isdir(checkpoint_dir):
+        for name in os.listdir(checkpoint_dir):
+            if name.endswith(_WEIGHT_SUFFIXES):
+                total += os.path.getsize(os.path.join(checkpoint_dir, name))
+    return int(total * _QUANTIZATION_SCALE.get(quantization, 1.0))
+
+
+def checkpoint_parameter_count(checkpoint_dir: str) -> int:
+    """
+    Parameters of a checkpoint from its safetensors headers, without loading
+    any weights; other formats are estimated at 2 bytes per parameter
+    """
+    total = 0
+    if not os.path.isdir(checkpoint_dir):
+        return total
+    for name in os.listdir(checkpoint_dir):
+        path = os.path.join(checkpoint_dir, name)
+        if name.endswith('.safetensors'):
+            with open(path, 'rb') as f:
+                header = json.loads(f.read(struct.unpack('<Q', f.read(8))[0]))
+            for tensor, info in header.items():
+                if tensor != "__metadata__":
+                    count = 1
+                    for dim in info["shape"]:
+                        count *= dim
+                    total += count
+        elif name.endswith(_WEIGHT_SUFFIXES):
+            total += os.path.getsize(path) // 2
+    return total
+
+
+def prefetch_checkpoint(checkpoint_dir: str, chunk_bytes: int = 64 * 1024 ** 2) -> int:
+    """Read the weight files once so the following mmap'd load hits the page cache"""
+    total = 0
+    if not os.path.isdir(checkpoint_dir):
+        return total
+    buffer = bytearray(chunk_bytes)
+    for name in sorted(os.listdir(checkpoint_dir)):
+        if not name.endswith(_WEIGHT_SUFFIXES):
+            continue
+        with open(os.path.join(checkpoint_dir, name), 'rb', buffering=0) as f:
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                total += read
+    return total
+
+
+def _model_bytes(model: Any) -> int:
+    """Actual memory footprint of a loaded model"""
+    if hasattr(model, "model_size"):
+        return int(model.model_size())
+    device_map = getattr(model, "hf_device_map", None) or {}
+    if any(device in ("cpu", "disk") for device in device_map.values()):
+        # Offloaded layers live in RAM or on disk, only the device share counts against the budget
+        return sum(p.numel() * p.element_size() for p in model.parameters() if p.device.type not in ("cpu", "meta"))
+    if hasattr(model, "get_memory_footprint"):
+        try:
+            return int(model.get_memory_footprint())
+        except Exception:
+            pass
+    return sum(p.numel() * p.element_size() for p in model.parameters())
+
+
+def _device_total_bytes() -> int:
+    """Total memory of the inference device (VRAM, or RAM when CPU-only)"""
+    if torch.cuda.is_available():
+        return torch.cuda.get_device_properties(torch.cuda.current_device()).total_memory
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+
+def _free_device_memory() -> None:
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+        torch.cuda.ipc_collect()
+
+
+class Qwen3VLModelPool:
+    """
+    LRU pool of loaded Qwen3-VL models with a memory budget
+
+    Models are reference counted while a node uses them; only unreferenced,
+    unpinned entries are evicted, least recently used first.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[ModelKey, PoolEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks: Dict[ModelKey, threading.Lock] = {}
+        self._processors: Dict[str, Any] = {}
+        self._load_timings: Dict[ModelKey, Dict[str, float]] = {}
+        # Preloaded models that still need a warmup generation on first use
+        self._warmup_pending: Set[ModelKey] = set()
+
+    @staticmethod
+    def get_budget_bytes() -> int:
+        """Memory budget in bytes, 0 means unlimited (device size unknown)"""
+        budget_gb = get_config().get_model_pool_max_memory_gb()
+        if budget_gb > 0:
+            return int(budget_gb * 1024 ** 3)
+        return int(_device_total_bytes() * AUTO_BUDGET_FRACTION)
+
+    def used_bytes(self) -> int:
+        with self._lock:
+            return sum(e.size_bytes for e in self._entries.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the pool contents for logging"""
+        with self._lock:
+            return {
+                "budget_gb": self.get_budget_bytes() / 1024 ** 3,
+                "used_gb": self.used_bytes() / 1024 ** 3,
+                "models": [
+                    {"key": e.key, "size_gb": e.size_bytes / 1024 ** 3,
+                     "refcount": e.refcount, "pinned": e.pinned}
+                    for e in self._entries.values()
+                ],
+            }
+
+    def _has_room(self, size_bytes: int) -> bool:
+        """Whether a model of ``size_bytes`` fits without evicting anything; call with the lock held"""
+        budget = self.get_budget_bytes()
+        max_models = get_config().get_model_pool_max_models()
+        return ((budget <= 0 or self.used_bytes() + size_bytes <= budget)
+                and (max_models <= 0 or len(self._entries) < max_models))
+
+    def request_warmup(self, key: ModelKey) -> None:
+        """Mark a model for a warmup generation the next time it is used"""
+        with self._lock:
+            if key in self._entries:
+                self._warmup_pending.add(key)
+
+    def take_warmup(self, key: ModelKey) -> bool:
+        """Whether the caller should warm the model up now; True once per request_warmup"""
+        with self._lock:
+            if key not in self._warmup_pending:
+                return False
+            self._warmup_pending.discard(key)
+            return True
+
+    def record_load_phase(self, key: ModelKey, phase: str, seconds: float) -> None:
+        """Remember how long a load phase (file_io, materialize, device_transfer, warmup) took"""
+        with self._lock:
+            self._load_timings.setdefault(key, {})[phase] = seconds
+
+    def load_timings(self) -> Dict[ModelKey, Dict[str, float]]:
+        """Most recent load phase timings per model"""
+        with self._lock:
+            return {key: dict(phases) for key, phases in self._load_timings.items()}
+
+    def get_processor(self, checkpoint: str, loader: Callable[[], Any]) -> Any:
+        """Get a cached processor/tokenizer, they are cheap to keep resident"""
+        with self._lock:
+            processor = self._processors.get(checkpoint)
+        if processor is None:
+            processor = loader()
+            with self._lock:
+                processor = self._processors.setdefault(checkpoint, processor)
+        return processor
+
+    def acquire(self, key: ModelKey, loader: Callable[[], Any], size_hint: int = 0,
+                evict: bool = True) -> Optional[Any]:
+        """
+        Get a model from the pool, loading it on a miss, and take a reference
+
+        With ``evict=False`` nothing is evicted to make room (eviction
+        releases ComfyUI-managed memory, which only the executor thread may
+        do): None is returned when the model doesn't fit, checked before and
+        again after loading.
+        """
+        with self._lock:
+            entry = self._take(key)
+            if entry is not None:
+                return entry.model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Load outside the pool lock so other models stay available meanwhile
+        with load_lock:
+            with self._lock:
+                entry = self._take(key)
+                if entry is not None:
+                    return entry.model
+                if evict:
+                    self._make_room(size_hint, 1)
+                elif not self._has_room(size_hint):
+                    return None
+
+            print(f"[Qwen3-VL] Loading model into pool: {key}")
+            model = loader()
+            entry = PoolEntry(key=key, model=model, size_bytes=_model_bytes(model), refcount=1)
+
+            with self._lock:
+                if not evict and not self._has_room(entry.size_bytes):
+                    print(f"[Qwen3-VL] Pool filled up while loading {key}, not keeping it")
+                    return None
+                self._entries[key] = entry
+                if evict:
+                    self._make_room()
+            return model
+
+    def release(self, key: ModelKey, keep_loaded: bool = False, holder: Hashable = None,
+                evict: bool = True) -> None:
+        """
+        Drop a reference and set ``holder``'s pin; pinned models are never
+        evicted by the LRU, and a holder can only lift its own pin. With
+        ``evict=False`` the pool is left over budget for the next acquire
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refcount = max(0, entry.refcount - 1)
+            if keep_loaded:
+                entry.pinned_by.add(holder)
+            else:
+                entry.pinned_by.discard(holder)
+            entry.last_used = time.monotonic()
+            if evict:
+                self._make_room()
+
+    def rekey(self, key: ModelKey, new_key: ModelKey) -> bool:
+        """
+        File a model changed in place (e.g. its attention backend) under a new
+        key; only when the caller holds the sole reference and the key is free
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refcount != 1 or new_key in self._entries:
+                return False
+            del self._entries[key]
+            entry.key = new_key
+            self._entries[new_key] = entry
+            if key in self._load_timings:
+                self._load_timings[new_key] = self._load_timings.pop(key)
+            if key in self._warmup_pending:
+                self._warmup_pending.discard(key)
+                self._warmup_pending.add(new_key)
+            return True
+
+    def evict(self, key: ModelKey) -> bool:
+        """Remove an unreferenced model from the pool"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refcount > 0:
+                return False
+            del self._entries[key]
+            self._warmup_pending.discard(key)
+            print(f"[Qwen3-VL] Evicted model from pool: {key} ({entry.size_bytes / 1024 ** 3:.2f}GB)")
+        # Managed models must also leave ComfyUI's loaded model list
+        release_memory = getattr(entry.model, "release_memory", None)
+        if release_memory is not None:
+            release_memory()
+        del entry
+        _free_device_memory()
+        return True
+
+    def clear(self) -> None:
+        """Evict every unreferenced model and drop cached processors"""
+        with self._lock:
+            keys = list(self._entries.keys())
+            self._processors.clear()
+        for key in keys:
+            self.evict(key)
+
+    def _take(self, key: ModelKey) -> Optional[PoolEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.refcount += 1
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(key)
+        return entry
+
+    def _make_room(self, incoming_bytes: int = 0, incoming_models: int = 0) -> None:
+        """Evict LRU entries until the budget and model count fit"""
+        budget = self.get_budget_bytes()
+        max_models = get_config().get_model_pool_max_models()
+
+        for key in list(self._entries.keys()):
+            over_budget = budget > 0 and self.used_bytes() + incoming_bytes > budget
+            over_count = max_models > 0 and len(self._entries) + incoming_models > max_models
+            if not (over_budget or over_count):
+                break
+            entry = self._entries[key]
+            if entry.refcount == 0 and not entry.pinned:
+                self.evict(key)
+
+
+# Global pool instance
+_pool = None
+
+
+def get_model_pool() -> Qwen3VLModelPool:
+    """Get global model pool instance"""
+    global _pool
+    if _pool is None:
+        _pool = Qwen3VLModelPool()
+    return _pool
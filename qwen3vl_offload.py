@@ -0,0 +1,137 @@
+"""
+Memory-Budgeted Offload for Qwen3-VL
+Places a model across GPU, CPU RAM and disk within explicit memory budgets,
+keeping the vision tower on the GPU while offloaded decoder layers are
+streamed in for every forward pass
+"""
+
+import os
+import re
+from typing import Any, Dict, Union
+
+import torch
+
+# VRAM kept out of the GPU budget for the KV cache and activations
+GPU_HEADROOM_FRACTION = 0.2
+GPU_MIN_HEADROOM = 2 * 1024 ** 3
+
+# Share of available RAM the CPU budget may use when not set explicitly
+CPU_BUDGET_FRACTION = 0.8
+
+Device = Union[int, str]
+
+_LAYER_PATTERN = re.compile(r"^(.*\.layers)\.(\d+)$")
+
+
+def available_ram_bytes() -> int:
+    """RAM that can be used without swapping"""
+    try:
+        import psutil
+        return int(psutil.virtual_memory().available)
+    except ImportError:
+        pass
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+
+def offload_budgets(device: torch.device, free_bytes: int, gpu_memory_gb: float = 0,
+                    cpu_memory_gb: float = 0) -> Dict[Device, int]:
+    """
+    ``max_memory`` for the device map in bytes; a budget of 0 means
+    ``free_bytes`` of the device minus headroom for generation, or a share of
+    the available RAM. Only CUDA devices get a GPU budget, accelerate can't
+    stream layers to other devices.
+    """
+    if cpu_memory_gb > 0:
+        cpu = int(cpu_memory_gb * 1024 ** 3)
+    else:
+        cpu = int(available_ram_bytes() * CPU_BUDGET_FRACTION)
+    if device.type != "cuda":
+        return {"cpu": max(0, cpu)}
+
+    if gpu_memory_gb > 0:
+        gpu = int(gpu_memory_gb * 1024 ** 3)
+    else:
+        gpu = int(free_bytes - max(GPU_MIN_HEADROOM, free_bytes * GPU_HEADROOM_FRACTION))
+    return {device.index or 0: max(0, gpu), "cpu": max(0, cpu)}
+
+
+def _vision_module_name(model: torch.nn.Module) -> str:
+    for name, module in model.named_modules():
+        if name.endswith("visual"):
+            return name
+    return ""
+
+
+def plan_device_map(checkpoint: str, dtype: torch.dtype, max_memory: Dict[Device, int]) -> Dict[str, Device]:
+    """
+    Device map that fills the GPU budget, then CPU RAM, then disk
+
+    The vision tower is always mapped to the GPU: it runs once per image over
+    many patches, streaming it would cost far more than streaming text layers.
+    Its size is taken out of the GPU budget first.
+    """
+    from accelerate import infer_auto_device_map, init_empty_weights
+    from accelerate.utils import compute_module_sizes
+    from transformers import AutoConfig, Qwen3VLForConditionalGeneration
+
+    config = AutoConfig.from_pretrained(checkpoint)
+    with init_empty_weights():
+        model = Qwen3VLForConditionalGeneration._from_config(config).to(dtype)
+
+    gpu = next(key for key in max_memory if key != "cpu")
+    vision = _vision_module_name(model)
+    sizes = compute_module_sizes(model, dtype=dtype)
+    budgets = dict(max_memory)
+    budgets[gpu] = max(0, budgets[gpu] - sizes.get(vision, 0))
+
+    device_map = infer_auto_device_map(
+        model,
+        max_memory=budgets,
+        no_split_module_classes=getattr(model, "_no_split_modules", None) or [],
+        dtype=dtype,
+    )
+    if vision:
+        device_map = {name: device for name, device in device_map.items()
+                      if name != vision and not name.startswith(vision + ".")}
+        device_map[vision] = gpu
+    return device_map
+
+
+def is_offloaded(model: Any) -> bool:
+    """True if part of the model lives in CPU RAM or on disk"""
+    device_map = getattr(model, "hf_device_map", None) or {}
+    return any(device in ("cpu", "disk") for device in device_map.values())
+
+
+def _device_name(device: Device) -> str:
+    return f"cuda:{device}" if isinstance(device, int) else str(device)
+
+
+def describe_placement(device_map: Dict[str, Device]) -> str:
+    """One line summary: decoder layer ranges per device plus the other modules"""
+    layers: Dict[str, Dict[int, Device]] = {}
+    others = []
+    for name, device in device_map.items():
+        match = _LAYER_PATTERN.match(name)
+        if match:
+            layers.setdefault(match.group(1), {})[int(match.group(2))] = device
+        else:
+            others.append(f"{name.rsplit('.', 1)[-1]} {_device_name(device)}")
+
+    parts = []
+    for prefix, placement in layers.items():
+        ranges, start, previous = [], None, None
+        for index in sorted(placement):
+            if start is None or placement[index] != placement[previous] or index != previous + 1:
+                if start is not None:
+                    ranges.append((start, previous, placement[start]))
+                start = index
+            previous = index
+        ranges.append((start, previous, placement[start]))
+        label = "vision blocks" if "visual" in prefix else "decoder layers"
+        parts.extend(f"{label} {a}-{b} {_device_name(d)}" if a != b else f"{label} {a} {_device_name(d)}"
+                     for a, b, d in ranges)
+    return ", ".join(others + parts)
@@ -0,0 +1,150 @@
+"""
+Prefix Cache for Qwen3-VL
+Reuses the KV cache of a shared prompt prefix (chat header plus media) across
+generate calls, so follow-up questions only prefill their own tokens
+"""
+
+import hashlib
+import time
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import torch
+
+from .qwen3vl_config import get_config
+from .qwen3vl_vision_cache import ByteBudgetLRU
+
+# Token closing each image/video span; the cached prefix ends after the last one
+VISION_END_TOKEN = "<|vision_end|>"
+
+_MEDIA_INPUTS = ("pixel_values", "image_grid_thw", "pixel_values_videos", "video_grid_thw")
+
+
+def _cache_layers(cache: Any) -> List[Tuple[torch.Tensor, torch.Tensor]]:
+    """(keys, values) per layer of a transformers cache object"""
+    if hasattr(cache, "layers"):
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    if hasattr(cache, "to_legacy_cache"):
+        return [tuple(kv[:2]) for kv in cache.to_legacy_cache()]
+    return [tuple(kv[:2]) for kv in cache]
+
+
+def _build_cache(layers: Sequence[Tuple[torch.Tensor, torch.Tensor]], device: torch.device):
+    """
+    Fresh DynamicCache on ``device`` starting from the given layers
+
+    Generation appends with torch.cat, so the stored tensors are never
+    modified and can be shared when they already live on ``device``.
+    """
+    from transformers import DynamicCache
+
+    cache = DynamicCache()
+    for index, (keys, values) in enumerate(layers):
+        cache.update(keys.to(device, non_blocking=True), values.to(device, non_blocking=True), index)
+    return cache
+
+
+def _language_model(model) -> Any:
+    """Module that owns ``rope_deltas`` (Qwen3VLModel)"""
+    inner = getattr(model, "model", model)
+    return inner if hasattr(inner, "rope_deltas") else model
+
+
+class Qwen3VLPrefixCache(ByteBudgetLRU):
+    """
+    LRU cache of prompt-prefix KV caches, bounded by ``max_bytes``
+
+    The prefix of a single-conversation prompt runs up to the end of its last
+    image/video, i.e. chat header and media. It is keyed by a hash of its
+    token ids, the media fingerprints and the model. Entries hold the KV
+    tensors on ``storage_device`` plus the multimodal rope offset.
+    """
+
+    def __init__(self, max_bytes: int, min_prefix_tokens: int = 256, storage_device: str = "cpu"):
+        super().__init__(max_bytes, ("prefix",))
+        self.min_prefix_tokens = min_prefix_tokens
+        self.storage_device = torch.device(storage_device)
+
+    def stats(self) -> Dict[str, float]:
+        stats = super().stats()
+        lookups = stats["prefix_hits"] + stats["prefix_misses"]
+        stats["prefix_hit_rate"] = stats["prefix_hits"] / lookups if lookups else 0.0
+        return stats
+
+    def prefix_length(self, processor, input_ids: torch.Tensor) -> int:
+        """Number of leading tokens worth caching, 0 if the prompt doesn't qualify"""
+        if input_ids.shape[0] != 1:
+            # Left-padded batches have no common prefix position
+            return 0
+        end_id = processor.tokenizer.convert_tokens_to_ids(VISION_END_TOKEN)
+        positions = (input_ids[0] == end_id).nonzero()
+        if positions.numel() == 0:
+            return 0
+        length = int(positions[-1].item()) + 1
+        if length < self.min_prefix_tokens or length >= input_ids.shape[1]:
+            return 0
+        return length
+
+    def generate_kwargs(self, model, processor, inputs, namespace: Hashable,
+                        media_keys: Sequence[Optional[str]]) -> Tuple[Dict[str, Any], int]:
+        """
+        Extra generate kwargs that start from the cached prefix KV (computing
+        and storing it first on a miss) and the prefix length; ``({}, 0)`` when
+        prefix caching doesn't apply
+
+        Must be called right before ``model.generate``, it sets the rope offset
+        the model uses for tokens after a cached prefix.
+        """
+        if any(key is None for key in media_keys):
+            return {}, 0
+        input_ids = inputs["input_ids"]
+        length = self.prefix_length(processor, input_ids)
+        if not length:
+            return {}, 0
+
+        prefix_ids = input_ids[0, :length].cpu().contiguous()
+        digest = hashlib.blake2b(prefix_ids.numpy().tobytes(), digest_size=16).hexdigest()
+        key = (namespace, digest, tuple(media_keys))
+
+        entry = self.get(key, "prefix")
+        if entry is None:
+            started = time.perf_counter()
+            prefix_inputs = {name: inputs[name] for name in _MEDIA_INPUTS if inputs.get(name) is not None}
+            with torch.no_grad():
+                output = model(
+                    input_ids=input_ids[:, :length],
+                    attention_mask=inputs["attention_mask"][:, :length],
+                    use_cache=True,
+                    logits_to_keep=1,
+                    **prefix_inputs
+                )
+            layers = [(k.to(self.storage_device), v.to(self.storage_device))
+                      for k, v in _cache_layers(output.past_key_values)]
+            rope_deltas = _language_model(model).rope_deltas
+            entry = (layers, rope_deltas.detach().to(self.storage_device) if rope_deltas is not None else None)
+            self.put(key, entry, time.perf_counter() - started)
+
+        layers, rope_deltas = entry
+        device = input_ids.device
+        if rope_deltas is not None:
+            # Text after the prefix continues from the prefix's multimodal positions
+            _language_model(model).rope_deltas = rope_deltas.to(device)
+        return {"past_key_values": _build_cache(layers, device)}, length
+
+
+# Global prefix cache instance
+_prefix_cache = None
+_prefix_cache_settings = None
+
+
+def get_prefix_cache() -> Optional[Qwen3VLPrefixCache]:
+    """Get global prefix cache instance, None when disabled in the config"""
+    global _prefix_cache, _prefix_cache_settings
+    config = get_config()
+    if not config.is_prefix_cache_enabled():
+        return None
+
+    settings = (int(config.get_prefix_cache_max_memory_mb() * 1024 ** 2), config.get_prefix_cache_min_tokens())
+    if _prefix_cache is None or settings != _prefix_cache_settings:
+        _prefix_cache = Qwen3VLPrefixCache(*settings)
+        _prefix_cache_settings = settings
+    return _prefix_cache
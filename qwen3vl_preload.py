@@ -0,0 +1,79 @@
+"""
+Model Preload for Qwen3-VL
+Reads and materializes configured local models on a background thread at
+startup so the first prompt doesn't pay for file I/O; moving them to the
+device and the warmup generation are left to the prompt executor, as
+ComfyUI's model management is not thread-safe
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .qwen3vl_config import get_config
+from .qwen3vl_model_cache import get_model_pool
+
+_preload_thread: Optional[threading.Thread] = None
+
+
+def _preload_worker(models) -> None:
+    # Imported here: the processor module pulls in transformers and ComfyUI
+    from .qwen3vl_processor import Qwen3VLProcessor
+
+    for entry in models:
+        model_name = entry.get("model_name")
+        if not model_name:
+            continue
+        quantization = entry.get("quantization", "none")
+        attention_type = entry.get("attention_type", "sdpa")
+        started = time.perf_counter()
+        try:
+            timings = Qwen3VLProcessor().preload(model_name, quantization, attention_type)
+        except Exception as e:
+            print(f"[Qwen3-VL] ⚠️ Preloading {model_name} failed: {e}")
+            continue
+        phases = ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in timings.items())
+        print(f"[Qwen3-VL] 🚀 Preloaded {model_name} ({quantization}, {attention_type}) "
+              f"in {time.perf_counter() - started:.1f}s: {phases}")
+
+
+def start_preload() -> Optional[threading.Thread]:
+    """Start the background preload if enabled in the config (once per process)"""
+    global _preload_thread
+    config = get_config()
+    if not config.is_preload_enabled() or _preload_thread is not None:
+        return _preload_thread
+
+    models = config.get_preload_models()
+    if not models:
+        return None
+    _preload_thread = threading.Thread(
+        target=_preload_worker, args=(models,),
+        daemon=True, name="qwen3vl-preload",
+    )
+    _preload_thread.start()
+    print(f"[Qwen3-VL] 🚀 Preloading {len(models)} model(s) in the background")
+    return _preload_thread
+
+
+def load_timings_json() -> Dict[str, Any]:
+    """Load phase timings per model, keyed by "model_name/quantization/attention_type" """
+    preloading = _preload_thread is not None and _preload_thread.is_alive()
+    return {
+        "preloading": preloading,
+        "models": {"/".join(key): phases for key, phases in get_model_pool().load_timings().items()},
+    }
+
+
+def register_routes() -> None:
+    """Expose load timings at GET /qwen3vl/load_timings on the ComfyUI server"""
+    try:
+        from aiohttp import web
+        from server import PromptServer
+        routes = PromptServer.instance.routes
+    except Exception:
+        return
+
+    @routes.get("/qwen3vl/load_timings")
+    async def load_timings(request):
+        return web.json_response(load_timings_json())
@@ -3,20 +3,77 @@ Qwen3-VL Processor Node - Main inference node for Qwen3-VL models
 Supports direct image and video inputs without intermediate conversion
 """
 
+import contextlib
+import math
 import os
+import time
 import torch
 import folder_paths
 from pathlib import Path
 from typing import Optional, List, Dict, Any, Tuple
-import base64
-import io
 from transformers import (
     Qwen3VLForConditionalGeneration,
     AutoProcessor,
     BitsAndBytesConfig,
 )
 import comfy.model_management
-from qwen_vl_utils import process_vision_info
+import comfy.utils
+from .qwen3vl_config import get_config
+from .qwen3vl_model_cache import (
+    checkpoint_parameter_count,
+    estimate_checkpoint_bytes,
+    get_model_pool,
+    prefetch_checkpoint,
+)
+from .qwen3vl_managed_model import Qwen3VLModelPatcher
+from .qwen3vl_media import (
+    DEFAULT_VIDEO_FPS,
+    FRAME_FACTOR,
+    IMAGE_FACTOR,
+    VIDEO_MAX_FRAMES,
+    attach_video_metadata,
+    cap_dimension,
+    prepare_images,
+    prepare_video,
+    video_frame_max_pixels,
+)
+from .qwen3vl_generation import (
+    Conversation,
+    estimate_prompt_tokens,
+    generate_batch,
+    generate_streaming,
+    tokenizers_match,
+)
+from .qwen3vl_scheduler import get_scheduler
+from .qwen3vl_vision_cache import get_vision_cache
+from .qwen3vl_prefix_cache import get_prefix_cache
+from .qwen3vl_compile import get_compiled_decode
+from .qwen3vl_kv_memory import KV_CACHE_MODES, estimate_peak_bytes, plan_from_config
+from .qwen3vl_attention_tuner import (
+    available_backends,
+    read_decision,
+    set_attention,
+    store_decision,
+    tune_attention,
+    tuning_key,
+)
+from .qwen3vl_offload import describe_placement, is_offloaded, offload_budgets, plan_device_map
+from .qwen3vl_visual_budget import (
+    VisualBudgetPlan,
+    plan_visual_budget,
+    prune_redundant_frames,
+    select_frames,
+)
+from .qwen3vl_video_decode import plan_sample_indices, probe_video, sample_video
+from .qwen3vl_quantized_cache import find_artifact, read_manifest, save_artifact
+from .qwen3vl_cpu import (
+    cpu_supports_bf16,
+    cpu_threads,
+    cpu_weight_dtype,
+    language_model_module,
+    quantize_int8_weight_only,
+    torchao_available,
+)
 
 
 class Qwen3VLProcessor:
@@ -42,12 +99,22 @@ class Qwen3VLProcessor:
         self.model_checkpoint = None
         self.processor = None
         self.model = None
+        self.patcher = None
         self.device = comfy.model_management.get_torch_device()
-        self.bf16_support = (
-            torch.cuda.is_available()
-            and torch.cuda.get_device_capability(self.device)[0] >= 8
-        )
+        self.offload_device = comfy.model_management.unet_offload_device()
+        self.cpu_mode = self.device.type == "cpu"
+        if self.cpu_mode:
+            self.bf16_support = cpu_supports_bf16()
+        else:
+            self.bf16_support = (
+                self.device.type == "cuda"
+                and torch.cuda.get_device_capability(self.device)[0] >= 8
+            )
         self.current_model_name = None
+        self.current_model_key = None
+        self.draft_model = None
+        self.draft_patcher = None
+        self.draft_model_key = None
 
     @classmethod
     def INPUT_TYPES(cls):
@@ -102,12 +169,18 @@ class Qwen3VLProcessor:
                     }
                 ),
                 "quantization": (
-                    ["none", "4bit", "8bit"],
-                    {"default": "none"}
+                    ["none", "4bit", "8bit", "int8_weight_only"],
+                    {
+                        "default": "none",
+                        "tooltip": "4bit/8bit use bitsandbytes (GPU only); int8_weight_only is torch-native and works on CPU"
+                    }
                 ),
                 "attention_type": (
-                    ["eager", "sdpa", "flash_attention_2"],
-                    {"default": "eager"}
+                    ["eager", "sdpa", "flash_attention_2", "auto"],
+                    {
+                        "default": "eager",
+                        "tooltip": "auto times every backend that works here once and remembers the fastest"
+                    }
                 ),
                 "seed": (
                     "INT",
@@ -122,6 +195,42 @@ class Qwen3VLProcessor:
                 "image": ("IMAGE",),
                 "video": ("VIDEO",),
                 "keep_model_loaded": ("BOOLEAN", {"default": False}),
+                "draft_model": (
+                    ["none"] + list(cls.MODEL_REPO_MAP.keys()),
+                    {
+                        "default": "none",
+                        "tooltip": "Smaller model of the same family used for assisted (speculative) decoding"
+                    }
+                ),
+                "visual_token_budget": (
+                    "INT",
+                    {
+                        "default": 0,
+                        "min": 0,
+                        "max": 262144,
+                        "step": 256,
+                        "tooltip": "Total visual tokens for all images and video frames together, "
+                                   "split by scaling them down evenly (0 = per-item min/max_pixels only)"
+                    }
+                ),
+                "prune_redundant_frames": (
+                    "BOOLEAN",
+                    {
+                        "default": False,
+                        "tooltip": "Drop video frames that are nearly identical to the previous kept ones"
+                    }
+                ),
+                "kv_cache": (
+                    KV_CACHE_MODES,
+                    {
+                        "default": "full",
+                        "tooltip": "KV cache layout; int8/int4 quantize it (needs hqq or optimum-quanto), "
+                                   "offload keeps it in CPU RAM, auto picks the first one that fits in memory"
+                    }
+                ),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
             }
         }
 
@@ -131,6 +240,9 @@ class Qwen3VLProcessor:
     CATEGORY = "Qwen3-VL"
     OUTPUT_NODE = True
 
+    # Last regular decode tokens/s per model key, baseline for assisted decoding
+    _decode_baselines: Dict[Tuple[str, str, str], float] = {}
+
     def _download_model_with_progress(self, model_id: str, local_dir: str):
         """Download model with progress display"""
         from huggingface_hub import snapshot_download
@@ -166,67 +278,680 @@ class Qwen3VLProcessor:
             print(f"{'='*70}\n")
             raise
 
-    def _load_model(self, model_name: str, quantization: str, attention_type: str):
-        """Load model and processor with specified configuration"""
-        if self.current_model_name == model_name and self.model is not None:
-            return
-
+    def _ensure_checkpoint(self, model_name: str) -> str:
+        """Local checkpoint dir of a model, downloaded on first use"""
         # Get HuggingFace repo ID from mapping, fallback to Qwen/{model_name}
         model_id = self.MODEL_REPO_MAP.get(model_name, f"Qwen/{model_name}")
 
         # Use model_name as local directory name
-        self.model_checkpoint = os.path.join(
+        checkpoint = os.path.join(
             folder_paths.models_dir, "qwen3vl", model_name
         )
 
         # Download model if not exists
-        if not os.path.exists(self.model_checkpoint):
-            self._download_model_with_progress(model_id, self.model_checkpoint)
+        if not os.path.exists(checkpoint):
+            self._download_model_with_progress(model_id, checkpoint)
+        return checkpoint
+
+    @staticmethod
+    def _get_processor(checkpoint: str) -> Any:
+        # Processors are cached separately, they are cheap to keep resident
+        return get_model_pool().get_processor(
+            checkpoint, lambda: AutoProcessor.from_pretrained(checkpoint)
+        )
+
+    def _acquire_model(self, model_name: str, quantization: str, attention_type: str,
+                       prefetch: bool = False) -> Tuple[Any, Any, str]:
+        """
+        Get (processor, model or patcher, checkpoint dir) from the shared pool,
+        taking a reference; ``prefetch`` is the background preload, which reads
+        the files first and gets None instead of evicting when the pool is full
+        """
+        model_key = (model_name, quantization, attention_type)
+        checkpoint = self._ensure_checkpoint(model_name)
 
-        # Load processor
-        self.processor = AutoProcessor.from_pretrained(self.model_checkpoint)
+        processor = self._get_processor(checkpoint)
+
+        def load():
+            if prefetch:
+                # Warm the page cache first so materialization below isn't IO bound
+                source = (find_artifact(checkpoint, quantization) if quantization in ("4bit", "8bit") else None)
+                started = time.perf_counter()
+                read = prefetch_checkpoint(source or checkpoint)
+                seconds = time.perf_counter() - started
+                get_model_pool().record_load_phase(model_key, "file_io", seconds)
+                print(f"[Qwen3-VL] 📖 Read {read / 1024 ** 3:.2f}GB of weights in {seconds:.1f}s")
+            started = time.perf_counter()
+            model = self._create_model(checkpoint, quantization, attention_type)
+            get_model_pool().record_load_phase(model_key, "materialize", time.perf_counter() - started)
+            return model
+
+        size_hint = estimate_checkpoint_bytes(checkpoint, quantization)
+        if self._uses_offload(quantization):
+            # Only the GPU share of an offloaded model counts against the pool
+            budgets = offload_budgets(self.device, comfy.model_management.get_free_memory(self.device),
+                                      get_config().get_offload_gpu_memory_gb())
+            size_hint = min(size_hint, sum(size for device, size in budgets.items() if device != "cpu"))
+        loaded = get_model_pool().acquire(model_key, load, size_hint=size_hint, evict=not prefetch)
+        return processor, loaded, checkpoint
+
+    def _compute_dtype(self, quantization: str) -> torch.dtype:
+        """dtype _create_model loads the weights in"""
+        if self.cpu_mode:
+            return cpu_weight_dtype(quantization)
+        return torch.bfloat16 if self.bf16_support else torch.float16
+
+    def _resolve_attention(self, model_name: str, quantization: str, tune: bool = True) -> str:
+        """
+        Attention backend for "auto": the cached decision for this machine,
+        model and dtype, otherwise the fastest backend timed on the loaded
+        model, which is then switched to it in place
+        """
+        dtype = self._compute_dtype(quantization)
+        cache_file = os.path.join(folder_paths.models_dir, "qwen3vl", "attention_tuning.json")
+        key = tuning_key(self.device, f"{model_name}/{quantization}", dtype)
+        backends = available_backends(self.device, dtype)
+        cached = read_decision(cache_file, key)
+        if cached in backends:
+            return cached
+        probe = "sdpa" if "sdpa" in backends else backends[0]
+        if not tune or len(backends) == 1:
+            return probe
+
+        self._load_model(model_name, quantization, probe)
+        self._load_to_device()
+        config = get_config()
+        timings = tune_attention(self.model, self.processor, self.device, backends, probe,
+                                 config.get_attention_tuning_prompt_tokens(),
+                                 config.get_attention_tuning_decode_tokens())
+        working = {backend: seconds for backend, seconds in timings.items() if seconds is not None}
+        best = min(working, key=working.get) if working else probe
+        store_decision(cache_file, key, best, timings)
+        summary = ", ".join(f"{b} {s:.2f}s" if s is not None else f"{b} failed" for b, s in timings.items())
+        print(f"[Qwen3-VL] 🏁 Attention auto-tune for {model_name}: {summary} -> {best}")
+
+        # Keep the probe's weights: switch them to the winner instead of loading again
+        best_key = (model_name, quantization, best)
+        if best != probe and get_model_pool().rekey(self.current_model_key, best_key):
+            set_attention(self.model, best)
+            self.current_model_key = best_key
+        return best
+
+    def _load_model(self, model_name: str, quantization: str, attention_type: str):
+        """Acquire model and processor with specified configuration from the shared pool"""
+        if attention_type == "auto":
+            attention_type = self._resolve_attention(model_name, quantization)
+        model_key = (model_name, quantization, attention_type)
+        if self.current_model_key == model_key and self.model is not None:
+            return
+        self._release_model()
 
-        # Configure quantization
+        self.processor, loaded, self.model_checkpoint = self._acquire_model(
+            model_name, quantization, attention_type
+        )
+        if isinstance(loaded, Qwen3VLModelPatcher):
+            self.patcher = loaded
+            self.model = loaded.model
+        else:
+            self.model = loaded
+        self.current_model_name = model_name
+        self.current_model_key = model_key
+
+    def _load_draft_model(self, draft_model: str, quantization: str, attention_type: str) -> bool:
+        """
+        Acquire a smaller model of the same family for assisted decoding;
+        returns False (and loads no weights) when its tokenizer differs or it
+        isn't smaller than the target
+        """
+        if attention_type == "auto":
+            # Tuning needs the draft as the main model, use what a previous run decided
+            attention_type = self._resolve_attention(draft_model, quantization, tune=False)
+        draft_key = (draft_model, quantization, attention_type)
+        if self.draft_model_key == draft_key and self.draft_model is not None:
+            return True
+        self._release_draft_model()
+
+        # Both checks read only the processor and the safetensors headers
+        checkpoint = self._ensure_checkpoint(draft_model)
+        if not tokenizers_match(self.processor.tokenizer, self._get_processor(checkpoint).tokenizer):
+            print(f"[Qwen3-VL] ⚠️ {draft_model} has a different tokenizer than {self.current_model_name}, "
+                  f"falling back to regular decoding")
+            return False
+        draft_params = checkpoint_parameter_count(checkpoint)
+        target_params = checkpoint_parameter_count(self.model_checkpoint)
+        if target_params and draft_params >= target_params:
+            print(f"[Qwen3-VL] ⚠️ {draft_model} ({draft_params / 1e9:.1f}B parameters) is not smaller than "
+                  f"{self.current_model_name} ({target_params / 1e9:.1f}B), falling back to regular decoding")
+            return False
+
+        _, loaded, _ = self._acquire_model(draft_model, quantization, attention_type)
+
+        if isinstance(loaded, Qwen3VLModelPatcher):
+            self.draft_patcher = loaded
+            self.draft_model = loaded.model
+        else:
+            self.draft_model = loaded
+        self.draft_model_key = draft_key
+        return True
+
+    def _create_cpu_model(self, checkpoint: str, quantization: str, attention_type: str):
+        """Load model weights for CPU inference"""
+        if quantization in ("4bit", "8bit"):
+            print(f"[Qwen3-VL] ⚠️ bitsandbytes {quantization} needs a GPU, using int8_weight_only on CPU")
+            quantization = "int8_weight_only"
+        if attention_type == "flash_attention_2":
+            attention_type = "sdpa"
+
+        dtype = self._compute_dtype(quantization)
+
+        model = Qwen3VLForConditionalGeneration.from_pretrained(
+            checkpoint,
+            dtype=dtype,
+            device_map={"": "cpu"},
+            attn_implementation=attention_type,
+            low_cpu_mem_usage=True,
+        ).eval()
+        print(f"[Qwen3-VL] 🖥️ CPU mode: {str(dtype).replace('torch.', '')}")
+
+        if quantization == "int8_weight_only":
+            method = quantize_int8_weight_only(model, language_model_module(model))
+            print(f"[Qwen3-VL] 🔢 Text decoder quantized to int8 ({method})")
+            return model
+        return Qwen3VLModelPatcher(model, load_device=self.device, offload_device=self.offload_device)
+
+    def _uses_offload(self, quantization: str) -> bool:
+        """Offload applies to unquantized models on a CUDA GPU, accelerate streams layers only there"""
+        return self.device.type == "cuda" and quantization == "none" and get_config().is_offload_enabled()
+
+    def _create_offloaded_model(self, checkpoint: str, attention_type: str, dtype: torch.dtype):
+        """
+        Load a model split across GPU, CPU RAM and disk within the configured
+        budgets; accelerate streams offloaded layers to the GPU for each forward
+        """
+        config = get_config()
+        max_memory = offload_budgets(self.device, comfy.model_management.get_free_memory(self.device),
+                                     config.get_offload_gpu_memory_gb(), config.get_offload_cpu_memory_gb())
+        device_map = plan_device_map(checkpoint, dtype, max_memory)
+        folder = config.get_offload_folder() or os.path.join(
+            folder_paths.models_dir, "qwen3vl", "offload", os.path.basename(checkpoint)
+        )
+        if "disk" in device_map.values():
+            os.makedirs(folder, exist_ok=True)
+
+        # Weights offloaded by accelerate can't be moved by ComfyUI, keep them unmanaged
+        model = Qwen3VLForConditionalGeneration.from_pretrained(
+            checkpoint,
+            dtype=dtype,
+            device_map=device_map,
+            offload_folder=folder,
+            attn_implementation=attention_type,
+            low_cpu_mem_usage=True,
+        ).eval()
+        budgets = ", ".join(f"{'GPU' if key != 'cpu' else 'CPU'} {value / 1024 ** 3:.1f}GB"
+                            for key, value in max_memory.items())
+        print(f"[Qwen3-VL] 📦 Offload budgets {budgets}; placement: {describe_placement(device_map)}")
+        return model
+
+    def _create_model(self, checkpoint: str, quantization: str, attention_type: str):
+        """Load model weights with specified configuration"""
+        if self.cpu_mode:
+            return self._create_cpu_model(checkpoint, quantization, attention_type)
+
+        dtype = torch.bfloat16 if self.bf16_support else torch.float16
+        if self._uses_offload(quantization):
+            return self._create_offloaded_model(checkpoint, attention_type, dtype)
+
+        if quantization == "int8_weight_only":
+            if not torchao_available():
+                raise RuntimeError("int8_weight_only on GPU requires torchao (pip install torchao)")
+            model = Qwen3VLForConditionalGeneration.from_pretrained(
+                checkpoint,
+                dtype=dtype,
+                device_map={"": self.device},
+                attn_implementation=attention_type,
+                low_cpu_mem_usage=True,
+            ).eval()
+            quantize_int8_weight_only(model, language_model_module(model))
+            return model
+
+        if quantization == "none":
+            # Load on the offload device and let comfy.model_management place it,
+            # so ComfyUI can offload it when other models need VRAM
+            model = Qwen3VLForConditionalGeneration.from_pretrained(
+                checkpoint,
+                dtype=dtype,
+                device_map={"": self.offload_device},
+                attn_implementation=attention_type,
+                low_cpu_mem_usage=True,
+            )
+            return Qwen3VLModelPatcher(model, load_device=self.device, offload_device=self.offload_device)
+
+        # bitsandbytes weights can't be moved between devices, keep them unmanaged
         quantization_config = None
         if quantization == "4bit":
             quantization_config = BitsAndBytesConfig(load_in_4bit=True)
         elif quantization == "8bit":
             quantization_config = BitsAndBytesConfig(load_in_8bit=True)
 
+        use_cache = get_config().is_quantized_cache_enabled()
+        artifact = find_artifact(checkpoint, quantization) if use_cache else None
+        started = time.perf_counter()
+        if artifact is not None:
+            # Pre-quantized weights: quantization_config is read from the saved config
+            model = Qwen3VLForConditionalGeneration.from_pretrained(
+                artifact,
+                dtype=dtype,
+                device_map="auto",
+                attn_implementation=attention_type,
+                low_cpu_mem_usage=True,
+            )
+            quantize_seconds = read_manifest(artifact).get("quantize_seconds")
+            print(f"[Qwen3-VL] ⏱️ Loaded pre-quantized {quantization} weights in "
+                  f"{time.perf_counter() - started:.1f}s (quantizing took {quantize_seconds}s)")
+            return model
+
         # Load model
-        self.model = Qwen3VLForConditionalGeneration.from_pretrained(
-            self.model_checkpoint,
-            dtype=torch.bfloat16 if self.bf16_support else torch.float16,
+        model = Qwen3VLForConditionalGeneration.from_pretrained(
+            checkpoint,
+            dtype=dtype,
             device_map="auto",
             attn_implementation=attention_type,
+            low_cpu_mem_usage=True,
             quantization_config=quantization_config,
         )
-        
-        self.current_model_name = model_name
+        quantize_seconds = time.perf_counter() - started
+        print(f"[Qwen3-VL] ⏱️ Loaded and quantized to {quantization} in {quantize_seconds:.1f}s")
+        if use_cache:
+            save_artifact(model, checkpoint, quantization, quantize_seconds)
+        return model
+
+    def _release_draft_model(self, keep_model_loaded: bool = False):
+        """Return the draft model to the pool"""
+        if self.draft_model_key is not None:
+            get_model_pool().release(self.draft_model_key, keep_loaded=keep_model_loaded, holder=id(self))
+        self.draft_model = None
+        self.draft_patcher = None
+        self.draft_model_key = None
+
+    def _release_model(self, keep_model_loaded: bool = False):
+        """Return the model to the pool; it stays resident until evicted"""
+        self._release_draft_model(keep_model_loaded)
+        if self.current_model_key is not None:
+            get_model_pool().release(self.current_model_key, keep_loaded=keep_model_loaded, holder=id(self))
+        self.processor = None
+        self.model = None
+        self.patcher = None
+        self.current_model_name = None
+        self.current_model_key = None
+
+    def _cpu_threads(self):
+        """Configured torch threads while generating in CPU mode, restored afterwards for other nodes"""
+        if not self.cpu_mode:
+            return contextlib.nullcontext()
+        config = get_config()
+        return cpu_threads(config.get_cpu_num_threads(), config.get_cpu_num_interop_threads())
+
+    def _video_file_path(self, video: Any, seed: int) -> Optional[str]:
+        """Path of a file VIDEO input; in-memory streams are written to a temp file"""
+        # Check if it's a VideoFromFile object from comfy_api
+        if type(video).__name__ == 'VideoFromFile':
+            # It's a VideoFromFile object, use get_stream_source() method
+            try:
+                # VideoFromFile has a get_stream_source() method that returns the file path or BytesIO
+                stream_source = video.get_stream_source()
+                if isinstance(stream_source, str):
+                    # It's a file path, use it directly
+                    return stream_source
+                # It's a BytesIO object, save to temporary file
+                temp_dir = Path(folder_paths.temp_directory)
+                temp_dir.mkdir(parents=True, exist_ok=True)
+                temp_video_path = temp_dir / f"qwen3vl_video_{seed}.mp4"
+                with open(temp_video_path, 'wb') as f:
+                    f.write(stream_source.getvalue())
+                return str(temp_video_path)
+            except Exception as e:
+                return None
+        # Try to use as file path
+        try:
+            return str(video)
+        except Exception as e:
+            return None
+
+    def _decode_video_file(self, video: Any, seed: int, min_pixels: int, max_pixels: int) -> Any:
+        """
+        Decode a file VIDEO input into a frame tensor with the configured
+        backend, sampled like qwen_vl_utils would (DEFAULT_VIDEO_FPS, at most
+        VIDEO_MAX_FRAMES) and downscaled on load to the frame size prepare_video
+        will use. Falls back to the file path if no backend can read it.
+        """
+        video_path = self._video_file_path(video, seed)
+        if not video_path or not os.path.isfile(video_path):
+            return video_path
+        backend = get_config().get_video_backend()
+        try:
+            info = probe_video(video_path, backend)
+            count = len(plan_sample_indices(info.frame_count, info.fps, DEFAULT_VIDEO_FPS, VIDEO_MAX_FRAMES))
+            frame_pixels = video_frame_max_pixels(count or VIDEO_MAX_FRAMES, min_pixels, max_pixels)
+            scale = min(1.0, math.sqrt(frame_pixels / max(1, info.width * info.height)))
+            # One patch of slack, prepare_video snaps the size to the patch grid
+            max_dimension = int(max(info.width, info.height) * scale) + IMAGE_FACTOR
+            frames, indices, info = sample_video(video_path, DEFAULT_VIDEO_FPS, VIDEO_MAX_FRAMES,
+                                                 max_dimension=max_dimension, backend=backend)
+        except Exception as e:
+            print(f"[Qwen3-VL] ⚠️ Could not decode {os.path.basename(video_path)} ({e}), using qwen_vl_utils")
+            return video_path
+        if not indices:
+            return video_path
+        print(f"[Qwen3-VL] 🎞️ Decoded {len(indices)} frames of {info.duration:.1f}s video with {info.backend}")
+        return attach_video_metadata(torch.from_numpy(frames), info.fps or DEFAULT_VIDEO_FPS, indices)
+
+    def _resolve_video(self, video: Any, seed: int, min_pixels: int, max_pixels: int,
+                       budget: Optional[VisualBudgetPlan] = None, prune: bool = False) -> Dict[str, Any]:
+        """Turn a VIDEO input into Conversation fields (frame tensor or file path)"""
+        if not hasattr(video, 'dim'):
+            video_path = self._video_file_path(video, seed)
+            return {"video_path": video_path} if video_path else {}
+        if video.dim() != 4:  # (T, H, W, C)
+            return {}
+
+        # It's a frame tensor: hand the sampled frames and their real
+        # fps/frame indices to the processor, no mp4 re-encode
+        frame_max_pixels = None
+        if budget is not None:
+            video = select_frames(video, budget.video_frames)
+            frame_max_pixels = budget.video_max_pixels
+        frames, metadata = prepare_video(video, min_pixels, max_pixels, frame_max_pixels)
+        if prune:
+            frames, metadata, dropped = prune_redundant_frames(
+                frames, metadata, get_config().get_visual_budget_redundancy_threshold()
+            )
+            if dropped:
+                print(f"[Qwen3-VL] ✂️ Dropped {dropped} of {frames.shape[0] + dropped} "
+                      f"video frames as redundant")
+        return {"video_frames": frames, "video_metadata": metadata}
+
+    @staticmethod
+    def _plan_visual_budget(budget_tokens: int, image: Optional[torch.Tensor], video: Any, min_pixels: int,
+                            max_pixels: int, max_image_dimension: int) -> Optional[VisualBudgetPlan]:
+        """Split the visual token budget over the image batch and video frames, None without a budget"""
+        if budget_tokens <= 0 or (image is None and video is None):
+            return None
+        image_size = None
+        if image is not None:
+            batch = image if image.dim() == 4 else image.unsqueeze(0)
+            image_size = (batch.shape[0],) + cap_dimension(batch.shape[1], batch.shape[2], max_image_dimension)
+        video_size = None
+        if hasattr(video, "dim") and video.dim() == 4:
+            video_size = tuple(video.shape[:3])
+        elif video is not None:
+            # Frame count of a file is unknown here, keep half the budget for it
+            budget_tokens //= 2
+        return plan_visual_budget(budget_tokens, min_pixels, max_pixels, image_size, video_size)
+
+    def _load_to_device(self, memory_required: int = 0) -> None:
+        """
+        (Re)load managed weights, offloading other models until the weights
+        plus ``memory_required`` bytes for generate fit in VRAM
+        """
+        patchers = [p for p in (self.patcher, self.draft_patcher) if p is not None]
+        if not patchers:
+            return
+        needs_transfer = self.patcher is not None and self.patcher.loaded_size() < self.patcher.model_size()
+        started = time.perf_counter()
+        comfy.model_management.load_models_gpu(patchers, memory_required=memory_required)
+        if needs_transfer:
+            get_model_pool().record_load_phase(self.current_model_key, "device_transfer",
+                                               time.perf_counter() - started)
+
+    def _plan_memory(self, conversations: List[Conversation], max_new_tokens: int, kv_cache: str,
+                     max_batch_size: int = 1) -> Tuple[int, Dict[str, Any]]:
+        """
+        Load the weights with room for the estimated generate memory; returns
+        the token limit and KV cache kwargs to use
+
+        The default full KV cache is only planned with a configured
+        ``local.kv_memory.budget_gb``: otherwise the estimate just tells
+        ComfyUI how much to free, and max_new_tokens is left alone.
+        """
+        prompt_tokens = max(estimate_prompt_tokens(self.processor, conv) for conv in conversations)
+        batch_size = min(max_batch_size, len(conversations))
+        attention_type = self.current_model_key[2]
+        config = get_config()
+
+        # Compiled decoding allocates its static KV cache at the bucket length,
+        # and caches of other buckets stay on the device
+        kv_tokens, static_bytes = max_new_tokens, 0
+        compiled = self._compiled_decode() if kv_cache == "full" and len(conversations) == 1 else None
+        if compiled is not None:
+            length = compiled.cache_length(prompt_tokens, max_new_tokens)
+            kv_tokens = max(max_new_tokens, length - prompt_tokens)
+            static_bytes = compiled.cache_bytes(self.model, length)
+
+        peak_bytes = estimate_peak_bytes(
+            self.model.config, prompt_tokens, kv_tokens, "full" if kv_cache == "auto" else kv_cache,
+            self.model.dtype.itemsize, batch_size, attention_type, config.get_kv_memory_residual_length(),
+        )
+        self._load_to_device(peak_bytes + static_bytes + int(config.get_kv_memory_reserve_mb() * 1024 ** 2))
+        if kv_cache == "full" and config.get_kv_memory_budget_gb() <= 0:
+            return max_new_tokens, {}
+
+        plan = plan_from_config(
+            self.model.config,
+            prompt_tokens,
+            max_new_tokens,
+            comfy.model_management.get_free_memory(self.device),
+            kv_cache,
+            self.device.type,
+            self.model.dtype.itemsize,
+            batch_size=batch_size,
+            attention_type=attention_type,
+            host_free_bytes=comfy.model_management.get_free_memory(torch.device("cpu")),
+        )
+        if plan.kv_cache != "full" or plan.downscaled:
+            print(f"[Qwen3-VL] 🧮 KV cache: {plan.kv_cache}, ~{plan.peak_bytes / 1024 ** 3:.2f}GB peak for "
+                  f"{prompt_tokens} prompt + {plan.max_new_tokens} new tokens "
+                  f"({plan.budget_bytes / 1024 ** 3:.2f}GB available)")
+        if plan.downscaled:
+            print(f"[Qwen3-VL] ⚠️ max_new_tokens lowered from {max_new_tokens} to {plan.max_new_tokens} to fit in memory")
+        return plan.max_new_tokens, plan.generate_kwargs(get_config().get_kv_memory_residual_length())
+
+    def _generate(self, conversations: List[Conversation], max_new_tokens: int, temperature: float,
+                  top_p: float, max_batch_size: int = 1, kv_cache: str = "full") -> Tuple[List[str], Dict[str, float]]:
+        """Run generate for conversations on the acquired model"""
+        max_new_tokens, kv_kwargs = self._plan_memory(conversations, max_new_tokens, kv_cache, max_batch_size)
+
+        generate_kwargs = dict(max_new_tokens=max_new_tokens, temperature=temperature, top_p=top_p,
+                               vision_cache=get_vision_cache(), prefix_cache=get_prefix_cache(),
+                               compiled_decode=self._compiled_decode(), cache_namespace=self.current_model_key,
+                               **kv_kwargs)
+
+        scheduler = get_scheduler()
+        # Requests with their own KV cache layout don't share batches
+        if scheduler is None or kv_kwargs:
+            return generate_batch(
+                self.model,
+                self.processor,
+                conversations,
+                self.device,
+                max_batch_size=max_batch_size,
+                **generate_kwargs
+            )
+
+        # Share batches with concurrent requests for the same resident model
+        started = time.perf_counter()
+        futures = scheduler.submit(self.current_model_key, self.model, self.processor, self.device,
+                                   conversations, **generate_kwargs)
+        results = [future.result() for future in futures]
+        batches = {id(batch_stats): batch_stats for _, batch_stats in results}
+        seconds = time.perf_counter() - started
+        generated = sum(int(b["generated_tokens"]) for b in batches.values())
+        return [text for text, _ in results], {
+            "requests": len(conversations),
+            "batches": len(batches),
+            "generated_tokens": generated,
+            "seconds": seconds,
+            "tokens_per_second": generated / seconds if seconds else 0.0,
+        }
+
+    def _generate_streaming(self, conversation: Conversation, max_new_tokens: int, temperature: float,
+                            top_p: float, unique_id: Optional[str] = None,
+                            kv_cache: str = "full") -> Tuple[str, Dict[str, float]]:
+        """Generate one response, showing partial text and token progress on the node"""
+        max_new_tokens, kv_kwargs = self._plan_memory([conversation], max_new_tokens, kv_cache)
 
-    def _prepare_messages(self, text_prompt: str, image_data: Optional[List[str]] = None,
-                         video_data: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Prepare messages for the model
+        try:
+            from server import PromptServer
+            server = PromptServer.instance
+        except Exception:
+            server = None
+        progress = comfy.utils.ProgressBar(max_new_tokens)
+        interval = get_config().get_streaming_update_interval_ms() / 1000.0
+        last_update = [0.0]
+
+        def on_update(text: str, tokens: int):
+            now = time.perf_counter()
+            if now - last_update[0] < interval:
+                return
+            last_update[0] = now
+            progress.update_absolute(tokens, max_new_tokens)
+            # Partial text is shown on the node by frontends that support progress text
+            if server is not None and unique_id is not None and hasattr(server, "send_progress_text"):
+                server.send_progress_text(text, unique_id)
+
+        assisted_kwargs = {}
+        if self.draft_model is not None:
+            if kv_kwargs:
+                print("[Qwen3-VL] Assisted decoding skipped, it needs the full KV cache")
+            else:
+                assisted_kwargs = {"assistant_model": self.draft_model}
+        text, stats = generate_streaming(
+            self.model,
+            self.processor,
+            conversation,
+            self.device,
+            on_update=on_update,
+            should_stop=comfy.model_management.processing_interrupted,
+            vision_cache=get_vision_cache(),
+            prefix_cache=get_prefix_cache(),
+            compiled_decode=self._compiled_decode(),
+            cache_namespace=self.current_model_key,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            **assisted_kwargs,
+            **kv_kwargs
+        )
+        comfy.model_management.throw_exception_if_processing_interrupted()
+        progress.update_absolute(max_new_tokens, max_new_tokens)
+
+        if stats.get("first_compile"):
+            print("[Qwen3-VL] 🛠️ Compiled the decode step for a new KV cache size, "
+                  "this run includes the compile time")
+        if "time_to_first_token" in stats:
+            print(f"[Qwen3-VL] ⏱️ Prefill {stats['prefill_seconds']:.2f}s "
+                  f"({stats['prompt_tokens']} tokens, {stats['prefix_tokens']} from prefix cache), "
+                  f"TTFT {stats['time_to_first_token']:.2f}s, "
+                  f"decode {stats['generated_tokens']} tokens at {stats['decode_tokens_per_second']:.1f} tok/s")
+            self._report_assisted(stats)
+        self._report_offload(stats)
+        return text, stats
+
+    def _compiled_decode(self):
+        """Compiled decode helper, never for models whose layers accelerate streams in"""
+        return None if is_offloaded(self.model) else get_compiled_decode()
+
+    def _report_offload(self, stats: Dict[str, float]) -> None:
+        """Per-token latency of models that stream offloaded layers"""
+        if not is_offloaded(self.model):
+            return
+        tokens_per_second = stats.get("decode_tokens_per_second") or stats.get("tokens_per_second", 0.0)
+        if tokens_per_second > 0:
+            print(f"[Qwen3-VL] 📦 Offloaded model: {1000.0 / tokens_per_second:.0f} ms per token "
+                  f"({describe_placement(self.model.hf_device_map)})")
+
+    def _report_assisted(self, stats: Dict[str, float]) -> None:
+        """Track regular decode speed per model and report assisted decoding gains against it"""
+        decode_tps = stats.get("decode_tokens_per_second", 0.0)
+        if "acceptance_rate" not in stats:
+            if decode_tps > 0:
+                self._decode_baselines[self.current_model_key] = decode_tps
+            return
+
+        baseline = self._decode_baselines.get(self.current_model_key)
+        speedup = f"{decode_tps / baseline:.2f}x vs regular decoding" if baseline else "no regular run to compare yet"
+        print(f"[Qwen3-VL] 🎯 Assisted decoding with {self.draft_model_key[0]}: "
+              f"acceptance {stats['acceptance_rate']:.0%} ({stats['draft_tokens']} drafted), "
+              f"{stats['tokens_per_target_forward']:.2f} tokens per target forward, speedup {speedup}")
 
-        Args:
-            text_prompt: The text prompt
-            image_data: List of base64-encoded image strings (data:image/png;base64,...)
-            video_data: Local file path to video (qwen_vl_utils requires file paths for video processing)
+    def preload(self, model_name: str, quantization: str, attention_type: str) -> Dict[str, float]:
         """
-        content = []
+        Read and materialize a model's weights into the pool ahead of the first
+        prompt; returns phase timings
 
-        if image_data:
-            for img_b64 in image_data:
-                # Use base64-encoded images directly
-                content.append({"type": "image", "image": img_b64})
+        Runs off the executor thread, so it never touches the device or
+        ComfyUI's model management: managed models are materialized on the
+        offload device if the pool has room without evicting, models that load
+        straight onto the GPU (bitsandbytes, int8_weight_only, offloaded) only
+        get their files read into the page cache. Device placement and the
+        warmup generation happen in the executor on first use.
+        """
+        if attention_type == "auto":
+            attention_type = self._resolve_attention(model_name, quantization, tune=False)
+        model_key = (model_name, quantization, attention_type)
+        pool = get_model_pool()
+        on_host = self.cpu_mode or (quantization == "none" and not self._uses_offload(quantization))
 
-        if video_data:
-            # Use local file path for video (qwen_vl_utils requires file paths)
-            content.append({"type": "video", "video": video_data})
+        if on_host:
+            _, loaded, _ = self._acquire_model(model_name, quantization, attention_type, prefetch=True)
+            if loaded is not None:
+                if get_config().is_preload_warmup_enabled():
+                    pool.request_warmup(model_key)
+                pool.release(model_key, evict=False)
+                return pool.load_timings().get(model_key, {})
 
-        content.append({"type": "text", "text": text_prompt})
+        checkpoint = self._ensure_checkpoint(model_name)
+        source = find_artifact(checkpoint, quantization) if quantization in ("4bit", "8bit") else None
+        started = time.perf_counter()
+        read = prefetch_checkpoint(source or checkpoint)
+        pool.record_load_phase(model_key, "file_io", time.perf_counter() - started)
+        print(f"[Qwen3-VL] 📖 Read {read / 1024 ** 3:.2f}GB of {model_name} weights into the page cache")
+        return pool.load_timings().get(model_key, {})
 
-        return [{"role": "user", "content": content}]
+    def _warm_up(self) -> None:
+        """
+        Short generation on a model the background preload materialized, run
+        once on first use before the real prompt; primes the device kernels
+        and the vision tower without touching the vision or prefix caches
+        """
+        if not get_model_pool().take_warmup(self.current_model_key):
+            return
+        conversation = Conversation(
+            prompt="Hi",
+            images=prepare_images(torch.zeros(1, 64, 64, 3), None, 4 * 32 * 32, 4 * 32 * 32),
+        )
+        self._load_to_device()
+        started = time.perf_counter()
+        with self._cpu_threads():
+            generate_batch(self.model, self.processor, [conversation], self.device, max_new_tokens=2,
+                           do_sample=False)
+        seconds = time.perf_counter() - started
+        get_model_pool().record_load_phase(self.current_model_key, "warmup", seconds)
+        print(f"[Qwen3-VL] 🔥 Warmed up {self.current_model_name} in {seconds:.1f}s")
+
+    @staticmethod
+    def _report_vision_cache(before: Optional[Dict[str, float]]) -> None:
+        """Print vision cache hits of the last run and the running totals"""
+        cache = get_vision_cache()
+        if cache is None or before is None:
+            return
+        after = cache.stats()
+        hits = after["encoder_hits"] - before["encoder_hits"]
+        lookups = hits + after["encoder_misses"] - before["encoder_misses"]
+        if lookups:
+            print(f"[Qwen3-VL] 🗂️ Vision cache: {hits}/{lookups} media reused "
+                  f"(saved {after['seconds_saved'] - before['seconds_saved']:.2f}s), "
+                  f"total hit rate {after['encoder_hit_rate']:.0%}, saved {after['seconds_saved']:.1f}s, "
+                  f"{after['used_bytes'] / 1024 ** 2:.0f}/{after['max_bytes'] / 1024 ** 2:.0f} MB")
 
     def process(
         self,
@@ -244,183 +969,181 @@ class Qwen3VLProcessor:
         image: Optional[torch.Tensor] = None,
         video: Optional[torch.Tensor] = None,
         keep_model_loaded: bool = False,
+        draft_model: str = "none",
+        visual_token_budget: int = 0,
+        prune_redundant_frames: bool = False,
+        kv_cache: str = "full",
+        unique_id: Optional[str] = None,
     ) -> Tuple[str]:
         """Process input and generate response"""
 
         if seed != -1:
             torch.manual_seed(seed)
 
-        # Load model
-        self._load_model(model_name, quantization, attention_type)
-
-        # Prepare image/video data (base64 encoded)
-        image_data = None
-        video_data = None
+        vision_cache = get_vision_cache()
+        cache_stats = vision_cache.stats() if vision_cache is not None else None
 
-        if image is not None:
-            from torchvision.transforms import ToPILImage
-            import torch.nn.functional as F
-            image_data = []
-            if image.dim() == 3:
-                image = image.unsqueeze(0)
-
-            for idx, img in enumerate(image):
-                # Limit image size to avoid OOM
-                # Qwen3-VL can handle up to max_pixels, but we'll be conservative
-                h, w = img.shape[0], img.shape[1]
-
-                if h > max_image_dimension or w > max_image_dimension:
-                    # Calculate scaling factor
-                    scale = min(max_image_dimension / h, max_image_dimension / w)
-                    new_h, new_w = int(h * scale), int(w * scale)
-
-                    # Resize using interpolation
-                    img_reshaped = img.permute(2, 0, 1).unsqueeze(0)  # (H, W, C) -> (1, C, H, W)
-                    img_resized = F.interpolate(img_reshaped, size=(new_h, new_w), mode='bilinear', align_corners=False)
-                    img = img_resized.squeeze(0).permute(1, 2, 0)  # (1, C, H, W) -> (H, W, C)
-
-                # Convert tensor to PIL image
-                # ComfyUI IMAGE format is (B, H, W, C) with values in [0, 1]
-                pil_image = ToPILImage()(img.permute(2, 0, 1))
-
-                # Convert PIL image to base64
-                img_buffer = io.BytesIO()
-                pil_image.save(img_buffer, format='PNG')
-                img_buffer.seek(0)
-                img_b64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
-                image_data.append(f"data:image/png;base64,{img_b64}")
-        
-        if video is not None:
-            import cv2
-            import numpy as np
-
-            video_data = None
-            video_path = None
-
-            # Handle different video input types
-            # Check if it's a VideoFromFile object from comfy_api
-            if type(video).__name__ == 'VideoFromFile':
-                # It's a VideoFromFile object, use get_stream_source() method
-                try:
-                    # VideoFromFile has a get_stream_source() method that returns the file path or BytesIO
-                    stream_source = video.get_stream_source()
-                    if isinstance(stream_source, str):
-                        # It's a file path, use it directly
-                        video_path = stream_source
-                    else:
-                        # It's a BytesIO object, save to temporary file
-                        temp_dir = Path(folder_paths.temp_directory)
-                        temp_dir.mkdir(parents=True, exist_ok=True)
-                        temp_video_path = temp_dir / f"qwen3vl_video_{seed}.mp4"
-                        with open(temp_video_path, 'wb') as f:
-                            f.write(stream_source.getvalue())
-                        video_path = str(temp_video_path)
-                except Exception as e:
-                    video_data = None
-            elif hasattr(video, 'dim'):
-                # It's a tensor, convert to video file
-                if video.dim() == 4:  # (T, H, W, C)
-                    frames = (video * 255).byte().cpu().numpy()
-                    h, w = frames.shape[1], frames.shape[2]
-
-                    # Use temporary file for video encoding (cv2.VideoWriter requires file path)
-                    temp_dir = Path(folder_paths.temp_directory)
-                    temp_dir.mkdir(parents=True, exist_ok=True)
-                    temp_video_path = temp_dir / f"qwen3vl_video_{seed}.mp4"
-
-                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                    out = cv2.VideoWriter(str(temp_video_path), fourcc, 2.0, (w, h))
-
-                    for frame in frames:
-                        frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                        out.write(frame_bgr)
-                    out.release()
-
-                    video_path = str(temp_video_path)
-            else:
-                # Try to use as file path
-                try:
-                    video_path = str(video)
-                except Exception as e:
-                    video_data = None
-
-            # Use local file path for video (qwen_vl_utils requires file paths for video processing)
-            if video_path:
-                video_data = video_path
-        
-        # Prepare messages
-        messages = self._prepare_messages(text_prompt, image_data, video_data)
-
-        with torch.no_grad():
-            # Apply chat template
-            text = self.processor.apply_chat_template(
-                messages,
-                tokenize=False,
-                add_generation_prompt=True
+        try:
+            # Inside the try: "auto" attention tuning holds the probe model and can fail
+            self._load_model(model_name, quantization, attention_type)
+            self._warm_up()
+            # Assisted decoding only pays off with a smaller draft of the same family
+            assisted = (
+                draft_model != "none"
+                and draft_model != model_name
+                and self._load_draft_model(draft_model, quantization, attention_type)
             )
+            conversation = Conversation(prompt=text_prompt)
+            if video is not None and not hasattr(video, 'dim'):
+                # Files are decoded here as well, so budgets and pruning see their frames
+                video = self._decode_video_file(video, seed, min_pixels, max_pixels)
+            budget = self._plan_visual_budget(visual_token_budget, image, video, min_pixels, max_pixels,
+                                              max_image_dimension)
 
-            # Process vision info
-            image_inputs, video_inputs, video_kwargs = process_vision_info(
-                messages,
-                return_video_kwargs=True
-            )
+            if image is not None:
+                # Images stay in memory: one batched resize to max_image_dimension
+                # and the min/max_pixels grid, then uint8 tensors to the processor
+                image_max_pixels = budget.image_max_pixels if budget is not None else max_pixels
+                conversation.images = prepare_images(image, max_image_dimension,
+                                                     min(min_pixels, image_max_pixels), image_max_pixels)
 
-            # Fix video_kwargs if fps is a sequence
-            if video_kwargs and 'fps' in video_kwargs:
-                fps_value = video_kwargs['fps']
-                # If fps is a sequence, take the first element
-                if isinstance(fps_value, (list, tuple)):
-                    video_kwargs['fps'] = fps_value[0] if fps_value else 24
-
-            # Prepare inputs
-            inputs = self.processor(
-                text=[text],
-                images=image_inputs,
-                videos=video_inputs,
-                padding=True,
-                return_tensors="pt",
-                **video_kwargs
-            )
-            inputs = inputs.to(self.device)
-
-            # Generate
-            generated_ids = self.model.generate(
-                **inputs,
-                max_new_tokens=max_new_tokens,
-                temperature=temperature,
-                top_p=top_p,
-            )
-            
-            generated_ids_trimmed = [
-                out_ids[len(in_ids):]
-                for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
-            ]
-            
-            result = self.processor.batch_decode(
-                generated_ids_trimmed,
-                skip_special_tokens=True,
-                clean_up_tokenization_spaces=False,
-            )
+            if video is not None:
+                fields = self._resolve_video(video, seed, min_pixels, max_pixels, budget, prune_redundant_frames)
+                if budget is not None and "video_path" in fields:
+                    # qwen_vl_utils decodes the file, it gets what the images left over as total pixels
+                    remaining = max(0, visual_token_budget - conversation.visual_tokens())
+                    fields["video_total_pixels"] = max(1, remaining) * IMAGE_FACTOR * IMAGE_FACTOR * FRAME_FACTOR
+                for name, value in fields.items():
+                    setattr(conversation, name, value)
+            if budget is not None:
+                print(f"[Qwen3-VL] 🎯 Visual tokens: {budget.requested_tokens} requested, "
+                      f"{conversation.visual_tokens()} used (budget {visual_token_budget})")
 
-        # Cleanup
-        if not keep_model_loaded:
-            del self.processor
-            del self.model
-            self.processor = None
-            self.model = None
-            self.current_model_name = None
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-                torch.cuda.ipc_collect()
+            # Assisted decoding works on single requests, it never goes through the scheduler
+            with self._cpu_threads():
+                if assisted or (get_config().is_local_streaming_enabled() and get_scheduler() is None):
+                    text, _ = self._generate_streaming(conversation, max_new_tokens, temperature, top_p,
+                                                       unique_id, kv_cache)
+                    result = [text]
+                else:
+                    result, stats = self._generate([conversation], max_new_tokens, temperature, top_p,
+                                                   kv_cache=kv_cache)
+                    self._report_offload(stats)
+        finally:
+            # Hand the model back to the pool, pinned models are never evicted.
+            # Managed weights stay on the GPU until ComfyUI needs the memory.
+            self._release_model(keep_model_loaded)
 
+        self._report_vision_cache(cache_stats)
         return (result[0] if result else "",)
 
 
+class Qwen3VLBatchProcessor(Qwen3VLProcessor):
+    """
+    Batched Qwen3-VL processor node
+    Runs N prompts and/or an IMAGE batch as independent conversations in
+    left-padded batches sorted by length, returning N responses
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        inputs = Qwen3VLProcessor.INPUT_TYPES()
+        required = {
+            "prompts": ("STRING", {
+                "default": "Describe this image.",
+                "multiline": True,
+                "tooltip": "One prompt per line"
+            }),
+        }
+        required.update((k, v) for k, v in inputs["required"].items() if k != "text_prompt")
+        required["batch_size"] = ("INT", {"default": 8, "min": 1, "max": 64, "step": 1})
+        return {
+            "required": required,
+            "optional": {
+                "image": ("IMAGE",),
+                "keep_model_loaded": ("BOOLEAN", {"default": False}),
+                "kv_cache": inputs["optional"]["kv_cache"],
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("responses", "joined_responses")
+    OUTPUT_IS_LIST = (True, False)
+    FUNCTION = "process_batch"
+    CATEGORY = "Qwen3-VL"
+    OUTPUT_NODE = True
+
+    @staticmethod
+    def _pair_inputs(prompts: List[str], images: List[torch.Tensor]) -> List[Conversation]:
+        """One conversation per prompt/image pair; a single prompt or image is shared"""
+        if not images:
+            return [Conversation(prompt=p) for p in prompts]
+        if len(prompts) == 1:
+            return [Conversation(prompt=prompts[0], images=[img]) for img in images]
+        if len(images) == 1:
+            return [Conversation(prompt=p, images=images) for p in prompts]
+        if len(prompts) != len(images):
+            raise ValueError(
+                f"Got {len(prompts)} prompts for {len(images)} images; "
+                f"use one prompt, one image, or the same number of each"
+            )
+        return [Conversation(prompt=p, images=[img]) for p, img in zip(prompts, images)]
+
+    def process_batch(
+        self,
+        prompts: str,
+        model_name: str,
+        temperature: float,
+        top_p: float,
+        max_new_tokens: int,
+        min_pixels: int,
+        max_pixels: int,
+        quantization: str,
+        attention_type: str,
+        seed: int,
+        max_image_dimension: int,
+        batch_size: int,
+        image: Optional[torch.Tensor] = None,
+        keep_model_loaded: bool = False,
+        kv_cache: str = "full",
+    ) -> Tuple[List[str], str]:
+        """Generate one response per conversation"""
+        prompt_list = [line.strip() for line in prompts.splitlines() if line.strip()]
+        if not prompt_list:
+            raise ValueError("No prompts given")
+
+        if seed != -1:
+            torch.manual_seed(seed)
+
+        images = prepare_images(image, max_image_dimension, min_pixels, max_pixels) if image is not None else []
+        conversations = self._pair_inputs(prompt_list, images)
+
+        vision_cache = get_vision_cache()
+        cache_stats = vision_cache.stats() if vision_cache is not None else None
+        try:
+            self._load_model(model_name, quantization, attention_type)
+            self._warm_up()
+            with self._cpu_threads():
+                responses, stats = self._generate(conversations, max_new_tokens, temperature, top_p, batch_size,
+                                                  kv_cache)
+        finally:
+            self._release_model(keep_model_loaded)
+
+        print(f"[Qwen3-VL] Batch: {stats['requests']} requests in {stats['batches']} batches, "
+              f"{stats['generated_tokens']} tokens in {stats['seconds']:.2f}s "
+              f"({stats['tokens_per_second']:.1f} tok/s)")
+        self._report_vision_cache(cache_stats)
+        joined = "\n\n".join(f"[{i + 1}] {r}" for i, r in enumerate(responses))
+        return (responses, joined)
+
+
 NODE_CLASS_MAPPINGS = {
     "Qwen3VLProcessor": Qwen3VLProcessor,
+    "Qwen3VLBatchProcessor": Qwen3VLBatchProcessor,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "Qwen3VLProcessor": "Qwen3-VL Processor",
+    "Qwen3VLBatchProcessor": "Qwen3-VL Batch Processor",
 }
 
@@ -0,0 +1,94 @@
+"""
+Quantized Weights Cache for Qwen3-VL
+Saves bitsandbytes-quantized models next to the original checkpoint so later
+4bit/8bit loads read the quantized weights instead of re-quantizing
+"""
+
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Optional
+
+# Marker written last; an artifact without it is incomplete and ignored
+MANIFEST_NAME = "qwen3vl_quantized.json"
+
+_WEIGHT_SUFFIXES = ('.safetensors', '.bin', '.pt')
+
+
+def _library_version(name: str) -> str:
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return "unknown"
+
+
+def _checkpoint_signature(checkpoint_dir: str) -> Dict[str, int]:
+    """Weight file sizes of the source checkpoint, to detect a replaced model"""
+    signature = {}
+    if os.path.isdir(checkpoint_dir):
+        for name in sorted(os.listdir(checkpoint_dir)):
+            if name.endswith(_WEIGHT_SUFFIXES):
+                signature[name] = os.path.getsize(os.path.join(checkpoint_dir, name))
+    return signature
+
+
+def artifact_dir(checkpoint_dir: str, quantization: str) -> str:
+    """Directory of the quantized copy, keyed by method and library versions"""
+    key = f"{quantization}-bnb{_library_version('bitsandbytes')}-transformers{_library_version('transformers')}"
+    return os.path.join(f"{checkpoint_dir.rstrip(os.sep)}-quantized", key)
+
+
+def find_artifact(checkpoint_dir: str, quantization: str) -> Optional[str]:
+    """Path of a complete, up-to-date quantized copy, or None"""
+    path = artifact_dir(checkpoint_dir, quantization)
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if not os.path.isfile(manifest_path):
+        return None
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if manifest.get("source_signature") != _checkpoint_signature(checkpoint_dir):
+        print(f"[Qwen3-VL] ♻️ Source weights changed, ignoring quantized copy: {path}")
+        return None
+    return path
+
+
+def save_artifact(model: Any, checkpoint_dir: str, quantization: str, quantize_seconds: float) -> Optional[str]:
+    """Save a quantized model; a failure only costs the cache, never the load"""
+    path = artifact_dir(checkpoint_dir, quantization)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    started = time.perf_counter()
+    try:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        model.save_pretrained(tmp_path, safe_serialization=True)
+        manifest = {
+            "source": os.path.abspath(checkpoint_dir),
+            "source_signature": _checkpoint_signature(checkpoint_dir),
+            "quantization": quantization,
+            "bitsandbytes": _library_version('bitsandbytes'),
+            "transformers": _library_version('transformers'),
+            "quantize_seconds": round(quantize_seconds, 2),
+        }
+        with open(os.path.join(tmp_path, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        print(f"[Qwen3-VL] ⚠️ Could not save quantized weights ({e}), they will be re-quantized next time")
+        return None
+
+    print(f"[Qwen3-VL] 💾 Saved {quantization} weights in {time.perf_counter() - started:.1f}s: {path}")
+    return path
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(path, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
@@ -0,0 +1,202 @@
+"""
+Request Scheduler for Qwen3-VL
+Dynamic micro-batching of concurrent local inference requests per resident model
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from .qwen3vl_config import get_config
+from .qwen3vl_generation import Conversation, estimate_prompt_tokens, generate_batch
+
+
+# Seconds a per-model worker stays alive without requests
+WORKER_IDLE_TIMEOUT = 60.0
+
+
+@dataclass
+class _Request:
+    """A queued conversation waiting for a batch"""
+    conversation: Conversation
+    model: Any
+    processor: Any
+    device: Any
+    generate_kwargs: Dict[str, Any]
+    tokens: int
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.perf_counter)
+
+    @property
+    def batch_key(self) -> Tuple:
+        # Only requests with identical sampling settings can share a generate call
+        return tuple(sorted(self.generate_kwargs.items()))
+
+
+class Qwen3VLScheduler:
+    """
+    Collects requests for the same model that arrive within ``max_wait_ms``
+    (or until ``max_batch_size`` / ``max_batch_tokens`` is reached) and runs
+    them as one batched generate. When a batch finishes, the next one is
+    formed immediately from whatever queued up meanwhile.
+
+    The wait only applies while more than one caller has requests in flight:
+    ComfyUI's executor runs nodes one at a time, and a lone caller has
+    nobody to share a batch with.
+
+    ``run_batch`` has the signature of ``generate_batch`` and can be replaced,
+    e.g. by the load-test harness to simulate a model.
+    """
+
+    def __init__(self, max_batch_size: int = 8, max_wait_ms: float = 20.0, max_batch_tokens: int = 32768,
+                 run_batch: Callable[..., Tuple[List[str], Dict[str, float]]] = generate_batch):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_batch_tokens = max_batch_tokens
+        self.run_batch = run_batch
+
+        self._lock = threading.Lock()
+        self._queues: Dict[Hashable, Deque[_Request]] = {}
+        self._wakeups: Dict[Hashable, threading.Condition] = {}
+        self._workers: Dict[Hashable, threading.Thread] = {}
+        self._callers: Dict[Hashable, int] = {}
+        self._stats = {"requests": 0, "batches": 0, "batched_requests": 0,
+                       "queue_seconds": 0.0, "generated_tokens": 0}
+
+    def submit(self, model_key: Hashable, model: Any, processor: Any, device: Any,
+               conversations: List[Conversation], **generate_kwargs) -> List[Future]:
+        """Queue conversations; each future resolves to ``(response, batch_stats)``"""
+        max_new_tokens = int(generate_kwargs.get("max_new_tokens", 0))
+        requests = [
+            _Request(conv, model, processor, device, generate_kwargs,
+                     estimate_prompt_tokens(processor, conv) + max_new_tokens)
+            for conv in conversations
+        ]
+        remaining = [len(requests)]
+
+        def on_done(_future: Future) -> None:
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    self._callers[model_key] -= 1
+
+        for request in requests:
+            request.future.add_done_callback(on_done)
+        with self._lock:
+            queue = self._queues.setdefault(model_key, deque())
+            wakeup = self._wakeups.setdefault(model_key, threading.Condition(self._lock))
+            queue.extend(requests)
+            self._callers[model_key] = self._callers.get(model_key, 0) + 1
+            self._stats["requests"] += len(requests)
+            worker = self._workers.get(model_key)
+            if worker is None or not worker.is_alive():
+                worker = threading.Thread(target=self._worker, args=(model_key,), daemon=True,
+                                          name=f"qwen3vl-scheduler-{model_key}")
+                self._workers[model_key] = worker
+                worker.start()
+            wakeup.notify()
+        return [r.future for r in requests]
+
+    def stats(self) -> Dict[str, float]:
+        """Aggregate scheduler statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_batch_size"] = stats["batched_requests"] / stats["batches"] if stats["batches"] else 0.0
+        stats["avg_queue_ms"] = stats["queue_seconds"] * 1000.0 / stats["batched_requests"] if stats["batched_requests"] else 0.0
+        return stats
+
+    def _collect(self, model_key: Hashable) -> Optional[List[_Request]]:
+        """Wait for a batch of compatible requests, None when the worker should exit"""
+        queue = self._queues[model_key]
+        wakeup = self._wakeups[model_key]
+        with self._lock:
+            idle_deadline = time.perf_counter() + WORKER_IDLE_TIMEOUT
+            while not queue:
+                remaining = idle_deadline - time.perf_counter()
+                if remaining <= 0:
+                    del self._workers[model_key]
+                    return None
+                wakeup.wait(remaining)
+
+            # Let more requests arrive until the oldest one has waited max_wait,
+            # unless there is no other caller to wait for
+            deadline = queue[0].enqueued + self.max_wait
+            while len(queue) < self.max_batch_size and self._callers.get(model_key, 0) > 1:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                wakeup.wait(remaining)
+
+            first = queue.popleft()
+            batch, tokens, skipped = [first], first.tokens, []
+            while queue and len(batch) < self.max_batch_size:
+                request = queue.popleft()
+                if request.batch_key != first.batch_key or tokens + request.tokens > self.max_batch_tokens:
+                    skipped.append(request)
+                    continue
+                batch.append(request)
+                tokens += request.tokens
+            # Requests that didn't fit keep their place at the front of the queue
+            queue.extendleft(reversed(skipped))
+            return batch
+
+    def _worker(self, model_key: Hashable) -> None:
+        batch: Optional[List[_Request]] = None
+        try:
+            while True:
+                batch = self._collect(model_key)
+                if batch is None:
+                    return
+                started = time.perf_counter()
+                first = batch[0]
+                try:
+                    responses, batch_stats = self.run_batch(
+                        first.model, first.processor, [r.conversation for r in batch], first.device,
+                        len(batch), **first.generate_kwargs
+                    )
+                except Exception as e:
+                    for request in batch:
+                        request.future.set_exception(e)
+                    continue
+
+                with self._lock:
+                    self._stats["batches"] += 1
+                    self._stats["batched_requests"] += len(batch)
+                    self._stats["queue_seconds"] += sum(started - r.enqueued for r in batch)
+                    self._stats["generated_tokens"] += int(batch_stats.get("generated_tokens", 0))
+                for request, response in zip(batch, responses):
+                    request.future.set_result((response, batch_stats))
+        except BaseException as e:
+            # The worker is going away: fail everything it would have served so no caller hangs
+            with self._lock:
+                pending = list(batch or []) + list(self._queues[model_key])
+                self._queues[model_key].clear()
+                if self._workers.get(model_key) is threading.current_thread():
+                    del self._workers[model_key]
+            for request in pending:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            raise
+
+
+# Global scheduler instance
+_scheduler = None
+_scheduler_settings = None
+
+
+def get_scheduler() -> Optional[Qwen3VLScheduler]:
+    """Get global scheduler instance, None when disabled in the config"""
+    global _scheduler, _scheduler_settings
+    config = get_config()
+    if not config.is_scheduler_enabled():
+        return None
+
+    settings = (config.get_scheduler_max_batch_size(), config.get_scheduler_max_wait_ms(),
+                config.get_scheduler_max_batch_tokens())
+    if _scheduler is None or settings != _scheduler_settings:
+        _scheduler = Qwen3VLScheduler(*settings)
+        _scheduler_settings = settings
+    return _scheduler
@@ -4,13 +4,15 @@ Provides helper nodes for image/video loading and text processing
 """
 
 import os
+import time
+from collections import OrderedDict
 import torch
 import folder_paths
-from pathlib import Path
-from typing import Optional, Tuple, List
-import cv2
-import numpy as np
-from PIL import Image
+from .qwen3vl_media import attach_video_metadata
+from .qwen3vl_image_decode import IMAGE_EXTENSIONS, load_image_frames
+from .qwen3vl_image_loader import BATCH_MODES, directory_signature, get_batcher
+from .qwen3vl_keyframes import extract_keyframes
+from .qwen3vl_video_decode import FRAME_DTYPES, SAMPLING_STRATEGIES, VIDEO_BACKENDS, sample_video
 
 
 class LoadImageForQwen3VL:
@@ -21,12 +23,16 @@ class LoadImageForQwen3VL:
         image_dir = folder_paths.get_input_directory()
         files = []
         for f in os.listdir(image_dir):
-            if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')):
+            if f.lower().endswith(IMAGE_EXTENSIONS):
                 files.append(f)
         
         return {
             "required": {
                 "image": (sorted(files), {"image_upload": True}),
+            },
+            "optional": {
+                "max_dimension": ("INT", {"default": 0, "min": 0, "max": 16384, "step": 32}),
+                "max_frames": ("INT", {"default": 64, "min": 1, "max": 1024, "step": 1}),
             }
         }
     
@@ -35,11 +41,104 @@ class LoadImageForQwen3VL:
     FUNCTION = "load_image"
     CATEGORY = "Qwen3-VL/loaders"
 
-    def load_image(self, image):
+    def load_image(self, image, max_dimension: int = 0, max_frames: int = 64):
         image_path = os.path.join(folder_paths.get_input_directory(), image)
-        img = Image.open(image_path).convert("RGB")
-        img_array = np.array(img).astype(np.float32) / 255.0
-        return (torch.from_numpy(img_array).unsqueeze(0),)
+        # Decoded at the needed size (JPEG draft mode), upright, animated files as a batch
+        frames = load_image_frames(image_path, max_dimension or None, max_frames)
+        return (torch.from_numpy(frames),)
+
+
+class LoadImageDirectoryForQwen3VL:
+    """Load the images of a folder as IMAGE batches, one chunk per run"""
+
+    # unique_id -> (folder, start_index, next position) of the auto cursor, most recent last
+    _cursors = OrderedDict()
+    _MAX_CURSORS = 64
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "directory": ("STRING", {"default": "", "multiline": False}),
+                "pattern": ("STRING", {"default": "*", "multiline": False}),
+                "batch_size": ("INT", {"default": 8, "min": 1, "max": 256, "step": 1}),
+                "resize_mode": (BATCH_MODES, {"default": "crop"}),
+                "width": ("INT", {"default": 1024, "min": 32, "max": 8192, "step": 32}),
+                "height": ("INT", {"default": 1024, "min": 32, "max": 8192, "step": 32}),
+                "start_index": ("INT", {"default": 0, "min": 0, "max": 1000000, "step": 1}),
+                "cursor": (["manual", "auto"], {"default": "manual"}),
+            },
+            "optional": {
+                "recursive": ("BOOLEAN", {"default": False}),
+                "workers": ("INT", {"default": 4, "min": 1, "max": 32, "step": 1}),
+                "prefetch": ("INT", {"default": 2, "min": 0, "max": 16, "step": 1}),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "STRING", "INT", "INT")
+    RETURN_NAMES = ("images", "filenames", "next_index", "total")
+    FUNCTION = "load_images"
+    CATEGORY = "Qwen3-VL/loaders"
+
+    @staticmethod
+    def _resolve_directory(directory: str) -> str:
+        """A folder inside the ComfyUI input directory; anything resolving outside it is rejected"""
+        root = os.path.realpath(folder_paths.get_input_directory())
+        path = os.path.realpath(os.path.join(root, directory.strip()))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"Image directory must be inside the input directory: {directory}")
+        if not os.path.isdir(path):
+            raise ValueError(f"Image directory not found: {path}")
+        return path
+
+    @classmethod
+    def IS_CHANGED(cls, directory="", cursor="manual", recursive=False, **kwargs):
+        # The auto cursor moves on every run; otherwise rerun when the folder changes
+        if cursor == "auto":
+            return float("nan")
+        try:
+            return directory_signature(cls._resolve_directory(directory), recursive)
+        except (OSError, ValueError):
+            return ""
+
+    def load_images(self, directory: str, pattern: str, batch_size: int, resize_mode: str, width: int,
+                    height: int, start_index: int, cursor: str, recursive: bool = False, workers: int = 4,
+                    prefetch: int = 2, unique_id=None):
+        path = self._resolve_directory(directory)
+        # Batchers are shared between runs, so the batches prefetched last
+        # run are usually decoded already
+        batcher = get_batcher(path, pattern.strip() or "*", recursive, (width, height), resize_mode, batch_size,
+                              workers, prefetch)
+        total = len(batcher)
+        if total == 0:
+            raise ValueError(f"No images matching '{pattern}' in {path}")
+
+        if cursor == "auto":
+            key = unique_id or path
+            folder, first, position = self._cursors.get(key, (None, None, start_index))
+            if folder != path or first != start_index:
+                position = start_index
+            start = position if position < total else 0
+        else:
+            start = start_index
+            if start >= total:
+                raise ValueError(f"start_index {start} is past the last of the {total} images in {path}")
+
+        started = time.perf_counter()
+        batch = batcher.batch(start)
+        next_index = batch.next_index if batch.next_index < total else 0
+        if cursor == "auto":
+            self._cursors.pop(key, None)
+            self._cursors[key] = (path, start_index, next_index)
+            while len(self._cursors) > self._MAX_CURSORS:
+                self._cursors.popitem(last=False)
+
+        print(f"[Qwen3-VL] 🖼️ Loaded images {start}-{batch.next_index - 1} of {total} "
+              f"({batch.images.shape[2]}x{batch.images.shape[1]}) in {time.perf_counter() - started:.2f}s")
+        return (torch.from_numpy(batch.images), "\n".join(batch.names), next_index, total)
 
 
 class LoadVideoForQwen3VL:
@@ -58,6 +157,13 @@ class LoadVideoForQwen3VL:
                 "video": (sorted(files), {"video_upload": True}),
                 "fps": ("INT", {"default": 2, "min": 1, "max": 30, "step": 1}),
                 "max_frames": ("INT", {"default": 128, "min": 1, "max": 1024, "step": 1}),
+            },
+            "optional": {
+                "sampling": (SAMPLING_STRATEGIES, {"default": "auto"}),
+                "decode_workers": ("INT", {"default": 1, "min": 1, "max": 16, "step": 1}),
+                "output_dtype": (list(FRAME_DTYPES), {"default": "float32"}),
+                "max_dimension": ("INT", {"default": 0, "min": 0, "max": 8192, "step": 32}),
+                "backend": (VIDEO_BACKENDS, {"default": "auto"}),
             }
         }
     
@@ -66,37 +172,83 @@ class LoadVideoForQwen3VL:
     FUNCTION = "load_video"
     CATEGORY = "Qwen3-VL/loaders"
 
-    def load_video(self, video: str, fps: int, max_frames: int):
+    def load_video(self, video: str, fps: int, max_frames: int, sampling: str = "auto", decode_workers: int = 1,
+                   output_dtype: str = "float32", max_dimension: int = 0, backend: str = "auto"):
         video_path = os.path.join(folder_paths.get_input_directory(), video)
-        
-        cap = cv2.VideoCapture(video_path)
-        video_fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_skip = max(1, int(video_fps / fps))
-        
-        frames = []
-        frame_count = 0
-        
-        while cap.isOpened() and frame_count < max_frames:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_count % frame_skip == 0:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame_tensor = torch.from_numpy(frame_rgb).float() / 255.0
-                frames.append(frame_tensor)
-            
-            frame_count += 1
-        
-        cap.release()
-        
-        if frames:
-            video_tensor = torch.stack(frames)
+
+        # Only the planned frames are decoded, straight into one preallocated
+        # buffer; max_frames counts sampled frames
+        started = time.perf_counter()
+        frames, frame_indices, info = sample_video(video_path, fps, max_frames, sampling, decode_workers,
+                                                   output_dtype, max_dimension or None, backend)
+
+        if len(frame_indices):
+            video_tensor = torch.from_numpy(frames)
+            # Keep the real timeline so the processor can compute timestamps
+            attach_video_metadata(video_tensor, info.fps or fps, frame_indices)
+            print(f"[Qwen3-VL] 🎞️ Loaded {len(frame_indices)} frames {frames.shape[2]}x{frames.shape[1]} "
+                  f"{output_dtype} with {info.backend} in {time.perf_counter() - started:.2f}s "
+                  f"(peak {frames.nbytes / 1024 ** 2:.0f}MB + frames in flight)")
             return (video_tensor,)
         else:
             raise ValueError(f"No frames loaded from video: {video_path}")
 
 
+class ExtractKeyframesForQwen3VL:
+    """Pick scene-change keyframes of a video instead of sampling at a fixed fps"""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        video_dir = folder_paths.get_input_directory()
+        files = []
+        for f in os.listdir(video_dir):
+            if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv')):
+                files.append(f)
+
+        return {
+            "required": {
+                "video": (sorted(files), {"video_upload": True}),
+                "max_frames": ("INT", {"default": 32, "min": 1, "max": 1024, "step": 1}),
+                "threshold": ("FLOAT", {"default": 0.25, "min": 0.01, "max": 1.0, "step": 0.01}),
+            },
+            "optional": {
+                "analysis_fps": ("FLOAT", {"default": 4.0, "min": 0.5, "max": 30.0, "step": 0.5}),
+                "min_interval": ("FLOAT", {"default": 1.0, "min": 0.0, "max": 60.0, "step": 0.1}),
+                "max_interval": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 600.0, "step": 1.0}),
+                "max_dimension": ("INT", {"default": 1024, "min": 0, "max": 8192, "step": 32}),
+                "backend": (VIDEO_BACKENDS, {"default": "auto"}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "VIDEO", "STRING")
+    RETURN_NAMES = ("keyframes", "video", "timestamps")
+    FUNCTION = "extract"
+    CATEGORY = "Qwen3-VL/loaders"
+
+    def extract(self, video: str, max_frames: int, threshold: float, analysis_fps: float = 4.0,
+                min_interval: float = 1.0, max_interval: float = 0.0, max_dimension: int = 1024,
+                backend: str = "auto"):
+        video_path = os.path.join(folder_paths.get_input_directory(), video)
+
+        started = time.perf_counter()
+        frames, frame_indices, scores, info = extract_keyframes(
+            video_path, analysis_fps, max_frames, threshold, min_interval, max_interval,
+            max_dimension or None, backend
+        )
+        if not frame_indices:
+            raise ValueError(f"No frames loaded from video: {video_path}")
+
+        fps = info.fps or analysis_fps
+        print(f"[Qwen3-VL] 🎬 Picked {len(frame_indices)} keyframes of a {info.duration:.1f}s video "
+              f"({sum(score >= threshold for score in scores[1:])} scene changes) "
+              f"in {time.perf_counter() - started:.2f}s")
+        # The VIDEO output keeps the source timeline for the processor and API nodes
+        video_frames = attach_video_metadata(torch.from_numpy(frames), fps, frame_indices)
+        images = video_frames.float() / 255.0
+        timestamps = ", ".join(f"{index / fps:.2f}s" for index in frame_indices)
+        return (images, video_frames, timestamps)
+
+
 class CombineImagesForQwen3VL:
     """Combine multiple images into a batch for multi-image queries"""
 
@@ -244,7 +396,9 @@ class Qwen3VLResponseFormatter:
 
 NODE_CLASS_MAPPINGS = {
     "LoadImageForQwen3VL": LoadImageForQwen3VL,
+    "LoadImageDirectoryForQwen3VL": LoadImageDirectoryForQwen3VL,
     "LoadVideoForQwen3VL": LoadVideoForQwen3VL,
+    "ExtractKeyframesForQwen3VL": ExtractKeyframesForQwen3VL,
     "CombineImagesForQwen3VL": CombineImagesForQwen3VL,
     "TextPromptForQwen3VL": TextPromptForQwen3VL,
     "Qwen3VLResponseFormatter": Qwen3VLResponseFormatter,
@@ -252,7 +406,9 @@ NODE_CLASS_MAPPINGS = {
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "LoadImageForQwen3VL": "Load Image for Qwen3-VL",
+    "LoadImageDirectoryForQwen3VL": "Load Image Directory for Qwen3-VL",
     "LoadVideoForQwen3VL": "Load Video for Qwen3-VL",
+    "ExtractKeyframesForQwen3VL": "Extract Keyframes for Qwen3-VL",
     "CombineImagesForQwen3VL": "Combine Images for Qwen3-VL",
     "TextPromptForQwen3VL": "Text Prompt for Qwen3-VL",
     "Qwen3VLResponseFormatter": "Qwen3-VL Response Formatter",
@@ -0,0 +1,513 @@
+"""
+Video Decoding for Qwen3-VL
+Reads videos through the fastest installed backend (decord, PyAV or OpenCV)
+with codec-level threading. The frames to sample are planned up front and
+only those are decoded, written in place into one preallocated buffer
+"""
+
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .qwen3vl_media import cap_dimension
+
+# Fastest first: decord batches random access, PyAV threads the codec
+VIDEO_BACKENDS = ["auto", "decord", "pyav", "opencv"]
+
+SAMPLING_STRATEGIES = ["auto", "grab", "seek"]
+
+# Output dtypes of the loader; floats are scaled to [0, 1]
+FRAME_DTYPES = {"uint8": np.uint8, "float16": np.float16, "float32": np.float32}
+
+# x264's default keyframe interval; seeking only pays off past a keyframe
+SEEK_MIN_GAP = 250
+
+# Frames decord hands over per batch, bounds the full-resolution copies
+_DECORD_BATCH = 16
+
+# Image sequence the API nodes send for frame tensors and video files over the upload limit
+API_VIDEO_FPS = 2
+API_VIDEO_MAX_FRAMES = 64
+API_VIDEO_FRAME_DIMENSION = 768
+
+# The API takes base64 strings up to 20MB and base64 adds ~33%
+API_VIDEO_MAX_UPLOAD_BYTES = 15 * 1024 * 1024
+
+_ROTATIONS = {90: cv2.ROTATE_90_CLOCKWISE, 180: cv2.ROTATE_180, 270: cv2.ROTATE_90_COUNTERCLOCKWISE}
+
+
+@dataclass
+class VideoInfo:
+    """Container properties read without decoding; ``frame_count`` may be 0 or approximate"""
+    frame_count: int
+    fps: float
+    width: int
+    height: int
+    duration: float = 0.0
+    # Clockwise degrees the frames are rotated by for display; width/height are after rotation
+    rotation: int = 0
+    backend: str = ""
+
+
+def container_rotation(path: str) -> int:
+    """
+    Clockwise degrees a video is rotated by for display, from the display
+    matrix or the legacy rotate tag; 0 when it has none or it can't be read
+
+    Read through OpenCV's FFmpeg backend, which handles both: decord reports
+    no rotation and current FFmpeg builds no longer set the tag PyAV exposes.
+    """
+    capture = cv2.VideoCapture(path)
+    try:
+        return int(capture.get(getattr(cv2, "CAP_PROP_ORIENTATION_META", -1)) or 0) % 360
+    finally:
+        capture.release()
+
+
+def plan_sample_indices(total_frames: int, video_fps: float, target_fps: float, max_frames: int) -> List[int]:
+    """
+    Source frame indices sampled at ``target_fps`` over the whole video
+
+    When that is more than ``max_frames``, ``max_frames`` are spread evenly
+    over the full duration instead of stopping early.
+    """
+    if total_frames <= 0:
+        return []
+    video_fps = video_fps if video_fps and video_fps > 0 else target_fps
+    duration = total_frames / video_fps
+    count = max(1, int(math.floor(duration * target_fps)))
+    if count > max_frames:
+        timestamps = np.linspace(0, duration, max_frames, endpoint=False)
+    else:
+        timestamps = np.arange(count) / target_fps
+    indices = np.minimum(np.round(timestamps * video_fps).astype(int), total_frames - 1)
+    return sorted(set(indices.tolist()))
+
+
+def _store_frame(frame: np.ndarray, out: np.ndarray, bgr: bool = False, rotation: int = 0) -> None:
+    """Rotate and resize a decoded frame to fit ``out`` and write it there as RGB of its dtype"""
+    if rotation in _ROTATIONS:
+        frame = cv2.rotate(frame, _ROTATIONS[rotation])
+    height, width = out.shape[:2]
+    if frame.shape[:2] != (height, width):
+        frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    if out.dtype == np.uint8:
+        if bgr:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=out)
+        else:
+            out[...] = frame
+    else:
+        out[...] = frame[..., ::-1] if bgr else frame
+        out *= 1.0 / 255.0
+
+
+class VideoReader:
+    """
+    One open video: ``info`` is read on open, ``read`` decodes sorted source
+    frame indices into a preallocated (T, H, W, 3) buffer, ``iter_frames``
+    streams them one at a time
+    """
+
+    name = ""
+    # Decoded frames are BGR (OpenCV) / already turned upright by the library
+    _bgr = False
+    _auto_rotates = False
+
+    def __init__(self, path: str, threads: int = 1):
+        self.path = path
+        # 0 lets the codec pick its thread count
+        self.threads = threads if threads > 1 else 0
+        self.info = self._probe()
+        self.info.backend = self.name
+        if self.info.frame_count <= 0 and self.info.duration > 0 and self.info.fps > 0:
+            self.info.frame_count = int(round(self.info.duration * self.info.fps))
+        if self.info.duration <= 0 and self.info.frame_count > 0 and self.info.fps > 0:
+            self.info.duration = self.info.frame_count / self.info.fps
+        self._rotation = 0 if self._auto_rotates else self.info.rotation
+
+    def _probe(self) -> VideoInfo:
+        raise NotImplementedError
+
+    def _decode(self, indices: List[int]) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (source index, decoded frame) for sorted indices, stops early at the end of the stream"""
+        raise NotImplementedError
+
+    def _decode_at(self, seconds: List[float]) -> Iterator[Tuple[int, np.ndarray]]:
+        last = max(0, self.info.frame_count - 1)
+        fps = self.info.fps or 1.0
+        return self._decode(sorted(set(min(last, max(0, int(round(t * fps)))) for t in seconds)))
+
+    def _fill(self, frames: Iterator[Tuple[int, np.ndarray]], out: np.ndarray) -> List[int]:
+        indices = []
+        for index, frame in frames:
+            _store_frame(frame, out[len(indices)], bgr=self._bgr, rotation=self._rotation)
+            indices.append(index)
+        return indices
+
+    def read(self, indices: List[int], out: np.ndarray) -> int:
+        """Decode the frames at ``indices`` into ``out`` in order, returns how many were read"""
+        return len(self._fill(self._decode(indices), out))
+
+    def read_at(self, seconds: List[float], out: np.ndarray) -> List[int]:
+        """Decode the frames shown at the given timestamps, returns their source indices"""
+        return self._fill(self._decode_at(seconds), out)
+
+    def iter_frames(self, indices: List[int], size: Tuple[int, int]) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (source index, RGB uint8 frame of ``size``) without buffering the clip"""
+        for index, frame in self._decode(indices):
+            out = np.empty((size[0], size[1], 3), dtype=np.uint8)
+            _store_frame(frame, out, bgr=self._bgr, rotation=self._rotation)
+            yield index, out
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DecordReader(VideoReader):
+    """
+    decord: frame-accurate random access with batched decoding; it neither
+    reports nor applies rotation, so that is read from the container
+    """
+
+    name = "decord"
+
+    def _probe(self) -> VideoInfo:
+        from decord import VideoReader as DecordVideoReader, cpu
+        self._reader = DecordVideoReader(self.path, ctx=cpu(0), num_threads=self.threads)
+        height, width = self._reader[0].shape[:2]
+        self._reader.seek(0)
+        rotation = container_rotation(self.path)
+        if rotation in (90, 270):
+            width, height = height, width
+        return VideoInfo(frame_count=len(self._reader), fps=float(self._reader.get_avg_fps() or 0.0),
+                         width=width, height=height, rotation=rotation)
+
+    def _decode(self, indices: List[int]) -> Iterator[Tuple[int, np.ndarray]]:
+        indices = [index for index in indices if index < len(self._reader)]
+        for start in range(0, len(indices), _DECORD_BATCH):
+            batch = indices[start:start + _DECORD_BATCH]
+            yield from zip(batch, self._reader.get_batch(batch).asnumpy())
+
+    def close(self) -> None:
+        self._reader = None
+
+
+class PyAVReader(VideoReader):
+    """PyAV: frame and slice threading in the codec, seeks by timestamp"""
+
+    name = "pyav"
+
+    def _probe(self) -> VideoInfo:
+        import av
+        self._container = av.open(self.path)
+        self._stream = self._container.streams.video[0]
+        self._stream.thread_type = "AUTO"
+        self._stream.codec_context.thread_count = self.threads
+        rate = self._stream.average_rate or self._stream.guessed_rate
+        if self._stream.duration is not None:
+            duration = float(self._stream.duration * self._stream.time_base)
+        else:
+            duration = (self._container.duration or 0) / av.time_base
+        try:
+            rotation = int(self._stream.metadata.get("rotate", 0)) % 360
+        except ValueError:
+            rotation = 0
+        if not rotation:
+            # Current FFmpeg keeps rotation as display matrix side data only
+            rotation = container_rotation(self.path)
+        width, height = self._stream.codec_context.width, self._stream.codec_context.height
+        if rotation in (90, 270):
+            width, height = height, width
+        return VideoInfo(frame_count=int(self._stream.frames or 0), fps=float(rate or 0.0),
+                         width=width, height=height, duration=duration, rotation=rotation)
+
+    def _decode(self, indices: List[int]) -> Iterator[Tuple[int, np.ndarray]]:
+        return self._decode_at([index / (self.info.fps or 1.0) for index in indices])
+
+    def _decode_at(self, seconds: List[float]) -> Iterator[Tuple[int, np.ndarray]]:
+        fps = self.info.fps or 1.0
+        start = float((self._stream.start_time or 0) * self._stream.time_base)
+        frames, position, last_index = None, None, None
+        for target in sorted(seconds):
+            # A frame counts once it covers the target, within half a frame
+            target_time = start + target - 0.5 / fps
+            if position is not None and target_time <= position:
+                # The last decoded frame already covers it
+                continue
+            if frames is None or (target_time - position) * fps > SEEK_MIN_GAP:
+                self._container.seek(int(max(start, target_time) / self._stream.time_base),
+                                     stream=self._stream, backward=True, any_frame=False)
+                frames = self._container.decode(self._stream)
+            frame = None
+            for frame in frames:
+                position = float(frame.time) if frame.time is not None else position
+                if position is not None and position >= target_time:
+                    break
+            else:
+                return
+            index = int(round((position - start) * fps))
+            if index != last_index:
+                last_index = index
+                yield index, frame.to_ndarray(format="rgb24")
+
+    def close(self) -> None:
+        self._container.close()
+
+
+class OpenCVReader(VideoReader):
+    """
+    OpenCV: grabs skipped frames without conversion, seeks over long gaps and
+    decodes segments on a thread pool, one capture per segment
+    """
+
+    name = "opencv"
+    _bgr = True
+    _auto_rotates = True
+
+    def __init__(self, path: str, threads: int = 1, strategy: str = "auto"):
+        self.strategy = strategy
+        self.workers = max(1, threads)
+        super().__init__(path, threads)
+
+    def _open(self):
+        # The FFmpeg backend already threads the codec over all cores
+        return cv2.VideoCapture(self.path)
+
+    def _probe(self) -> VideoInfo:
+        capture = self._open()
+        try:
+            width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            # Frames come out rotated already (CAP_PROP_ORIENTATION_AUTO), the size does not
+            rotation = int(capture.get(getattr(cv2, "CAP_PROP_ORIENTATION_META", -1)) or 0) % 360
+            if rotation in (90, 270):
+                width, height = height, width
+            return VideoInfo(frame_count=int(capture.get(cv2.CAP_PROP_FRAME_COUNT)),
+                             fps=float(capture.get(cv2.CAP_PROP_FPS) or 0.0),
+                             width=width, height=height, rotation=rotation)
+        finally:
+            capture.release()
+
+    def _decode(self, indices: List[int], seek_start: bool = False) -> Iterator[Tuple[int, np.ndarray]]:
+        capture = self._open()
+        position = 0
+        try:
+            if seek_start and indices and indices[0] > 0:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, indices[0])
+                position = indices[0]
+            for index in indices:
+                gap = index - position
+                if gap > 0 and (self.strategy == "seek" or (self.strategy == "auto" and gap > SEEK_MIN_GAP)):
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+                    position = index
+                # grab() demuxes and decodes but skips the copy and color conversion of retrieve()
+                while position < index and capture.grab():
+                    position += 1
+                if position < index or not capture.grab():
+                    return
+                position += 1
+                ok, frame = capture.retrieve()
+                if not ok:
+                    return
+                yield index, frame
+        finally:
+            capture.release()
+
+    def read(self, indices: List[int], out: np.ndarray) -> int:
+        return len(self.read_slots(indices, out))
+
+    def read_slots(self, indices: List[int], out: np.ndarray) -> List[int]:
+        """
+        Like ``read``, but returns the slots of ``out`` that were filled
+
+        With several workers the indices are split into contiguous segments
+        decoded on a thread pool, each seeking to its first frame and writing
+        to its own slice (OpenCV releases the GIL while decoding). A segment
+        that ends early leaves a gap.
+        """
+        if self.workers <= 1 or len(indices) < 2 * self.workers:
+            return list(range(len(self._fill(self._decode(indices), out))))
+        bounds = np.linspace(0, len(indices), self.workers + 1).astype(int).tolist()
+        segments = [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+        def read_segment(segment: Tuple[int, int]) -> int:
+            start, end = segment
+            return len(self._fill(self._decode(indices[start:end], seek_start=start > 0), out[start:end]))
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qwen3vl-decode") as pool:
+            counts = list(pool.map(read_segment, segments))
+        return [slot for (start, _), count in zip(segments, counts) for slot in range(start, start + count)]
+
+    def read_streaming(self, target_fps: float, max_frames: int, size: Tuple[int, int],
+                       dtype: type) -> Tuple[np.ndarray, List[int]]:
+        """
+        Sample at ``target_fps`` when the frame count is unknown: grab every
+        frame, retrieve the ones on the sampling grid, stop after ``max_frames``
+
+        Frames are collected first, without a count there is nothing to preallocate.
+        """
+        capture = self._open()
+        video_fps = self.info.fps or target_fps
+        frames, indices = [], []
+        index = 0
+        next_time = 0.0
+        try:
+            while len(frames) < max_frames and capture.grab():
+                if index / video_fps >= next_time:
+                    ok, frame = capture.retrieve()
+                    if not ok:
+                        break
+                    stored = np.empty((size[0], size[1], 3), dtype=dtype)
+                    _store_frame(frame, stored, bgr=True)
+                    frames.append(stored)
+                    indices.append(index)
+                    next_time += 1.0 / target_fps
+                index += 1
+        finally:
+            capture.release()
+        if not frames:
+            return np.empty((0, size[0], size[1], 3), dtype=dtype), []
+        return np.stack(frames), indices
+
+
+_READERS = {"decord": DecordReader, "pyav": PyAVReader, "opencv": OpenCVReader}
+_MODULES = {"decord": "decord", "pyav": "av", "opencv": "cv2"}
+
+
+def available_backends() -> List[str]:
+    """Installed backends, fastest first"""
+    import importlib.util
+    return [name for name in VIDEO_BACKENDS[1:] if importlib.util.find_spec(_MODULES[name]) is not None]
+
+
+def open_video(path: str, backend: str = "auto", threads: int = 1, strategy: str = "auto") -> VideoReader:
+    """
+    Open a video with ``backend``; "auto" takes the fastest installed one that
+    can open the file. ``threads`` is the codec thread count (0/1 for the
+    codec default), for OpenCV the number of segments decoded in parallel.
+    """
+    candidates = available_backends() if backend == "auto" else [backend]
+    error = None
+    for name in candidates:
+        try:
+            if name == "opencv":
+                reader = OpenCVReader(path, threads, strategy)
+            else:
+                reader = _READERS[name](path, threads)
+            if reader.info.width > 0 and reader.info.height > 0:
+                return reader
+            reader.close()
+            error = ValueError(f"{name} could not read the size of {path}")
+        except Exception as e:
+            error = e
+    raise RuntimeError(f"No video backend could open {path}: {error}")
+
+
+def probe_video(path: str, backend: str = "auto") -> VideoInfo:
+    """Container info without decoding the stream"""
+    with open_video(path, backend) as reader:
+        return reader.info
+
+
+def sample_video(path: str, target_fps: float, max_frames: int, strategy: str = "auto", workers: int = 1,
+                 dtype: str = "uint8", max_dimension: Optional[int] = None,
+                 backend: str = "auto") -> Tuple[np.ndarray, List[int], VideoInfo]:
+    """
+    Sampled frames as one (T, H, W, 3) RGB array, their source frame indices
+    and the container info
+
+    The output is allocated once from the probed frame count and resolution
+    (scaled so the longest side is at most ``max_dimension``) and frames are
+    written into it as they are decoded, so peak memory is the output plus
+    the frames in flight. ``dtype`` is a key of FRAME_DTYPES, ``strategy``
+    only applies to OpenCV.
+    """
+    np_dtype = FRAME_DTYPES[dtype]
+    with open_video(path, backend, workers, strategy) as reader:
+        info = reader.info
+        size = cap_dimension(info.height, info.width, max_dimension)
+        indices = plan_sample_indices(info.frame_count, info.fps, target_fps, max_frames)
+        if not indices:
+            streaming = reader if isinstance(reader, OpenCVReader) else OpenCVReader(path, workers, strategy)
+            frames, indices = streaming.read_streaming(target_fps, max_frames, size, np_dtype)
+            return frames, indices, info
+
+        frames = np.empty((len(indices), size[0], size[1], 3), dtype=np_dtype)
+        if isinstance(reader, OpenCVReader):
+            slots = reader.read_slots(indices, frames)
+            indices = [indices[slot] for slot in slots]
+        elif isinstance(reader, PyAVReader):
+            # Timestamps are matched to the frames the stream actually has
+            indices = reader.read_at([index / (info.fps or target_fps) for index in indices], frames)
+            slots = list(range(len(indices)))
+        else:
+            slots = list(range(reader.read(indices, frames)))
+            indices = indices[:len(slots)]
+    if len(slots) < frames.shape[0]:
+        # The container over-reported its frame count
+        frames = frames[:len(slots)] if slots == list(range(len(slots))) else frames[slots]
+    return frames, indices, info
+
+
+def frame_urls(frames, max_dimension: Optional[int] = None, quality: int = 85) -> List[str]:
+    """
+    (T, H, W, 3) RGB frames (uint8, or floats in [0, 1]) as JPEG data URLs,
+    for APIs that take a video as an image sequence
+    """
+    import base64
+
+    urls = []
+    for frame in frames:
+        frame = np.asarray(frame)
+        if frame.dtype != np.uint8:
+            frame = np.clip(np.round(frame.astype(np.float32) * 255.0), 0, 255).astype(np.uint8)
+        height, width = cap_dimension(frame.shape[0], frame.shape[1], max_dimension)
+        if (height, width) != frame.shape[:2]:
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode(".jpg", cv2.cvtColor(frame, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if ok:
+            urls.append(f"data:image/jpeg;base64,{base64.b64encode(encoded.tobytes()).decode('utf-8')}")
+    return urls
+
+
+def api_tensor_frames(video) -> List[str]:
+    """A VIDEO frame tensor as the API image sequence, at most API_VIDEO_MAX_FRAMES spread evenly"""
+    if video.shape[0] > API_VIDEO_MAX_FRAMES:
+        video = video[np.linspace(0, video.shape[0] - 1, API_VIDEO_MAX_FRAMES).round().astype(int)]
+    return frame_urls(video[..., :3].cpu(), API_VIDEO_FRAME_DIMENSION)
+
+
+def api_file_frames(path: str, backend: str = "auto", log_prefix: str = "[Qwen3-VL]") -> List[str]:
+    """
+    A video file over API_VIDEO_MAX_UPLOAD_BYTES as the API image sequence;
+    [] with the reason printed when it can't be sampled. Only these files are
+    opened, smaller ones are uploaded as they are
+    """
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    try:
+        frames, _, info = sample_video(path, API_VIDEO_FPS, API_VIDEO_MAX_FRAMES,
+                                       max_dimension=API_VIDEO_FRAME_DIMENSION, backend=backend)
+        urls = frame_urls(frames)
+    except Exception as e:
+        print(f"{log_prefix} ⚠️ Could not sample frames: {e}")
+        urls = []
+    if not urls:
+        print(f"{log_prefix} ⚠️ Video file too large: {size_mb:.2f}MB")
+        print(f"{log_prefix} ⚠️ Maximum supported size: 15MB (API base64 limit)")
+        print(f"{log_prefix} ⚠️ Please use a smaller video or upload to a URL")
+        return []
+    print(f"{log_prefix} 🎞️ Video: {info.width}x{info.height}, {info.duration:.1f}s at {info.fps:.2f} fps")
+    print(f"{log_prefix} ✓ Video too large ({size_mb:.2f}MB), sending {len(urls)} frames "
+          f"({sum(len(url) for url in urls) / 1024 / 1024:.2f}MB base64)")
+    return urls
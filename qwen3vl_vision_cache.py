@@ -0,0 +1,321 @@
+"""
+Vision Cache for Qwen3-VL
+Byte-bounded LRU cache of preprocessed pixel tensors and vision-tower outputs,
+so repeated questions about the same image or video skip the visual encoder
+"""
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from .qwen3vl_config import get_config
+
+
+@dataclass
+class CacheEntry:
+    """Cached tensors plus the time it took to compute them"""
+    value: Any
+    size_bytes: int
+    seconds: float
+
+
+def _value_bytes(value: Any) -> int:
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_value_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_value_bytes(v) for v in value)
+    return 0
+
+
+def _to_device(value: Any, device: torch.device) -> Any:
+    if isinstance(value, torch.Tensor):
+        # Device-to-host copies must complete before the entry is cached
+        return value.to(device, non_blocking=device.type != "cpu")
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_device(v, device) for v in value)
+    return value
+
+
+def media_fingerprint(tensor: torch.Tensor, *extra: Any) -> str:
+    """Content hash of a preprocessed media tensor (plus anything else that affects it)"""
+    data = tensor.detach().cpu().contiguous()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((tuple(data.shape), str(data.dtype), extra)).encode())
+    digest.update(data.view(torch.uint8).reshape(-1).numpy().data)
+    return digest.hexdigest()
+
+
+def conversation_media_keys(conversations: Sequence[Any]) -> Tuple[List[Optional[str]], List[Optional[str]]]:
+    """Fingerprints of all images and videos in the order the processor sees them"""
+    image_keys, video_keys = [], []
+    for conv in conversations:
+        image_keys.extend(media_fingerprint(img) for img in conv.images)
+        if conv.video_frames is not None:
+            metadata = conv.video_metadata or {}
+            video_keys.append(media_fingerprint(
+                conv.video_frames, metadata.get("fps"), tuple(metadata.get("frames_indices") or ())
+            ))
+        elif conv.video_path:
+            # Decoded by qwen_vl_utils, nothing stable to fingerprint
+            video_keys.append(None)
+    return image_keys, video_keys
+
+
+def _merge_outputs(outputs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Concatenate per-item processor outputs the way a single batched call returns them"""
+    merged: Dict[str, Any] = {}
+    for name in outputs[0]:
+        values = [out[name] for out in outputs]
+        if isinstance(values[0], torch.Tensor):
+            merged[name] = torch.cat(values, dim=0)
+        elif isinstance(values[0], np.ndarray):
+            merged[name] = np.concatenate(values, axis=0)
+        elif isinstance(values[0], list):
+            merged[name] = [v for value in values for v in value]
+        else:
+            merged[name] = values[0]
+    return merged
+
+
+class _CachedMediaProcessor:
+    """Stand-in for an image/video processor that looks up each item in the cache"""
+
+    def __init__(self, inner, cache: "Qwen3VLVisionCache", namespace: Hashable, keys: List[Optional[str]]):
+        self._inner = inner
+        self._cache = cache
+        self._namespace = namespace
+        self._keys = keys
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    def __call__(self, images=None, videos=None, **kwargs):
+        from transformers import BatchFeature
+
+        arg, items = ("images", images) if images is not None else ("videos", videos)
+        items = list(items) if isinstance(items, (list, tuple)) else [items]
+        if len(items) != len(self._keys):
+            return self._inner(**{arg: items}, **kwargs)
+
+        outputs = []
+        for i, (item, key) in enumerate(zip(items, self._keys)):
+            cache_key = (self._namespace, arg, key) if key is not None else None
+            hit = self._cache.get(cache_key, "pixel") if cache_key is not None else None
+            if hit is not None:
+                outputs.append(hit)
+                continue
+
+            # Per-item list kwargs (video metadata) have to be sliced to match
+            item_kwargs = {
+                k: [v[i]] if isinstance(v, list) and len(v) == len(items) else v for k, v in kwargs.items()
+            }
+            started = time.perf_counter()
+            result = dict(self._inner(**{arg: [item]}, **item_kwargs))
+            if cache_key is not None:
+                self._cache.put(cache_key, result, time.perf_counter() - started)
+            outputs.append(result)
+        return BatchFeature(data=_merge_outputs(outputs))
+
+
+class ByteBudgetLRU:
+    """
+    Thread-safe LRU mapping bounded by the total size of its values
+
+    Hits and misses are counted per ``kind`` of lookup; each entry remembers
+    how long it took to compute, which is added to ``seconds_saved`` on a hit.
+    """
+
+    def __init__(self, max_bytes: int, kinds: Sequence[str]):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, float] = {"seconds_saved": 0.0}
+        for kind in kinds:
+            self._stats[f"{kind}_hits"] = 0
+            self._stats[f"{kind}_misses"] = 0
+
+    def get(self, key: Hashable, kind: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats[f"{kind}_misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats[f"{kind}_hits"] += 1
+            self._stats["seconds_saved"] += entry.seconds
+            return entry.value
+
+    def put(self, key: Hashable, value: Any, seconds: float) -> None:
+        size = _value_bytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._used -= old.size_bytes
+            while self._entries and self._used + size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._used -= evicted.size_bytes
+            self._entries[key] = CacheEntry(value, size, seconds)
+            self._used += size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._used = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(entries=len(self._entries), used_bytes=self._used, max_bytes=self.max_bytes)
+        return stats
+
+
+class Qwen3VLVisionCache(ByteBudgetLRU):
+    """
+    LRU cache for vision inputs, bounded by ``max_bytes``
+
+    Two kinds of entries share the budget: processor outputs (pixel tensors
+    and grids) per media item, and vision-tower outputs (embeddings and
+    deepstack features) per media item and model. Entries live on the CPU.
+    """
+
+    def __init__(self, max_bytes: int):
+        super().__init__(max_bytes, ("pixel", "encoder"))
+
+    def stats(self) -> Dict[str, float]:
+        stats = super().stats()
+        lookups = stats["encoder_hits"] + stats["encoder_misses"]
+        stats["encoder_hit_rate"] = stats["encoder_hits"] / lookups if lookups else 0.0
+        return stats
+
+    def wrap_processor(self, processor, namespace: Hashable, image_keys: List[Optional[str]],
+                       video_keys: List[Optional[str]]):
+        """Shallow copy of ``processor`` whose image/video processors go through the cache"""
+        wrapped = copy.copy(processor)
+        if image_keys:
+            wrapped.image_processor = _CachedMediaProcessor(processor.image_processor, self, namespace, image_keys)
+        if video_keys and hasattr(processor, "video_processor"):
+            wrapped.video_processor = _CachedMediaProcessor(processor.video_processor, self, namespace, video_keys)
+        return wrapped
+
+    @contextmanager
+    def encoder(self, model, namespace: Hashable, inputs, image_keys: List[Optional[str]],
+                video_keys: List[Optional[str]]):
+        """Serve vision-tower outputs from the cache while ``model.generate`` runs"""
+        visual = getattr(model, "visual", None) or getattr(getattr(model, "model", None), "visual", None)
+        pending = []
+        for grid_name, keys in (("image_grid_thw", image_keys), ("video_grid_thw", video_keys)):
+            grid = inputs.get(grid_name) if hasattr(inputs, "get") else None
+            if grid is not None and keys and len(keys) == grid.shape[0]:
+                pending.append((grid.detach().cpu(), keys))
+        if visual is None or not pending:
+            yield
+            return
+
+        self._install(visual)
+        visual._qwen3vl_cache_context = (self, namespace, pending)
+        try:
+            yield
+        finally:
+            visual._qwen3vl_cache_context = None
+
+    @staticmethod
+    def _install(visual: torch.nn.Module) -> None:
+        if getattr(visual, "_qwen3vl_original_forward", None) is not None:
+            return
+        original = visual.forward
+
+        def forward(hidden_states, grid_thw=None, **kwargs):
+            context = getattr(visual, "_qwen3vl_cache_context", None)
+            if context is None or grid_thw is None:
+                return original(hidden_states, grid_thw=grid_thw, **kwargs)
+            cache, namespace, pending = context
+            grid_cpu = grid_thw.detach().cpu()
+            for index, (grid, keys) in enumerate(pending):
+                if torch.equal(grid, grid_cpu):
+                    pending.pop(index)
+                    return cache._encode(visual, original, namespace, keys, hidden_states, grid_thw, kwargs)
+            return original(hidden_states, grid_thw=grid_thw, **kwargs)
+
+        visual._qwen3vl_original_forward = original
+        visual._qwen3vl_cache_context = None
+        visual.forward = forward
+
+    def _encode(self, visual, original, namespace: Hashable, keys: List[Optional[str]],
+                hidden_states: torch.Tensor, grid_thw: torch.Tensor, kwargs: Dict[str, Any]):
+        """Run the vision tower only for items that aren't cached, then reassemble the batch"""
+        merge = getattr(visual, "spatial_merge_size", 2)
+        patches = grid_thw.prod(-1).tolist()
+        tokens = [p // merge ** 2 for p in patches]
+
+        results: List[Any] = [None] * len(keys)
+        misses = []
+        for i, key in enumerate(keys):
+            hit = self.get((namespace, "encoder", key), "encoder") if key is not None else None
+            if hit is None:
+                misses.append(i)
+            else:
+                results[i] = _to_device(hit, hidden_states.device)
+
+        if misses:
+            pieces = hidden_states.split(patches)
+            started = time.perf_counter()
+            output = original(torch.cat([pieces[i] for i in misses]), grid_thw=grid_thw[misses], **kwargs)
+            if not (isinstance(output, tuple) and len(output) == 2 and isinstance(output[0], torch.Tensor)):
+                # Unknown output layout (other transformers version), don't cache
+                if len(misses) == len(keys):
+                    return output
+                return original(hidden_states, grid_thw=grid_thw, **kwargs)
+            if hidden_states.is_cuda:
+                torch.cuda.synchronize(hidden_states.device)
+            seconds = (time.perf_counter() - started) / len(misses)
+
+            embeds, deepstack = output
+            miss_tokens = [tokens[i] for i in misses]
+            embed_parts = embeds.split(miss_tokens)
+            deepstack_parts = [features.split(miss_tokens) for features in deepstack]
+            for j, i in enumerate(misses):
+                result = (embed_parts[j], [parts[j] for parts in deepstack_parts])
+                results[i] = result
+                if keys[i] is not None:
+                    self.put((namespace, "encoder", keys[i]), _to_device(result, torch.device("cpu")), seconds)
+            if len(misses) == len(keys):
+                return output
+
+        embeds = torch.cat([r[0] for r in results])
+        deepstack = [torch.cat([r[1][layer] for r in results]) for layer in range(len(results[0][1]))]
+        return embeds, deepstack
+
+
+# Global vision cache instance
+_vision_cache = None
+
+
+def get_vision_cache() -> Optional[Qwen3VLVisionCache]:
+    """Get global vision cache instance, None when disabled in the config"""
+    global _vision_cache
+    config = get_config()
+    if not config.is_vision_cache_enabled():
+        return None
+
+    max_bytes = int(config.get_vision_cache_max_memory_mb() * 1024 ** 2)
+    if _vision_cache is None:
+        _vision_cache = Qwen3VLVisionCache(max_bytes)
+    elif _vision_cache.max_bytes != max_bytes:
+        _vision_cache.max_bytes = max_bytes
+        _vision_cache.clear()
+    return _vision_cache
@@ -0,0 +1,166 @@
+"""
+Visual Token Budget for Qwen3-VL
+Splits one visual-token budget across all images and video frames of a
+request, and drops video frames that barely change from the frames before
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+
+from .qwen3vl_media import (
+    FRAME_FACTOR,
+    IMAGE_FACTOR,
+    VIDEO_MIN_PIXELS,
+    attach_video_metadata,
+    get_video_metadata,
+    smart_resize,
+    video_frame_max_pixels,
+)
+
+# Smallest image the patch grid allows (2x2 merged tokens)
+MIN_ITEM_PIXELS = 4 * IMAGE_FACTOR * IMAGE_FACTOR
+
+# Side of the thumbnails frames are compared on when pruning
+_PRUNE_THUMBNAIL = 64
+
+
+@dataclass
+class MediaItem:
+    """Images of one size (count = batch size) or a video (count = frame pairs)"""
+    height: int
+    width: int
+    count: int
+    min_pixels: int
+    max_pixels: int
+    # Budgeting never shrinks an item below this
+    floor_pixels: int = MIN_ITEM_PIXELS
+
+    def tokens(self, max_pixels: int) -> int:
+        """Visual tokens at a per-image/frame pixel cap"""
+        height, width = smart_resize(self.height, self.width, IMAGE_FACTOR,
+                                     min(self.min_pixels, max_pixels), max_pixels)
+        return self.count * (height // IMAGE_FACTOR) * (width // IMAGE_FACTOR)
+
+
+@dataclass
+class VisualBudgetPlan:
+    """Pixel caps and frame count that keep a request within its budget"""
+    image_max_pixels: int
+    video_max_pixels: int
+    video_frames: int
+    tokens: int
+    requested_tokens: int
+
+
+def split_budget(items: List[MediaItem], budget_tokens: int, steps: int = 24) -> Tuple[List[int], int]:
+    """
+    Per-item pixel caps whose total visual tokens fit ``budget_tokens``
+
+    Every item is scaled by the same factor of its own cap, so relative detail
+    is kept, down to its ``floor_pixels``. Returns the caps and their tokens
+    (still above the budget when even the floors don't fit).
+    """
+    caps = [item.max_pixels for item in items]
+
+    def scaled(scale: float) -> List[int]:
+        return [max(min(item.floor_pixels, cap), int(cap * scale)) for item, cap in zip(items, caps)]
+
+    def total(scale: float) -> int:
+        return sum(item.tokens(cap) for item, cap in zip(items, scaled(scale)))
+
+    if budget_tokens <= 0 or total(1.0) <= budget_tokens:
+        return caps, total(1.0)
+    low, high = 0.0, 1.0
+    for _ in range(steps):
+        middle = (low + high) / 2
+        if total(middle) <= budget_tokens:
+            low = middle
+        else:
+            high = middle
+    return scaled(low), total(low)
+
+
+def plan_visual_budget(budget_tokens: int, min_pixels: int, max_pixels: int,
+                       image_size: Optional[Tuple[int, int, int]] = None,
+                       video_size: Optional[Tuple[int, int, int]] = None) -> VisualBudgetPlan:
+    """
+    Plan a request with an image batch ``(count, height, width)`` and/or a
+    frame video ``(frames, height, width)``; sizes are after max_image_dimension
+
+    Video frames don't shrink below VIDEO_MIN_PIXELS (or min_pixels if
+    lower); when the budget is still exceeded, frames are subsampled evenly
+    (in pairs) until it fits, fewer legible frames beat many unreadable ones.
+    """
+    items: List[MediaItem] = []
+    if image_size is not None:
+        count, height, width = image_size
+        items.append(MediaItem(height, width, count, min_pixels, max_pixels))
+    frames = 0
+    if video_size is not None:
+        frames, height, width = video_size
+        frames += frames % FRAME_FACTOR
+        items.append(MediaItem(height, width, frames // FRAME_FACTOR, min_pixels,
+                               video_frame_max_pixels(frames, min_pixels, max_pixels),
+                               floor_pixels=min(min_pixels, VIDEO_MIN_PIXELS)))
+
+    requested = sum(item.tokens(item.max_pixels) for item in items)
+    caps, tokens = split_budget(items, budget_tokens)
+    if tokens > budget_tokens > 0 and video_size is not None:
+        video = items[-1]
+        other_tokens = sum(item.tokens(cap) for item, cap in zip(items[:-1], caps[:-1]))
+        pair_tokens = video.tokens(caps[-1]) // max(1, video.count)
+        pairs = max(1, (budget_tokens - other_tokens) // max(1, pair_tokens))
+        if pairs < video.count:
+            video.count = pairs
+            frames = pairs * FRAME_FACTOR
+            tokens = other_tokens + video.tokens(caps[-1])
+
+    return VisualBudgetPlan(
+        image_max_pixels=caps[0] if image_size is not None else max_pixels,
+        video_max_pixels=caps[-1] if video_size is not None else max_pixels,
+        video_frames=frames,
+        tokens=tokens,
+        requested_tokens=requested,
+    )
+
+
+def select_frames(frames: torch.Tensor, count: int) -> torch.Tensor:
+    """Evenly spaced subset of ``count`` frames, keeping fps and source indices"""
+    if count <= 0 or count >= frames.shape[0]:
+        return frames
+    fps, indices = get_video_metadata(frames)
+    keep = torch.linspace(0, frames.shape[0] - 1, count).round().long().tolist()
+    return attach_video_metadata(frames[keep], fps, [indices[i] for i in keep])
+
+
+def prune_redundant_frames(frames: torch.Tensor, metadata: Dict[str, Any],
+                           threshold: float) -> Tuple[torch.Tensor, Dict[str, Any], int]:
+    """
+    Drop frame pairs of a prepared (T, C, h, w) uint8 video whose mean absolute
+    difference to the last kept pair is below ``threshold`` (0-255 scale)
+
+    Works on whole temporal pairs, the unit the model turns into tokens; the
+    kept frames keep their source indices so timestamps stay right. Returns
+    the frames, updated metadata and the number of frames dropped.
+    """
+    pairs = frames.shape[0] // FRAME_FACTOR
+    if pairs < 2 or threshold <= 0:
+        return frames, metadata, 0
+
+    with torch.no_grad():
+        thumbnails = torch.nn.functional.adaptive_avg_pool2d(
+            frames[::FRAME_FACTOR].float(), (_PRUNE_THUMBNAIL, _PRUNE_THUMBNAIL)
+        )
+    keep = [0]
+    for pair in range(1, pairs):
+        if (thumbnails[pair] - thumbnails[keep[-1]]).abs().mean().item() >= threshold:
+            keep.append(pair)
+    if len(keep) == pairs:
+        return frames, metadata, 0
+
+    frame_ids = [pair * FRAME_FACTOR + offset for pair in keep for offset in range(FRAME_FACTOR)]
+    metadata = dict(metadata)
+    metadata["frames_indices"] = [metadata["frames_indices"][i] for i in frame_ids]
+    return frames[frame_ids], metadata, frames.shape[0] - len(frame_ids)
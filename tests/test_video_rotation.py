@@ -0,0 +1,87 @@
+"""
+Rotated clips (portrait phone videos) decode upright on every backend
+
+The clip is written with OpenCV and its track header matrix patched to a
+90 degree clockwise display rotation, the way phones store portrait video.
+"""
+
+import importlib
+import os
+import struct
+import sys
+import types
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "qwen3vl_test_pkg"
+
+WIDTH, HEIGHT, FRAMES = 64, 32, 10
+
+
+def load_module(name: str):
+    """Import ``<repo>/<name>.py`` as a package submodule without the ComfyUI package __init__"""
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [REPO_ROOT]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f"{PACKAGE_NAME}.{name}")
+
+
+def _set_rotation_90(path: str) -> None:
+    """Rewrite the tkhd matrix of the first track to display it rotated 90 degrees clockwise"""
+    with open(path, "r+b") as f:
+        data = f.read()
+        box = data.find(b"tkhd")
+        assert box > 0, "no track header in the written clip"
+        version = data[box + 4]
+        # version/flags, then times, track id, reserved and duration, reserved, layer..volume, reserved
+        matrix = box + 4 + 4 + (32 if version == 1 else 20) + 8 + 8
+        f.seek(matrix)
+        f.write(struct.pack(">9I", 0, 0x10000, 0, 0xFFFF0000, 0, 0, HEIGHT << 16, 0, 0x40000000))
+
+
+@pytest.fixture(scope="module")
+def rotated_clip(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("video") / "rotated.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 10, (WIDTH, HEIGHT))
+    if not writer.isOpened():
+        pytest.skip("OpenCV can't write mp4 here")
+    # Left half white, right half black: upright after rotation, the white half is on top
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    frame[:, :WIDTH // 2] = 255
+    for _ in range(FRAMES):
+        writer.write(frame)
+    writer.release()
+    _set_rotation_90(path)
+    if load_module("qwen3vl_video_decode").container_rotation(path) != 90:
+        pytest.skip("OpenCV here doesn't report container rotation")
+    return path
+
+
+def _backends():
+    return load_module("qwen3vl_video_decode").available_backends()
+
+
+@pytest.mark.parametrize("backend", _backends())
+def test_rotated_clip_is_upright(rotated_clip, backend):
+    video_decode = load_module("qwen3vl_video_decode")
+    frames, indices, info = video_decode.sample_video(rotated_clip, 5, 4, backend=backend)
+
+    assert info.backend == backend
+    assert info.rotation == 90
+    assert (info.width, info.height) == (HEIGHT, WIDTH)
+    assert frames.shape[1:] == (WIDTH, HEIGHT, 3)
+    assert indices
+    top, bottom = frames[:, :WIDTH // 2 - 4], frames[:, WIDTH // 2 + 4:]
+    assert top.mean() > 200 and bottom.mean() < 50
+
+
+def test_auto_backend_is_upright(rotated_clip):
+    frames, _, info = load_module("qwen3vl_video_decode").sample_video(rotated_clip, 5, 4)
+    assert info.rotation == 90
+    assert frames.shape[1:] == (WIDTH, HEIGHT, 3)
+    assert frames[:, :WIDTH // 2 - 4].mean() > 200